@@ -5,6 +5,10 @@ import os
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 MTGJSON_PATH = os.path.join(BASE_DIR, "data", "M21.json")
 MTG_BOT_DB_PATH = os.path.join(BASE_DIR, "data", "mtg_bot.db")
+# Precomputed card embeddings (raw float32 matrix + JSON metadata), see strategic_brain/card_embedder.py
+CARD_EMBEDDINGS_PATH = os.path.join(BASE_DIR, "data", "card_embeddings")
+# Self-play replay shards, see strategic_brain/replay_buffer.py
+REPLAY_BUFFER_DIR = os.path.join(BASE_DIR, "data", "replay")
 
 # The subset of cards to be used in the initial versions of the bot
 # Example: A small set of vanilla creatures and basic lands from a core set.
@@ -55,6 +55,27 @@ class DeclareBlockerAction:
     def __repr__(self) -> str:
         return f"DeclareBlocker(Player: {str(self.player_id)[:4]}, Blocker: {str(self.blocker_id)[:4]}, Attacker: {str(self.attacker_id)[:4]})"
 
+@dataclass
+class DeclareTokenAttackersAction:
+    """Represents declaring a number of tokens of a composite token entity as attackers."""
+    player_id: uuid.UUID
+    card_id: uuid.UUID        # The composite token entity
+    count: int
+
+    def __repr__(self) -> str:
+        return f"DeclareTokenAttackers(Player: {str(self.player_id)[:4]}, Tokens: {str(self.card_id)[:4]} x{self.count})"
+
+@dataclass
+class DeclareTokenBlockersAction:
+    """Represents a number of tokens of a composite token entity blocking one attacking creature."""
+    player_id: uuid.UUID
+    blocker_id: uuid.UUID     # The composite token entity
+    attacker_id: uuid.UUID
+    count: int
+
+    def __repr__(self) -> str:
+        return f"DeclareTokenBlockers(Player: {str(self.player_id)[:4]}, Tokens: {str(self.blocker_id)[:4]} x{self.count}, Attacker: {str(self.attacker_id)[:4]})"
+
 @dataclass
 class PassPriorityAction:
     """Represents the action of passing priority to advance the current step or phase."""
@@ -72,10 +72,12 @@ class CardDataLoader:
             "toughness": int(raw_card_data.get("toughness")) if raw_card_data.get("toughness") and str(raw_card_data.get("toughness")).isdigit() else raw_card_data.get("toughness"),
             "loyalty": int(raw_card_data.get("loyalty")) if raw_card_data.get("loyalty") else None,
             "abilities": self._parse_abilities(raw_card_data.get("text", ""), raw_card_data.get("keywords", [])),
+            "keyword_names": raw_card_data.get("keywords", []), # Also kept for keywords without a vocabulary ID
             "is_land": "Land" in raw_card_data.get("type", ""),
             "is_creature": "Creature" in raw_card_data.get("type", ""),
             "colors": raw_card_data.get("colors", []),
             "color_identity": raw_card_data.get("colorIdentity", []),
+            "legalities": raw_card_data.get("legalities", {}),
         }
         return processed_data
 
@@ -3,7 +3,7 @@ import uuid
 import random
 from typing import List, Union, Optional
 
-from .game_graph import GameGraph, Entity
+from .game_graph import GameGraph, Entity, CompositeTokenEntity
 from . import card_database
 from .handlers import mana_handlers, combat_handlers, keyword_handlers
 from .actions import (
@@ -12,6 +12,8 @@ from .actions import (
     ActivateManaAbilityAction,
     DeclareAttackerAction,
     DeclareBlockerAction,
+    DeclareTokenAttackersAction,
+    DeclareTokenBlockersAction,
     PassPriorityAction,
     PassTurnAction,
 )
@@ -26,6 +28,8 @@ AnyAction = Union[
     ActivateManaAbilityAction,
     DeclareAttackerAction,
     DeclareBlockerAction,
+    DeclareTokenAttackersAction,
+    DeclareTokenBlockersAction,
     PassPriorityAction,
     PassTurnAction,
 ]
@@ -141,6 +145,10 @@ class Engine:
                     if not attacker.properties.get('has_summoning_sickness', True):
                         legal_moves.append(DeclareAttackerAction(player_id=active_player.instance_id, card_id=attacker.instance_id))
                         logger.debug(f"Found DeclareAttackerAction for {attacker.properties.get('name', attacker.type_id)} ({attacker.type_id})")
+                # Composite tokens attack by count, so the number of moves does not grow with the token count
+                for composite in combat_handlers.get_composite_tokens(self.graph, active_player.instance_id):
+                    for count in combat_handlers.token_count_options(len(composite.ready_attackers())):
+                        legal_moves.append(DeclareTokenAttackersAction(player_id=active_player.instance_id, card_id=composite.instance_id, count=count))
 
             # 5. Check for declaring blockers
             if self.graph.step == self.id_mapper.get_id_by_name("Declare Blockers Step", "game_vocabulary"):
@@ -154,6 +162,11 @@ class Engine:
                             if keyword_handlers.can_be_blocked_by(self.graph, attacker, blocker):
                                 legal_moves.append(DeclareBlockerAction(player_id=non_active_player.instance_id, blocker_id=blocker.instance_id, attacker_id=attacker.instance_id))
                                 logger.debug(f"Found DeclareBlockerAction: {blocker.properties.get('name', blocker.type_id)} ({blocker.type_id}) blocking {attacker.properties.get('name', attacker.type_id)} ({attacker.type_id})")
+                    for composite in combat_handlers.get_composite_tokens(self.graph, non_active_player.instance_id):
+                        counts = combat_handlers.token_count_options(len(composite.ready_blockers()))
+                        for attacker in attacking_creatures:
+                            if keyword_handlers.can_be_blocked_by(self.graph, attacker, composite):
+                                legal_moves.extend(DeclareTokenBlockersAction(player_id=non_active_player.instance_id, blocker_id=composite.instance_id, attacker_id=attacker.instance_id, count=count) for count in counts)
 
         except Exception as e:
             logger.error(f"Error calculating legal moves: {e}", exc_info=True)
@@ -223,6 +236,12 @@ class Engine:
                 self.graph.add_relationship(blocker, attacker, self.id_mapper.get_id_by_name("Blocking", "game_vocabulary"))
                 logger.info(f"{self.graph.entities[move.player_id].properties.get('name')} declared {blocker.properties.get('name')} blocking {attacker.properties.get('name')}.")
 
+            elif isinstance(move, DeclareTokenAttackersAction):
+                combat_handlers.declare_token_attackers(self.graph, self.graph.entities[move.card_id], move.count)
+
+            elif isinstance(move, DeclareTokenBlockersAction):
+                combat_handlers.declare_token_blockers(self.graph, self.graph.entities[move.blocker_id], self.graph.entities[move.attacker_id], move.count)
+
             elif isinstance(move, PassPriorityAction):
                 logger.info(f"{self.graph.entities[move.player_id].properties.get('name')} passed priority.")
                 self.progress_phase_and_step()
@@ -295,6 +314,8 @@ class Engine:
                 if battlefield_zone:
                     cards_on_battlefield = [self.graph.entities[r.source] for r in self.graph.get_relationships(target=battlefield_zone, rel_type=self.id_mapper.get_id_by_name("Is In Zone", "game_vocabulary"))]
                     for card in cards_on_battlefield:
+                        if isinstance(card, CompositeTokenEntity):
+                            combat_handlers.untap_tokens(card)
                         if card.properties.get('tapped', False):
                             card.properties['tapped'] = False
                             logger.debug(f"Untapped {card.properties.get('name', card.type_id)}.")
@@ -317,6 +338,7 @@ class Engine:
                 # Discard down to hand size, remove damage, end "until end of turn" effects
                 # For MVP, just clear mana pool and reset lands played
                 active_player.properties['lands_played_this_turn'] = 0
+                combat_handlers.reset_token_combat_state(self.graph)
                 active_player.properties['mana_pool'] = {m: 0 for m in [self.id_mapper.get_id_by_name("Green Mana", "game_vocabulary"), self.id_mapper.get_id_by_name("Blue Mana", "game_vocabulary"), self.id_mapper.get_id_by_name("Black Mana", "game_vocabulary"), self.id_mapper.get_id_by_name("Red Mana", "game_vocabulary"), self.id_mapper.get_id_by_name("White Mana", "game_vocabulary"), self.id_mapper.get_id_by_name("Colorless Mana", "game_vocabulary"), self.id_mapper.get_id_by_name("Generic Mana", "game_vocabulary")]}
                 logger.info(f"Cleanup Step: {active_player.properties.get('name')}'s mana pool cleared and lands played reset.")
 
@@ -8,6 +8,8 @@ import uuid
 import random
 from typing import Dict, Any, List, Optional
 
+import numpy as np
+
 from . import card_database # Import the entire module to access card_data_loader
 from MTG_bot.utils.logger import setup_logger
 from MTG_bot.utils.id_to_name_mapper import IDToNameMapper
@@ -33,6 +35,70 @@ class Relationship:
         self.type_id: int = rel_type_id
         logger.debug(f"Created Relationship: {self.source} -> {self.target} (Type: {self.type_id})")
 
+# Columns of the per-token state array of a CompositeTokenEntity
+TOKEN_COUNTERS = 0 # +1/+1 counters
+TOKEN_DAMAGE = 1
+TOKEN_TAPPED = 2
+TOKEN_SUMMONING_SICK = 3
+TOKEN_ATTACKING = 4
+TOKEN_BLOCKING = 5
+TOKEN_STATE_SIZE = 6
+
+class CompositeTokenEntity(Entity):
+    """All identical tokens of one type controlled by one player, stored as a single entity.
+
+    The entity and its relationships stay constant in size however many tokens exist;
+    individual tokens only live as rows of the compact `tokens` state array.
+    """
+    def __init__(self, entity_type_id: int):
+        super().__init__(entity_type_id)
+        self.tokens: np.ndarray = np.zeros((0, TOKEN_STATE_SIZE), dtype=np.int16)
+        # Attackers blocked by this composite; the TOKEN_BLOCKING column holds 1 + index into this list.
+        self.blocked_attackers: List[uuid.UUID] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.tokens)
+
+    def add_tokens(self, count: int, summoning_sick: bool = True):
+        """Creates `count` new untapped tokens."""
+        new_tokens = np.zeros((count, TOKEN_STATE_SIZE), dtype=np.int16)
+        new_tokens[:, TOKEN_SUMMONING_SICK] = summoning_sick
+        self.tokens = np.concatenate([self.tokens, new_tokens])
+
+    def remove_tokens(self, indices: np.ndarray):
+        """Removes the tokens at the given row indices (e.g. tokens that died)."""
+        self.tokens = np.delete(self.tokens, indices, axis=0)
+
+    def token_power(self) -> np.ndarray:
+        return _token_base_stat(self.properties.get('power')) + self.tokens[:, TOKEN_COUNTERS]
+
+    def token_toughness(self) -> np.ndarray:
+        return _token_base_stat(self.properties.get('toughness')) + self.tokens[:, TOKEN_COUNTERS]
+
+    def ready_attackers(self) -> np.ndarray:
+        """Indices of tokens that can attack (untapped and not summoning sick)."""
+        return np.flatnonzero((self.tokens[:, TOKEN_TAPPED] == 0) & (self.tokens[:, TOKEN_SUMMONING_SICK] == 0) & (self.tokens[:, TOKEN_ATTACKING] == 0))
+
+    def ready_blockers(self) -> np.ndarray:
+        """Indices of untapped tokens that are not blocking yet."""
+        return np.flatnonzero((self.tokens[:, TOKEN_TAPPED] == 0) & (self.tokens[:, TOKEN_BLOCKING] == 0))
+
+    def blocking_tokens(self, attacker_id: uuid.UUID) -> np.ndarray:
+        """Indices of the tokens blocking the given attacker."""
+        if attacker_id not in self.blocked_attackers:
+            return np.zeros(0, dtype=np.intp)
+        return np.flatnonzero(self.tokens[:, TOKEN_BLOCKING] == self.blocked_attackers.index(attacker_id) + 1)
+
+    def select_tokens(self, candidates: np.ndarray, count: int) -> np.ndarray:
+        """Deterministically picks `count` of the candidate tokens, strongest (most counters) first."""
+        order = np.argsort(-self.tokens[candidates, TOKEN_COUNTERS], kind='stable')
+        return candidates[order[:count]]
+
+def _token_base_stat(value) -> int:
+    """Power/toughness can be '*' or None; treat those as 0."""
+    return value if isinstance(value, int) else 0
+
 class GameGraph:
     """The complete, graph-based representation of the game state.
     This object holds the entire "truth" of the game at a single point in time.
@@ -82,9 +148,9 @@ class GameGraph:
             rel = Relationship(card_entity.instance_id, zone_entity.instance_id, zone_rel_type)
             self.relationships.append(rel)
 
-    def add_entity(self, entity_type_id: int) -> Entity:
+    def add_entity(self, entity_type_id: int, entity_class: type = Entity) -> Entity:
         try:
-            entity = Entity(entity_type_id)
+            entity = entity_class(entity_type_id)
             # If the entity corresponds to a card, hydrate its static data.
             card_data = card_database.card_data_loader.get_card_data_by_id(entity_type_id)
             if card_data:
@@ -149,6 +215,39 @@ class GameGraph:
             logger.error(f"Error moving card {card.instance_id} to zone {target_zone.instance_id}: {e}", exc_info=True)
             raise
 
+    def create_tokens(self, player: Entity, token_type_id: int, count: int, token_properties: Optional[Dict[str, Any]] = None) -> CompositeTokenEntity:
+        """Puts `count` tokens onto a player's battlefield.
+
+        Tokens of the same type join the player's existing composite entity, so the graph
+        gains at most one entity and two relationships per token type.
+        `token_properties` defines tokens that have no card data (e.g. {'name': 'Goblin', 'power': 1, 'toughness': 1}).
+        """
+        logger.debug(f"Creating {count} tokens of type {token_type_id} for {self._get_entity_display_name(player)}.")
+        try:
+            controls_rel_type = self.id_mapper.get_id_by_name("Controlled By", "game_vocabulary")
+            control_rels = self.get_relationships(source=player, rel_type=controls_rel_type)
+            battlefield = next((self.entities[r.target] for r in control_rels if self.entities[r.target].type_id == self.id_mapper.get_id_by_name("Battlefield", "game_vocabulary")), None)
+            composite = next((self.entities[r.target] for r in control_rels if isinstance(self.entities[r.target], CompositeTokenEntity) and self.entities[r.target].type_id == token_type_id), None)
+
+            if composite is None:
+                composite = self.add_entity(token_type_id, entity_class=CompositeTokenEntity)
+                if token_properties:
+                    composite.properties.update(token_properties)
+                composite.properties.setdefault('is_creature', True)
+                composite.properties['is_token'] = True
+                self.add_relationship(player, composite, controls_rel_type)
+                self._move_card_to_zone(composite, battlefield)
+            composite.add_tokens(count)
+            return composite
+        except Exception as e:
+            logger.error(f"Error creating tokens of type {token_type_id}: {e}", exc_info=True)
+            raise
+
+    def _remove_entity(self, entity: Entity):
+        """Removes an entity and every relationship that touches it."""
+        self.relationships = [r for r in self.relationships if r.source != entity.instance_id and r.target != entity.instance_id]
+        del self.entities[entity.instance_id]
+
     def _create_deck(self, player: Entity, decklist: List[int]) -> List[Entity]:
         """Creates card entities from a decklist and links them to the player."""
         logger.debug(f"Creating deck for player {player.properties.get('name', player.instance_id)[:4]} with {len(decklist)} cards.")
@@ -2,8 +2,16 @@
 This file will contain handlers related to the combat phase.
 """
 
-from ..game_graph import GameGraph
+from typing import List
+
+import numpy as np
+
+from ..game_graph import (
+    GameGraph, Entity, CompositeTokenEntity,
+    TOKEN_DAMAGE, TOKEN_TAPPED, TOKEN_SUMMONING_SICK, TOKEN_ATTACKING, TOKEN_BLOCKING,
+)
 from ..card_database import get_creature_stats
+from .. import vocabulary as vocab
 from MTG_bot.utils.logger import setup_logger
 from MTG_bot.utils.id_to_name_mapper import IDToNameMapper
 from MTG_bot import config
@@ -25,7 +33,8 @@ def get_legal_attackers(graph: GameGraph, player_id: str) -> list:
 
         battlefield_cards = [graph.entities[r.source] for r in graph.get_relationships(target=battlefield_zone_entity, rel_type=id_mapper.get_id_by_name("Is In Zone", "game_vocabulary"))]
         
-        creatures = [card for card in battlefield_cards if get_creature_stats(card.type_id)]
+        # Composite token entities attack through declare_token_attackers instead.
+        creatures = [card for card in battlefield_cards if not isinstance(card, CompositeTokenEntity) and get_creature_stats(card.type_id)]
 
         for creature in creatures:
             # Check for summoning sickness
@@ -57,7 +66,9 @@ def get_legal_blockers(graph: GameGraph, player_id: str) -> list:
             logger.debug("No battlefield found for player, no legal blockers.")
             return []
 
-        creatures = [card for card in battlefield_cards if get_creature_stats(card.type_id)]
+        battlefield_cards = [graph.entities[r.source] for r in graph.get_relationships(target=battlefield_zone_entity, rel_type=id_mapper.get_id_by_name("Is In Zone", "game_vocabulary"))]
+        # Composite token entities block through declare_token_blockers instead.
+        creatures = [card for card in battlefield_cards if not isinstance(card, CompositeTokenEntity) and get_creature_stats(card.type_id)]
 
         for creature in creatures:
             if not creature.properties.get('tapped', False):
@@ -86,11 +97,125 @@ def declare_attacker(graph: GameGraph, attacker):
         logger.error(f"Error declaring attacker {attacker.properties.get('name', attacker.type_id)}: {e}", exc_info=True)
         raise
 
+def get_composite_tokens(graph: GameGraph, player_id: str) -> List[CompositeTokenEntity]:
+    """Returns the composite token entities a player controls."""
+    player = graph.entities[player_id]
+    control_rels = graph.get_relationships(source=player, rel_type=id_mapper.get_id_by_name("Controlled By", "game_vocabulary"))
+    return [graph.entities[r.target] for r in control_rels if isinstance(graph.entities[r.target], CompositeTokenEntity)]
+
+def token_count_options(available: int) -> List[int]:
+    """
+    The token counts offered as separate moves for a composite: one, half or all of the
+    available tokens. This keeps move generation constant however many tokens exist.
+    """
+    return sorted({count for count in (1, available // 2, available) if count > 0})
+
+def declare_token_attackers(graph: GameGraph, composite: CompositeTokenEntity, count: int):
+    """Declares `count` ready tokens of a composite as attackers, tapping them unless they have vigilance."""
+    logger.info(f"Declaring {count} attacking tokens: {composite.properties.get('name', composite.type_id)} ({composite.type_id})")
+    try:
+        attackers = composite.select_tokens(composite.ready_attackers(), count)
+        composite.tokens[attackers, TOKEN_ATTACKING] = 1
+        if vocab.ID_ABILITY_VIGILANCE not in composite.properties.get('abilities', {}).get('keywords', []):
+            composite.tokens[attackers, TOKEN_TAPPED] = 1
+        composite.properties['is_attacking'] = True
+    except Exception as e:
+        logger.error(f"Error declaring token attackers {composite.properties.get('name', composite.type_id)}: {e}", exc_info=True)
+        raise
+
+def declare_token_blockers(graph: GameGraph, composite: CompositeTokenEntity, attacker: Entity, count: int):
+    """Declares `count` untapped tokens of a composite as blockers of one attacker."""
+    logger.info(f"Declaring {count} blocking tokens: {composite.properties.get('name', composite.type_id)} blocking {attacker.properties.get('name', attacker.type_id)}")
+    try:
+        if attacker.instance_id not in composite.blocked_attackers:
+            composite.blocked_attackers.append(attacker.instance_id)
+            graph.add_relationship(composite, attacker, id_mapper.get_id_by_name("Blocking", "game_vocabulary"))
+        blockers = composite.select_tokens(composite.ready_blockers(), count)
+        composite.tokens[blockers, TOKEN_BLOCKING] = composite.blocked_attackers.index(attacker.instance_id) + 1
+    except Exception as e:
+        logger.error(f"Error declaring token blockers {composite.properties.get('name', composite.type_id)}: {e}", exc_info=True)
+        raise
+
+def untap_tokens(composite: CompositeTokenEntity):
+    """Untaps all tokens of a composite and removes their summoning sickness."""
+    composite.tokens[:, TOKEN_TAPPED] = 0
+    composite.tokens[:, TOKEN_SUMMONING_SICK] = 0
+
+def reset_token_combat_state(graph: GameGraph):
+    """Removes damage and attacking/blocking state from all tokens at the end of the turn."""
+    for composite in [e for e in graph.entities.values() if isinstance(e, CompositeTokenEntity)]:
+        composite.tokens[:, [TOKEN_DAMAGE, TOKEN_ATTACKING, TOKEN_BLOCKING]] = 0
+        composite.blocked_attackers = []
+        composite.properties['is_attacking'] = False
+
+def _damage_tokens(composite: CompositeTokenEntity, indices: np.ndarray, damage: int):
+    """Assigns damage to tokens in order, lethal damage to each before moving on to the next."""
+    toughness = composite.token_toughness()
+    for position, i in enumerate(indices):
+        if damage <= 0:
+            break
+        lethal = max(int(toughness[i] - composite.tokens[i, TOKEN_DAMAGE]), 0)
+        dealt = damage if position == len(indices) - 1 else min(damage, lethal)
+        composite.tokens[i, TOKEN_DAMAGE] += dealt
+        damage -= dealt
+
+def _remove_dead_tokens(graph: GameGraph):
+    """Tokens with lethal damage cease to exist; empty composites leave the graph."""
+    for composite in [e for e in graph.entities.values() if isinstance(e, CompositeTokenEntity)]:
+        dead = np.flatnonzero(composite.tokens[:, TOKEN_DAMAGE] >= composite.token_toughness())
+        if len(dead):
+            composite.remove_tokens(dead)
+            logger.info(f"{len(dead)} {composite.properties.get('name', composite.type_id)} tokens died. {composite.count} remain.")
+        if composite.count == 0:
+            graph._remove_entity(composite)
+
+def _blocker_power(blocker: Entity, attacker: Entity) -> int:
+    """Damage a blocking creature (or all tokens of a composite blocking this attacker) deals."""
+    if isinstance(blocker, CompositeTokenEntity):
+        return int(blocker.token_power()[blocker.blocking_tokens(attacker.instance_id)].sum())
+    return blocker.properties.get('effective_power', get_creature_stats(blocker.type_id).get('power', 0))
+
+def _assign_token_attack_damage(graph: GameGraph, composite: CompositeTokenEntity, defending_player: Entity):
+    """Each blocking creature (or blocking token) blocks one attacking token; unblocked tokens hit the player."""
+    attacking = np.flatnonzero(composite.tokens[:, TOKEN_ATTACKING])
+    power = composite.token_power()
+    abilities = composite.properties.get('abilities', {}).get('keywords', [])
+    controller = next((graph.entities[r.source] for r in graph.get_relationships(target=composite, rel_type=id_mapper.get_id_by_name("Controlled By", "game_vocabulary"))), None)
+
+    blocking_units = []
+    for r in graph.get_relationships(target=composite, rel_type=id_mapper.get_id_by_name("Blocking", "game_vocabulary")):
+        blocker = graph.entities[r.source]
+        if isinstance(blocker, CompositeTokenEntity):
+            blocking_units.extend((blocker, i) for i in blocker.blocking_tokens(composite.instance_id))
+        else:
+            blocking_units.append((blocker, None))
+
+    blocked, unblocked = attacking[:len(blocking_units)], attacking[len(blocking_units):]
+    damage_to_player = int(power[unblocked].sum())
+    if defending_player and damage_to_player:
+        defending_player.properties['life_total'] -= damage_to_player
+        logger.info(f"{len(unblocked)} unblocked {composite.properties.get('name', composite.type_id)} tokens deal {damage_to_player} damage to {defending_player.properties.get('name', defending_player.type_id)}.")
+
+    total_dealt = damage_to_player
+    for token_index, (blocker, blocker_token) in zip(blocked, blocking_units):
+        token_power = int(power[token_index])
+        if blocker_token is None:
+            blocker.properties['damage_taken'] = blocker.properties.get('damage_taken', 0) + token_power
+            blocker_power = blocker.properties.get('effective_power', get_creature_stats(blocker.type_id).get('power', 0))
+        else:
+            _damage_tokens(blocker, np.array([blocker_token]), token_power)
+            blocker_power = int(blocker.token_power()[blocker_token])
+        _damage_tokens(composite, np.array([token_index]), blocker_power)
+        total_dealt += token_power
+
+    if vocab.ID_ABILITY_LIFELINK in abilities and controller:
+        controller.properties['life_total'] += total_dealt
+
 def assign_combat_damage(graph: GameGraph):
     """Assigns all combat damage from attackers to blockers and players."""
     logger.info("Assigning combat damage...")
     try:
-        all_creatures = [c for c in graph.entities.values() if get_creature_stats(c.type_id)]
+        all_creatures = [c for c in graph.entities.values() if not isinstance(c, CompositeTokenEntity) and get_creature_stats(c.type_id)]
         attacking_creatures = [c for c in all_creatures if c.properties.get('is_attacking', False)]
         defending_player = next((p for p in graph.entities.values() if p.type_id == id_mapper.get_id_by_name("Player", "game_vocabulary") and p.instance_id != graph.active_player_id), None)
 
@@ -112,10 +237,13 @@ def assign_combat_damage(graph: GameGraph):
                 # Blocked: Deal damage to blocker(s)
                 # (Simplification: assumes one blocker)
                 blocker = blockers[0]
-                blocker_power = blocker.properties.get('effective_power', get_creature_stats(blocker.type_id).get('power', 0))
+                blocker_power = _blocker_power(blocker, attacker)
 
                 # Attacker deals damage to blocker
-                blocker.properties['damage_taken'] = blocker.properties.get('damage_taken', 0) + attacker_power
+                if isinstance(blocker, CompositeTokenEntity):
+                    _damage_tokens(blocker, blocker.blocking_tokens(attacker.instance_id), attacker_power)
+                else:
+                    blocker.properties['damage_taken'] = blocker.properties.get('damage_taken', 0) + attacker_power
                 logger.info(f"{attacker.properties.get('name', attacker.type_id)} ({attacker.type_id}) deals {attacker_power} damage to {blocker.properties.get('name', blocker.type_id)} ({blocker.type_id}).")
                 if id_mapper.get_id_by_name("Lifelink", "game_vocabulary") in attacker_abilities and attacker_controller:
                     attacker_controller.properties['life_total'] += attacker_power
@@ -124,6 +252,10 @@ def assign_combat_damage(graph: GameGraph):
                 # Blocker deals damage to attacker
                 attacker.properties['damage_taken'] = attacker.properties.get('damage_taken', 0) + blocker_power
                 logger.info(f"{blocker.properties.get('name', blocker.type_id)} ({blocker.type_id}) deals {blocker_power} damage to {attacker.properties.get('name', attacker.type_id)} ({attacker.type_id}).")
+
+        for composite in [c for c in graph.entities.values() if isinstance(c, CompositeTokenEntity) and c.properties.get('is_attacking')]:
+            _assign_token_attack_damage(graph, composite, defending_player)
+        _remove_dead_tokens(graph)
     except Exception as e:
         logger.error(f"Error assigning combat damage: {e}", exc_info=True)
         raise
\ No newline at end of file
@@ -0,0 +1,102 @@
+import unittest
+
+from MTG_bot.rule_engine import game_initializer
+from MTG_bot.rule_engine import vocabulary as vocab
+from MTG_bot.rule_engine.actions import DeclareTokenAttackersAction
+from MTG_bot.rule_engine.card_database import card_data_loader
+from MTG_bot.rule_engine.engine import Engine
+from MTG_bot.rule_engine.game_graph import CompositeTokenEntity, TOKEN_ATTACKING, TOKEN_TAPPED
+from MTG_bot.rule_engine.handlers import combat_handlers
+from MTG_bot.strategic_brain import entity_encoder as ee
+
+GOBLIN = {'name': 'Goblin Token', 'power': 1, 'toughness': 1, 'is_creature': True}
+GOBLIN_TYPE_ID = 100000
+CLERIC = {'name': 'Cleric Token', 'power': 1, 'toughness': 1, 'is_creature': True,
+          'abilities': {'keywords': [vocab.ID_ABILITY_VIGILANCE, vocab.ID_ABILITY_LIFELINK], 'mana_abilities': []}}
+CLERIC_TYPE_ID = 100001
+
+class TestCompositeTokens(unittest.TestCase):
+
+    def setUp(self):
+        forest = card_data_loader.get_card_id_by_name("Forest")
+        self.dreadmaw_id = card_data_loader.get_card_id_by_name("Colossal Dreadmaw")
+        self.graph = game_initializer.initialize_game_state(
+            decklist1=[forest] * 20,
+            decklist2=[forest] * 10 + [self.dreadmaw_id] * 10,
+            shuffle=False,
+        )
+        self.engine = Engine(self.graph)
+        self.player1, self.player2 = (self.graph.entities[p] for p in self.graph.players)
+
+    def test_token_flood_is_one_entity(self):
+        """Creating more tokens of a type grows the state array, not the graph."""
+        composite = self.graph.create_tokens(self.player1, GOBLIN_TYPE_ID, 10, GOBLIN)
+        num_entities, num_relationships = len(self.graph.entities), len(self.graph.relationships)
+        same = self.graph.create_tokens(self.player1, GOBLIN_TYPE_ID, 290, GOBLIN)
+        self.assertIs(same, composite)
+        self.assertIsInstance(composite, CompositeTokenEntity)
+        self.assertEqual(composite.count, 300)
+        self.assertEqual((len(self.graph.entities), len(self.graph.relationships)), (num_entities, num_relationships))
+
+        tokens = ee.EntityTokenEncoder().encode(self.graph, perspective_id=self.player1.instance_id)
+        self.assertEqual(len(tokens.type_ids), num_entities)
+        row = list(tokens.type_ids).index(GOBLIN_TYPE_ID + ee.TYPE_ID_OFFSET)
+        self.assertEqual(tokens.features[row, ee.TOKEN_FEATURES.index("token_count")], 300)
+        self.assertEqual(tokens.features[row, ee.TOKEN_FEATURES.index("power")], 300)
+
+    def test_attack_moves_are_bounded(self):
+        """Attack moves for a composite are offered by count, not per token."""
+        composite = self.graph.create_tokens(self.player1, GOBLIN_TYPE_ID, 200, GOBLIN)
+        combat_handlers.untap_tokens(composite)
+        self.graph.step = vocab.ID_STEP_DECLARE_ATTACKERS
+        moves = [m for m in self.engine.get_legal_moves() if isinstance(m, DeclareTokenAttackersAction)]
+        self.assertEqual(sorted(m.count for m in moves), [1, 100, 200])
+
+        combat_handlers.declare_token_attackers(self.graph, composite, 150)
+        self.assertEqual(int(composite.tokens[:, TOKEN_ATTACKING].sum()), 150)
+        self.assertEqual(len(composite.ready_attackers()), 50)
+
+    def test_combat_damage(self):
+        """Blocked tokens trade with their blocker, unblocked tokens hit the player, dead tokens leave."""
+        composite = self.graph.create_tokens(self.player1, GOBLIN_TYPE_ID, 10, GOBLIN)
+        combat_handlers.untap_tokens(composite)
+        combat_handlers.declare_token_attackers(self.graph, composite, 10)
+
+        dreadmaw = self.graph.add_entity(self.dreadmaw_id)
+        self.graph.add_relationship(dreadmaw, composite, vocab.ID_REL_BLOCKING)
+        life_before = self.player2.properties['life_total']
+        combat_handlers.assign_combat_damage(self.graph)
+
+        self.assertEqual(self.player2.properties['life_total'], life_before - 9)
+        self.assertEqual(dreadmaw.properties['damage_taken'], 1)
+        self.assertEqual(composite.count, 9)
+
+        # Tokens blocking a creature share its damage in order and die as a group.
+        defenders = self.graph.create_tokens(self.player2, GOBLIN_TYPE_ID, 8, GOBLIN)
+        attacker = self.graph.add_entity(self.dreadmaw_id)
+        attacker.properties['is_attacking'] = True
+        combat_handlers.declare_token_blockers(self.graph, defenders, attacker, 4)
+        composite.properties['is_attacking'] = False
+        combat_handlers.assign_combat_damage(self.graph)
+        self.assertEqual(defenders.count, 4)
+        self.assertEqual(attacker.properties['damage_taken'], 4)
+
+    def test_vigilance_and_lifelink(self):
+        """Vigilant tokens attack without tapping; lifelink tokens gain their controller the damage dealt."""
+        clerics = self.graph.create_tokens(self.player1, CLERIC_TYPE_ID, 4, CLERIC)
+        goblins = self.graph.create_tokens(self.player1, GOBLIN_TYPE_ID, 4, GOBLIN)
+        for composite in (clerics, goblins):
+            combat_handlers.untap_tokens(composite)
+            combat_handlers.declare_token_attackers(self.graph, composite, 4)
+        self.assertEqual(int(clerics.tokens[:, TOKEN_TAPPED].sum()), 0)
+        self.assertEqual(int(goblins.tokens[:, TOKEN_TAPPED].sum()), 4)
+
+        goblins.properties['is_attacking'] = False
+        life_before = self.player1.properties['life_total'], self.player2.properties['life_total']
+        combat_handlers.assign_combat_damage(self.graph)
+        self.assertEqual(self.player1.properties['life_total'], life_before[0] + 4)
+        self.assertEqual(self.player2.properties['life_total'], life_before[1] - 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
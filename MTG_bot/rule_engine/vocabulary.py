@@ -0,0 +1,87 @@
+"""
+Integer constants for the game vocabulary.
+
+The IDs themselves live in the `game_vocabulary` table of mtg_bot.db. This module
+reads the table once at import time so that hot paths (state encoders, search)
+can compare plain ints instead of issuing a SQLite query for every lookup.
+Terms that are not in the table yet resolve to None.
+"""
+
+import sqlite3
+from typing import Dict, Optional
+
+from MTG_bot import config
+
+def _load_vocabulary(db_path: str) -> Dict[str, int]:
+    """Returns a name -> id mapping for every non-setting vocabulary entry."""
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    cursor.execute("SELECT id, name FROM game_vocabulary WHERE type != 'game_setting'")
+    ids = {name: _id for _id, name in cursor.fetchall()}
+    conn.close()
+    return ids
+
+_VOCABULARY = _load_vocabulary(config.MTG_BOT_DB_PATH)
+
+def get_id(name: str) -> Optional[int]:
+    """Returns the vocabulary ID for a name, or None if it is not defined."""
+    return _VOCABULARY.get(name)
+
+# --- Entities ---
+ID_PLAYER = get_id("Player")
+ID_CREATURE = get_id("Creature")
+
+# --- Zones ---
+ID_ZONE_HAND = get_id("Hand")
+ID_ZONE_BATTLEFIELD = get_id("Battlefield")
+ID_ZONE_LIBRARY = get_id("Library")
+ID_ZONE_GRAVEYARD = get_id("Graveyard")
+ID_ZONE_STACK = get_id("Stack")
+ID_ZONE_EXILE = get_id("Exile")
+
+# --- Relationships ---
+ID_REL_CONTROLS = get_id("Controlled By")
+ID_REL_IS_IN_ZONE = get_id("Is In Zone")
+ID_REL_BLOCKING = get_id("Blocking")
+ID_REL_HAS_ABILITY = get_id("Has Ability")
+ID_REL_ENCHANTED_BY = get_id("Enchanted By")
+
+# --- Phases ---
+ID_PHASE_MULLIGAN = get_id("Mulligan Phase")
+ID_PHASE_BEGINNING = get_id("Beginning Phase")
+ID_PHASE_MAIN1 = get_id("Pre-Combat Main Phase")
+ID_PHASE_COMBAT = get_id("Combat Phase")
+ID_PHASE_MAIN2 = get_id("Post-Combat Main Phase")
+ID_PHASE_ENDING = get_id("Ending Phase")
+
+# --- Steps ---
+ID_STEP_MULLIGAN = get_id("Mulligan Step")
+ID_STEP_UNTAP = get_id("Untap Step")
+ID_STEP_UPKEEP = get_id("Upkeep Step")
+ID_STEP_DRAW = get_id("Draw Step")
+ID_STEP_MAIN1 = get_id("Pre-Combat Main Step")
+ID_STEP_BEGINNING_OF_COMBAT = get_id("Beginning of Combat Step")
+ID_STEP_DECLARE_ATTACKERS = get_id("Declare Attackers Step")
+ID_STEP_DECLARE_BLOCKERS = get_id("Declare Blockers Step")
+ID_STEP_COMBAT_DAMAGE = get_id("Combat Damage Step")
+ID_STEP_END_OF_COMBAT = get_id("End of Combat Step")
+ID_STEP_MAIN2 = get_id("Post-Combat Main Step")
+ID_STEP_END_OF_TURN = get_id("End of Turn Step")
+ID_STEP_CLEANUP = get_id("Cleanup Step")
+
+# --- Mana ---
+ID_MANA_GREEN = get_id("Green Mana")
+ID_MANA_BLUE = get_id("Blue Mana")
+ID_MANA_BLACK = get_id("Black Mana")
+ID_MANA_RED = get_id("Red Mana")
+ID_MANA_WHITE = get_id("White Mana")
+ID_MANA_COLORLESS = get_id("Colorless Mana")
+ID_MANA_GENERIC = get_id("Generic Mana")
+
+# --- Keyword abilities ---
+ID_ABILITY_FLYING = get_id("Flying")
+ID_ABILITY_REACH = get_id("Reach")
+ID_ABILITY_VIGILANCE = get_id("Vigilance")
+ID_ABILITY_LIFELINK = get_id("Lifelink")
+ID_ABILITY_FIRST_STRIKE = get_id("First Strike")
+ID_ABILITY_HASTE = get_id("Haste")
@@ -0,0 +1,160 @@
+"""
+Detects the opponent's deck archetype from the cards they have revealed.
+
+Every deck in the `decks`/`deck_cards` tables is precomputed into a signature: the
+smoothed log-frequency of each card in the deck. Revealed cards then update a
+log-posterior over all decks with a single vector add per card.
+"""
+
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..rule_engine.card_database import card_data_loader
+from MTG_bot import config
+from MTG_bot.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+@dataclass
+class DeckSignatures:
+    """Per-deck card counts over the union of all cards that appear in any deck."""
+    deck_ids: np.ndarray # [D]
+    deck_names: List[str]
+    card_names: List[str] # [V] column order of `counts`
+    counts: np.ndarray # [D, V] int32
+
+    @classmethod
+    def from_database(cls, db_path: str = config.MTG_BOT_DB_PATH, game_mode: Optional[str] = None) -> "DeckSignatures":
+        """Reads all decks (optionally only those of one format) from the database."""
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+        query = """
+            SELECT d.deck_id, d.deck_name, c.name, dc.quantity
+            FROM decks d
+            JOIN deck_cards dc ON dc.deck_id = d.deck_id
+            JOIN cards c ON c.card_id = dc.card_id
+        """
+        if game_mode:
+            cursor.execute(query + " WHERE d.format = ? ORDER BY d.deck_id", (game_mode,))
+        else:
+            cursor.execute(query + " ORDER BY d.deck_id")
+        rows = cursor.fetchall()
+        conn.close()
+
+        deck_index: Dict[int, int] = {}
+        deck_names: List[str] = []
+        card_index: Dict[str, int] = {}
+        entries = []
+        for deck_id, deck_name, card_name, quantity in rows:
+            if deck_id not in deck_index:
+                deck_index[deck_id] = len(deck_index)
+                deck_names.append(deck_name)
+            column = card_index.setdefault(card_name, len(card_index))
+            entries.append((deck_index[deck_id], column, quantity))
+
+        counts = np.zeros((len(deck_index), len(card_index)), dtype=np.int32)
+        for row, column, quantity in entries:
+            counts[row, column] += quantity
+        logger.info(f"Built signatures for {len(deck_index)} decks over {len(card_index)} distinct cards.")
+        return cls(np.array(list(deck_index), dtype=np.int64), deck_names, list(card_index), counts)
+
+class ArchetypeClassifier:
+    """
+    Ranked posterior over known decks given the opponent's revealed cards.
+
+    Each deck is treated as a distribution over its cards (with additive smoothing so an
+    off-list card does not rule a deck out). The log-likelihood table is stored card-major,
+    so observing a card adds one contiguous row to the running log-posterior.
+    """
+    def __init__(self, signatures: DeckSignatures, smoothing: float = 0.5, prior: Optional[np.ndarray] = None):
+        self.signatures = signatures
+        counts = signatures.counts.astype(np.float64)
+        num_cards = counts.shape[1] + 1 # One extra column for cards that are in no known deck
+        denominators = counts.sum(axis=1, keepdims=True) + smoothing * num_cards
+        log_likelihood = np.log(np.concatenate([counts + smoothing, np.full((len(counts), 1), smoothing)], axis=1) / denominators)
+        self._log_likelihood = np.ascontiguousarray(log_likelihood.T) # [V + 1, D]
+        self._frequencies = np.exp(log_likelihood[:, :-1]) # [D, V]
+        self._unknown_column = num_cards - 1
+        self._column_by_name = {name: i for i, name in enumerate(signatures.card_names)}
+        self._column_by_type_id: Dict[int, int] = {}
+        self._log_prior = np.log(prior) if prior is not None else np.zeros(len(counts))
+        self.reset()
+
+    @classmethod
+    def from_database(cls, db_path: str = config.MTG_BOT_DB_PATH, game_mode: Optional[str] = None, **kwargs) -> "ArchetypeClassifier":
+        return cls(DeckSignatures.from_database(db_path, game_mode), **kwargs)
+
+    def reset(self):
+        """Forgets all observed cards (e.g. at the start of a new game)."""
+        self.log_posterior = self._log_prior.copy()
+        self.num_observed = 0
+
+    def _column(self, card_type_id: int) -> int:
+        """Maps an entity type_id to a signature column via the card name (cached)."""
+        column = self._column_by_type_id.get(card_type_id)
+        if column is None:
+            name = card_data_loader.get_card_data_by_id(card_type_id).get('name')
+            column = self._column_by_name.get(name, self._unknown_column)
+            self._column_by_type_id[card_type_id] = column
+        return column
+
+    def observe(self, card_type_id: int):
+        """Updates the posterior with one revealed card."""
+        self.log_posterior += self._log_likelihood[self._column(card_type_id)]
+        self.num_observed += 1
+
+    def observe_name(self, card_name: str):
+        self.log_posterior += self._log_likelihood[self._column_by_name.get(card_name, self._unknown_column)]
+        self.num_observed += 1
+
+    def posterior(self) -> np.ndarray:
+        """Normalized posterior over decks, in signature order."""
+        weights = np.exp(self.log_posterior - self.log_posterior.max())
+        return weights / weights.sum()
+
+    def ranked(self, top_k: Optional[int] = None) -> List[Tuple[str, float]]:
+        """Archetype names with their posterior probability, most likely first."""
+        by_name: Dict[str, float] = {}
+        for name, probability in zip(self.signatures.deck_names, self.posterior().tolist()):
+            by_name[name] = by_name.get(name, 0.0) + probability
+        ranking = sorted(by_name.items(), key=lambda item: item[1], reverse=True)
+        return ranking[:top_k] if top_k else ranking
+
+    def card_prior(self) -> Dict[int, float]:
+        """
+        Expected frequency of each loader card under the current posterior, e.g. as the
+        `prior` of BeliefTracker.sample.
+        """
+        expected = self.posterior() @ self._frequencies
+        prior = {}
+        for name, frequency in zip(self.signatures.card_names, expected.tolist()):
+            card_id = card_data_loader.get_card_id_by_name(name)
+            if card_id is not None:
+                prior[card_id] = frequency
+        return prior
+
+def benchmark(num_decks: int = 5000, num_cards: int = 2000, cards_per_deck: int = 20, num_observations: int = 10_000):
+    """Prints the per-card update cost against a synthetic pool of decks."""
+    rng = np.random.default_rng(0)
+    counts = np.zeros((num_decks, num_cards), dtype=np.int32)
+    for row in range(num_decks):
+        counts[row, rng.choice(num_cards, cards_per_deck, replace=False)] = rng.integers(1, 5, cards_per_deck)
+    names = [f"card_{i}" for i in range(num_cards)]
+    signatures = DeckSignatures(np.arange(num_decks), [f"deck_{i}" for i in range(num_decks)], names, counts)
+    classifier = ArchetypeClassifier(signatures)
+
+    observed = rng.choice(names, num_observations).tolist()
+    start = time.perf_counter()
+    for name in observed:
+        classifier.observe_name(name)
+    per_card = (time.perf_counter() - start) / num_observations
+    start = time.perf_counter()
+    classifier.ranked(5)
+    print(f"{num_decks} decks: {per_card * 1e6:.1f} us per observed card, ranking in {(time.perf_counter() - start) * 1e3:.2f} ms")
+
+if __name__ == "__main__":
+    benchmark()
@@ -2,15 +2,54 @@
 This module is responsible for converting card data into numerical vectors (embeddings).
 These embeddings are the foundation of the Strategic Brain, allowing it to understand
 card similarity and synergy.
+
+Embeddings are computed once by an offline job (`python -m MTG_bot.strategic_brain.card_embedder`)
+and stored as a raw float32 matrix that every worker maps read-only with np.memmap.
 """
 
 import json
-from typing import Dict
+import os
+import sqlite3
+import zlib
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
 from .. import config
+from ..rule_engine.card_database import card_data_loader
+from ..rule_engine.card_data_loader import CardDataLoader
+from ..rule_engine import vocabulary as vocab
+from MTG_bot.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
 
-# It's recommended to use a pre-trained transformer model for this task.
+# It's recommended to use a pre-trained transformer model for the optional text features.
 # from sentence_transformers import SentenceTransformer
 
+# --- Structured feature layout ---
+CARD_TYPES = ("Land", "Creature", "Artifact", "Enchantment", "Instant", "Sorcery", "Planeswalker")
+COLORS = ("W", "U", "B", "R", "G")
+COLOR_MANA = (vocab.ID_MANA_WHITE, vocab.ID_MANA_BLUE, vocab.ID_MANA_BLACK, vocab.ID_MANA_RED, vocab.ID_MANA_GREEN)
+KEYWORDS = (
+    "flying", "reach", "vigilance", "lifelink", "deathtouch", "trample", "haste", "first strike",
+    "double strike", "menace", "defender", "flash", "hexproof", "indestructible", "prowess",
+    "protection", "enchant", "equip", "scry", "mill", "fight", "treasure",
+)
+EFFECT_TYPES = (
+    "keyword", "activated_ability", "triggered_ability", "add_counter", "gain_life",
+    "temporary_stat_modifier", "protection", "search_library", "counter", "choice", "destroy", "deal_damage",
+)
+NUM_SUBTYPE_BUCKETS = 16 # Creature/spell subtypes are feature-hashed (tribal synergies)
+
+FEATURE_NAMES = (
+    [f"type:{t}" for t in CARD_TYPES]
+    + [f"color:{c}" for c in COLORS] + ["colorless"]
+    + ["cmc"] + [f"pips:{c}" for c in COLORS] + ["power", "toughness", "variable_pt", "loyalty"]
+    + [f"keyword:{k}" for k in KEYWORDS]
+    + [f"effect:{e}" for e in EFFECT_TYPES] + ["life_gained", "counters_added"]
+    + [f"subtype:{i}" for i in range(NUM_SUBTYPE_BUCKETS)]
+)
+
 def load_card_database() -> Dict:
     """Loads the MTGJSON database file."""
     with open(config.MTGJSON_PATH, 'r', encoding='utf-8') as f:
@@ -20,32 +59,158 @@ def load_card_database() -> Dict:
     print("MTGJSON database loaded conceptually.")
     return all_printings
 
-def create_card_embeddings(cards: Dict) -> Dict[str, list]:
+def load_effects_by_name(db_path: str = config.MTG_BOT_DB_PATH) -> Dict[str, List[Dict]]:
+    """Returns the parsed `effects_json` of every card in the database, keyed by card name."""
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    cursor.execute("SELECT name, effects_json FROM cards")
+    effects = {name: json.loads(effects_json) if effects_json else [] for name, effects_json in cursor.fetchall()}
+    conn.close()
+    return effects
+
+def _subtype_bucket(subtype: str) -> int:
+    # crc32 instead of hash() so buckets are stable across processes.
+    return zlib.crc32(subtype.encode("utf-8")) % NUM_SUBTYPE_BUCKETS
+
+def card_features(card_data: Dict, effects: Sequence[Dict]) -> np.ndarray:
+    """Builds the structured (unscaled) feature vector of one card."""
+    type_line = card_data.get("type_line") or ""
+    colors = card_data.get("colors") or []
+    mana_cost = card_data.get("mana_cost") or {}
+    power, toughness = card_data.get("power"), card_data.get("toughness")
+    keywords = {k.lower() for k in card_data.get("keyword_names", [])}
+    keywords.update(e.get("keyword", "").lower() for e in effects if e.get("ability_type") == "keyword")
+    effect_types = [e.get("ability_type") for e in effects]
+
+    subtypes = type_line.split("—")[1].split() if "—" in type_line else []
+    subtype_counts = [0.0] * NUM_SUBTYPE_BUCKETS
+    for subtype in subtypes:
+        subtype_counts[_subtype_bucket(subtype)] += 1.0
+
+    values = (
+        [float(card_type in type_line) for card_type in CARD_TYPES]
+        + [float(color in colors) for color in COLORS] + [float(not colors)]
+        + [float(card_data.get("cmc") or 0)] + [float(mana_cost.get(mana_id, 0)) for mana_id in COLOR_MANA]
+        + [float(power) if isinstance(power, int) else 0.0, float(toughness) if isinstance(toughness, int) else 0.0,
+           float(power is not None and not isinstance(power, int)), float(card_data.get("loyalty") or 0)]
+        + [float(keyword in keywords) for keyword in KEYWORDS]
+        + [float(effect_types.count(effect_type)) for effect_type in EFFECT_TYPES]
+        + [float(sum(e.get("amount", 0) for e in effects if e.get("ability_type") == "gain_life" and isinstance(e.get("amount"), int))),
+           float(sum(e.get("count", 1) for e in effects if e.get("ability_type") == "add_counter" and isinstance(e.get("count", 1), int)))]
+        + subtype_counts
+    )
+    return np.array(values, dtype=np.float32)
+
+def create_card_embeddings(loader: CardDataLoader = card_data_loader, text_encoder: Optional[Callable[[List[str]], np.ndarray]] = None) -> Tuple[np.ndarray, np.ndarray, List[str]]:
     """
-    Generates semantic vector embeddings for each card.
+    Generates vector embeddings for every card known to the CardDataLoader.
 
-    The embedding should capture the card's function, type, and abilities.
-    A good input for the model would be a string like:
+    Structured features are divided by their column-wise maximum. If `text_encoder` is given
+    (a callable mapping a list of strings to an [N, T] array, e.g. a sentence-transformer),
+    its L2-normalized output for the string
     "[TYPE] Creature - Goblin Warrior. [MANA] 1R. [TEXT] Haste. Whenever this attacks..."
-
-    Args:
-        cards: A dictionary of card data from the database.
+    is appended.
 
     Returns:
-        A dictionary mapping card names to their vector embeddings.
+        (card_ids [N], embeddings [N, D] float32, feature names [D])
+    """
+    logger.info("Generating card embeddings...")
+    effects_by_name = load_effects_by_name()
+    card_ids = np.array(sorted(loader.card_id_to_data), dtype=np.int64)
+    cards = [loader.card_id_to_data[card_id] for card_id in card_ids.tolist()]
+    features = np.stack([card_features(card, effects_by_name.get(card.get("name"), [])) for card in cards])
+    scale = np.abs(features).max(axis=0)
+    features /= np.where(scale > 0, scale, 1.0)
+    feature_names = list(FEATURE_NAMES)
+
+    if text_encoder is not None:
+        texts = [f"[TYPE] {card.get('type_line')}. [MANA] {card.get('cmc')}. [TEXT] {card.get('text')}" for card in cards]
+        text_features = np.asarray(text_encoder(texts), dtype=np.float32)
+        text_features /= np.maximum(np.linalg.norm(text_features, axis=1, keepdims=True), 1e-8)
+        features = np.concatenate([features, text_features], axis=1)
+        feature_names += [f"text:{i}" for i in range(text_features.shape[1])]
+
+    logger.info(f"Card embeddings generated for {len(card_ids)} cards ({features.shape[1]} dims).")
+    return card_ids, features.astype(np.float32), feature_names
+
+def card_ids_checksum(card_ids: Sequence[int], card_names: Sequence[Optional[str]]) -> int:
+    """CRC32 of the card_id -> name assignment, which changes whenever the loader renumbers cards."""
+    return zlib.crc32(json.dumps([[int(card_id), name] for card_id, name in zip(card_ids, card_names)]).encode("utf-8"))
+
+def save_embedding_store(path: str, card_ids: np.ndarray, embeddings: np.ndarray, feature_names: List[str], loader: CardDataLoader = card_data_loader):
     """
-    print("Generating card embeddings...")
-    # model = SentenceTransformer('all-MiniLM-L6-v2')
-    embeddings = {}
-    # for card_name, card_data in cards.items():
-    #     text_to_embed = f"[TYPE] {card_data['type_line']}. [MANA] {card_data['mana_cost']}. [TEXT] {card_data['text']}"
-    #     embedding = model.encode(text_to_embed)
-    #     embeddings[card_name] = embedding
-    print("Card embeddings generated conceptually.")
-    return embeddings
+    Writes embeddings as a dense matrix whose row r belongs to card_id = first_card_id + r
+    (rows of ids without a card stay zero). The card name of every id and a checksum of the
+    assignment are stored with the metadata, so a store built for other card ids is detected
+    on load. Files are written to a temporary name first so readers never map a half-written matrix.
+    """
+    first_card_id = int(card_ids.min())
+    matrix = np.zeros((int(card_ids.max()) - first_card_id + 1, embeddings.shape[1]), dtype=np.float32)
+    matrix[card_ids - first_card_id] = embeddings
+    card_names = [loader.get_card_data_by_id(int(card_id)).get("name") for card_id in card_ids]
+    metadata = {
+        "first_card_id": first_card_id,
+        "shape": list(matrix.shape),
+        "dtype": "float32",
+        "feature_names": feature_names,
+        "card_ids": [int(card_id) for card_id in card_ids],
+        "card_names": card_names,
+        "checksum": card_ids_checksum(card_ids, card_names),
+    }
+    matrix.tofile(path + ".f32.tmp")
+    with open(path + ".json.tmp", "w", encoding="utf-8") as f:
+        json.dump(metadata, f)
+    os.replace(path + ".f32.tmp", path + ".f32")
+    os.replace(path + ".json.tmp", path + ".json")
+    logger.info(f"Saved {matrix.shape} embedding matrix to {path}.f32")
+
+class CardEmbeddingStore:
+    """
+    Read-only, memory-mapped card embeddings indexed by card_id. Loading checks that the
+    loader still assigns the stored card names to the stored ids and raises a ValueError
+    for a stale store; rebuild it with the offline job.
+    """
+    def __init__(self, path: str = config.CARD_EMBEDDINGS_PATH, loader: CardDataLoader = card_data_loader):
+        with open(path + ".json", "r", encoding="utf-8") as f:
+            metadata = json.load(f)
+        card_ids = metadata.get("card_ids")
+        if card_ids is None:
+            raise ValueError(f"Embedding store {path} has no card names; rebuild it.")
+        current_names = [loader.get_card_data_by_id(card_id).get("name") for card_id in card_ids]
+        if card_ids_checksum(card_ids, current_names) != metadata["checksum"]:
+            changed = [(card_id, stored, current) for card_id, stored, current in zip(card_ids, metadata["card_names"], current_names) if stored != current]
+            raise ValueError(f"Embedding store {path} is stale: {len(changed)} card ids now belong to other cards "
+                             f"(e.g. {changed[:3]}); rebuild it.")
+        self.first_card_id: int = metadata["first_card_id"]
+        self.feature_names: List[str] = metadata["feature_names"]
+        # mode='r' maps the file without copying, so all processes share the same pages.
+        self.matrix = np.memmap(path + ".f32", dtype=metadata["dtype"], mode="r", shape=tuple(metadata["shape"]))
+
+    @property
+    def dim(self) -> int:
+        return self.matrix.shape[1]
+
+    def rows(self, card_ids) -> np.ndarray:
+        """Row indices of the given card ids in `matrix`; ids outside the store raise an IndexError."""
+        rows = np.asarray(card_ids, dtype=np.int64) - self.first_card_id
+        outside = (rows < 0) | (rows >= len(self.matrix))
+        if outside.any():
+            raise IndexError(f"Card ids {np.asarray(card_ids)[outside][:5].tolist()} are outside the embedding store "
+                             f"(ids {self.first_card_id}..{self.first_card_id + len(self.matrix) - 1}).")
+        return rows
+
+    def __getitem__(self, card_id: int) -> np.ndarray:
+        return self.matrix[self.rows(card_id)]
+
+    def gather(self, card_ids) -> np.ndarray:
+        """Embeddings of many cards as an [N, D] array."""
+        return self.matrix[self.rows(card_ids)]
 
 def entity_encoder(card_database):
     # TODO: How big should the entity vectors be? This will be a trade-off between expressiveness and computational cost.
     # This function should learn the archetypes of cards, not the specific cards themselves.
     # For example, it should learn that "Llanowar Elves" is a "mana dork" and that "mana dorks" are good early game.
     pass
+
+if __name__ == "__main__":
+    save_embedding_store(config.CARD_EMBEDDINGS_PATH, *create_card_embeddings())
@@ -0,0 +1,206 @@
+"""
+Approximate nearest-neighbour search over card embeddings.
+
+`opponent_predictor` maps a predicted entity encoding to candidate cards; with a large
+card pool an exact scan per MCTS determinization is too slow, so this module provides
+an inverted-file (IVF) index in pure NumPy: cards are clustered with spherical k-means
+and a query only scans the `nprobe` clusters whose centroids are closest to it.
+Similarity is cosine (vectors are L2-normalized on insert and on query).
+"""
+
+import time
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+
+from ..rule_engine.card_database import card_data_loader
+from .card_embedder import CardEmbeddingStore
+from MTG_bot.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+_QUERY_CHUNK = 256 # Queries scored together; bounds the gathered candidate block
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1.0)
+
+def _top_k(scores: np.ndarray, positions: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Row-wise top-k of a [Q, C] score matrix, best first."""
+    k_eff = min(k, scores.shape[1])
+    best = np.argpartition(-scores, k_eff - 1, axis=1)[:, :k_eff] if k_eff else np.zeros((len(scores), 0), dtype=np.int64)
+    best_scores = np.take_along_axis(scores, best, axis=1)
+    order = np.argsort(-best_scores, axis=1, kind='stable')
+    best = np.take_along_axis(best, order, axis=1)
+    best_scores = np.take_along_axis(best_scores, order, axis=1)
+    best_positions = np.take_along_axis(positions, best, axis=1)
+    best_positions[~np.isfinite(best_scores)] = -1
+
+    out_positions = np.full((len(scores), k), -1, dtype=np.int64)
+    out_scores = np.full((len(scores), k), -np.inf, dtype=np.float32)
+    out_positions[:, :k_eff] = best_positions
+    out_scores[:, :k_eff] = best_scores
+    return out_positions, out_scores
+
+def legal_card_ids(game_mode: str) -> np.ndarray:
+    """Loader card ids that MTGJSON lists as legal in the given format (e.g. "Commander")."""
+    fmt = game_mode.lower()
+    return np.array([card_id for card_id, data in card_data_loader.card_id_to_data.items() if data.get("legalities", {}).get(fmt) == "Legal"], dtype=np.int64)
+
+class CardIndex:
+    """IVF index over card embeddings, supporting batched and filtered top-k queries."""
+    def __init__(self, ids: np.ndarray, vectors: np.ndarray, centroids: np.ndarray, list_offsets: np.ndarray):
+        # Vectors are stored grouped by cluster: list l spans [list_offsets[l], list_offsets[l + 1]).
+        self.ids = ids
+        self.vectors = vectors
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+
+    @classmethod
+    def build(cls, ids, vectors, num_lists: Optional[int] = None, iterations: int = 10, sample_size: int = 50_000, seed: int = 0) -> "CardIndex":
+        """Clusters the vectors with spherical k-means (on a sample for large pools)."""
+        ids = np.asarray(ids, dtype=np.int64)
+        vectors = _normalize(vectors)
+        num_lists = num_lists or max(1, int(np.sqrt(len(vectors))))
+        rng = np.random.default_rng(seed)
+        sample = vectors[rng.choice(len(vectors), min(sample_size, len(vectors)), replace=False)]
+        if num_lists > len(sample):
+            logger.info(f"Reducing the IVF index from {num_lists} to {len(sample)} lists: only {len(sample)} vectors to cluster.")
+            num_lists = len(sample)
+        centroids = sample[rng.choice(len(sample), num_lists, replace=False)]
+        for _ in range(iterations):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            empty = ~sums.any(axis=1)
+            sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))] # Re-seed empty clusters
+            centroids = _normalize(sums)
+
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        order = np.argsort(assignment, kind='stable')
+        list_offsets = np.concatenate([[0], np.cumsum(np.bincount(assignment, minlength=num_lists))])
+        logger.info(f"Built IVF card index: {len(ids)} cards in {num_lists} lists.")
+        return cls(ids[order], vectors[order], centroids, list_offsets)
+
+    @classmethod
+    def from_store(cls, store: CardEmbeddingStore, **kwargs) -> "CardIndex":
+        """Indexes every card of an embedding store that has a non-zero embedding."""
+        matrix = np.asarray(store.matrix)
+        rows = np.flatnonzero(np.abs(matrix).sum(axis=1) > 0)
+        return cls.build(rows + store.first_card_id, matrix[rows], **kwargs)
+
+    def save(self, path: str):
+        np.savez(path, ids=self.ids, vectors=self.vectors, centroids=self.centroids, list_offsets=self.list_offsets)
+
+    @classmethod
+    def load(cls, path: str) -> "CardIndex":
+        with np.load(path if path.endswith(".npz") else path + ".npz") as data:
+            return cls(data["ids"], data["vectors"], data["centroids"], data["list_offsets"])
+
+    def _allowed_mask(self, allowed_ids: Optional[Iterable[int]]) -> Optional[np.ndarray]:
+        if allowed_ids is None:
+            return None
+        return np.isin(self.ids, np.fromiter(allowed_ids, dtype=np.int64) if not isinstance(allowed_ids, np.ndarray) else allowed_ids)
+
+    def exact_search(self, queries: np.ndarray, k: int = 10, allowed_ids: Optional[Iterable[int]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Brute-force top-k by cosine similarity. Returns (card ids [Q, k], scores [Q, k]), padded with -1/-inf."""
+        queries = _normalize(np.atleast_2d(queries))
+        mask = self._allowed_mask(allowed_ids)
+        positions = np.flatnonzero(mask) if mask is not None else np.arange(len(self.ids))
+        result_positions = np.empty((len(queries), k), dtype=np.int64)
+        result_scores = np.empty((len(queries), k), dtype=np.float32)
+        for start in range(0, len(queries), _QUERY_CHUNK):
+            chunk = queries[start:start + _QUERY_CHUNK]
+            scores = chunk @ self.vectors[positions].T
+            result_positions[start:start + len(chunk)], result_scores[start:start + len(chunk)] = _top_k(scores, np.broadcast_to(positions, scores.shape), k)
+        return self._to_ids(result_positions), result_scores
+
+    def search(self, queries: np.ndarray, k: int = 10, nprobe: int = 8, allowed_ids: Optional[Iterable[int]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Approximate top-k by cosine similarity over the `nprobe` nearest lists.
+
+        `allowed_ids` restricts results (format legality, cards still possible under the
+        belief tracker). If so few cards are allowed that the probed lists would hold
+        few of them, the allowed subset is scanned exactly instead.
+        """
+        queries = _normalize(np.atleast_2d(queries))
+        mask = self._allowed_mask(allowed_ids)
+        nprobe = min(nprobe, len(self.centroids))
+        if mask is not None and mask.sum() <= nprobe * len(self.ids) / len(self.centroids):
+            return self.exact_search(queries, k, self.ids[mask])
+
+        result_positions = np.empty((len(queries), k), dtype=np.int64)
+        result_scores = np.empty((len(queries), k), dtype=np.float32)
+        for start in range(0, len(queries), _QUERY_CHUNK):
+            chunk = queries[start:start + _QUERY_CHUNK]
+            result_positions[start:start + len(chunk)], result_scores[start:start + len(chunk)] = self._search_chunk(chunk, k, nprobe, mask)
+        return self._to_ids(result_positions), result_scores
+
+    def _search_chunk(self, queries: np.ndarray, k: int, nprobe: int, mask: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Scores a chunk of queries list by list: every probed list is one BLAS matmul
+        against the queries probing it, scattered into a padded [Q, candidates] matrix.
+        """
+        coarse = queries @ self.centroids.T
+        probes = np.argpartition(-coarse, nprobe - 1, axis=1)[:, :nprobe] if nprobe < coarse.shape[1] else np.tile(np.arange(coarse.shape[1]), (len(queries), 1))
+        lengths = self.list_offsets[probes + 1] - self.list_offsets[probes]
+        columns = np.cumsum(lengths, axis=1) - lengths # Start column of each probed list per query
+        width = max(int(lengths.sum(axis=1).max()), 1)
+        scores = np.full((len(queries), width), -np.inf, dtype=np.float32)
+        positions = np.full((len(queries), width), -1, dtype=np.int64)
+
+        probe_order = np.argsort(probes, axis=None, kind='stable')
+        sorted_lists = probes.ravel()[probe_order]
+        boundaries = np.flatnonzero(np.diff(sorted_lists)) + 1
+        for group in np.split(probe_order, boundaries):
+            if not len(group):
+                continue
+            list_id = probes.flat[group[0]]
+            start, end = self.list_offsets[list_id], self.list_offsets[list_id + 1]
+            if start == end:
+                continue
+            rows = group // probes.shape[1]
+            block = queries[rows] @ self.vectors[start:end].T
+            if mask is not None:
+                block[:, ~mask[start:end]] = -np.inf
+            cols = columns.flat[group][:, None] + np.arange(end - start)
+            scores[rows[:, None], cols] = block
+            positions[rows[:, None], cols] = np.arange(start, end)
+        return _top_k(scores, positions, k)
+
+    def _to_ids(self, positions: np.ndarray) -> np.ndarray:
+        return np.where(positions >= 0, self.ids[np.maximum(positions, 0)], -1)
+
+def benchmark(num_cards: int = 20_000, dim: int = 64, num_queries: int = 2_000, k: int = 10):
+    """Prints recall@k and queries/sec of the IVF index against exact search on synthetic clustered data."""
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(num_cards // 50, dim))
+    vectors = centers[rng.integers(len(centers), size=num_cards)] + rng.normal(size=(num_cards, dim))
+    queries = vectors[rng.integers(num_cards, size=num_queries)] + rng.normal(size=(num_queries, dim))
+
+    start = time.perf_counter()
+    index = CardIndex.build(np.arange(num_cards), vectors)
+    print(f"{num_cards} cards, dim {dim}: built {len(index.centroids)} lists in {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    exact_ids, _ = index.exact_search(queries, k)
+    print(f"exact      : {num_queries / (time.perf_counter() - start):9.0f} queries/s")
+    for nprobe in (4, 8, 16, 32):
+        start = time.perf_counter()
+        ids, _ = index.search(queries, k, nprobe=nprobe)
+        qps = num_queries / (time.perf_counter() - start)
+        recall = np.mean([len(np.intersect1d(a, b)) / k for a, b in zip(ids, exact_ids)])
+        print(f"nprobe={nprobe:<4d}: {qps:9.0f} queries/s, recall@{k} {recall:.3f}")
+
+    start = time.perf_counter()
+    for query in queries[:200]:
+        index.search(query, k, nprobe=8)
+    ivf_single = 200 / (time.perf_counter() - start)
+    start = time.perf_counter()
+    for query in queries[:200]:
+        index.exact_search(query, k)
+    print(f"single queries: IVF {ivf_single:.0f}/s, exact {200 / (time.perf_counter() - start):.0f}/s")
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,206 @@
+"""
+A compact, array-based snapshot of a GameGraph for fast move scoring and rollouts.
+
+Building the snapshot walks the entities and relationships once. Afterwards every
+card in a hand or on a battlefield is one row of a set of NumPy columns, and both
+players are indexed by side (0 = first entry of `graph.players`). Composite token
+entities are one row whose `count` holds the number of tokens and whose power and
+toughness are those of a single token.
+"""
+
+import uuid
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from ..rule_engine.game_graph import GameGraph, CompositeTokenEntity, TOKEN_ATTACKING, TOKEN_BLOCKING, TOKEN_DAMAGE, TOKEN_TAPPED, TOKEN_SUMMONING_SICK
+from ..rule_engine import vocabulary as vocab
+from .card_embedder import load_effects_by_name
+
+# Compact zone codes of the `zone` column
+ZONE_HAND, ZONE_BATTLEFIELD, ZONE_LIBRARY, ZONE_GRAVEYARD = range(4)
+_ZONE_CODES = {vocab.ID_ZONE_HAND: ZONE_HAND, vocab.ID_ZONE_BATTLEFIELD: ZONE_BATTLEFIELD, vocab.ID_ZONE_LIBRARY: ZONE_LIBRARY}
+
+_spell_damage_by_name: Optional[Dict[str, int]] = None
+
+def _stat(value) -> int:
+    """Power/toughness can be '*' or None for some cards; treat those as 0."""
+    return value if isinstance(value, int) else 0
+
+# (vocabulary id, MTGJSON keyword name) of the keyword columns, in column order
+_KEYWORD_COLUMNS = (
+    (vocab.ID_ABILITY_FLYING, "Flying"), (vocab.ID_ABILITY_REACH, "Reach"),
+    (vocab.ID_ABILITY_LIFELINK, "Lifelink"), (None, "Defender"), (None, "Trample"),
+)
+
+def keyword_flags(keywords, keyword_names) -> tuple:
+    """(flying, reach, lifelink, defender, trample), by vocabulary id or, for ids missing from the vocabulary, by MTGJSON keyword name."""
+    return tuple((keyword_id is not None and keyword_id in keywords) or name in keyword_names for keyword_id, name in _KEYWORD_COLUMNS)
+
+def spell_damage(card_name: Optional[str]) -> int:
+    """Damage a card deals when it resolves, from its `deal_damage` effects (loaded once)."""
+    global _spell_damage_by_name
+    if _spell_damage_by_name is None:
+        _spell_damage_by_name = {
+            name: sum(e.get("amount", 0) for e in effects if e.get("ability_type") == "deal_damage" and isinstance(e.get("amount"), int))
+            for name, effects in load_effects_by_name().items()
+        }
+    return _spell_damage_by_name.get(card_name, 0)
+
+@dataclass
+class CompactState:
+    """Per-side player columns ([2]) and per-card columns ([N])."""
+    player_keys: List[int] # uuid.int of the player on each side
+    active_side: int
+    turn_number: int
+    life: np.ndarray
+    hand_size: np.ndarray
+    library_size: np.ndarray
+    mana_pool: np.ndarray # Total floating mana
+    lands_played: np.ndarray
+
+    row_of: Dict[int, int] # uuid.int of a card entity -> row
+    type_id: np.ndarray
+    side: np.ndarray
+    zone: np.ndarray # ZONE_* code
+    power: np.ndarray
+    toughness: np.ndarray # Remaining toughness (toughness - damage taken)
+    cmc: np.ndarray
+    spell_damage: np.ndarray
+    count: np.ndarray # 1 for cards, number of tokens for composites
+    ready: np.ndarray # Number that can attack (untapped, not summoning sick, not attacking)
+    untapped: np.ndarray # Number that can block
+    attacking: np.ndarray # Number attacking
+    blocked: np.ndarray # Attackers that already have a blocker
+    is_land: np.ndarray
+    is_creature: np.ndarray
+    is_token: np.ndarray
+    flying: np.ndarray
+    reach: np.ndarray
+    lifelink: np.ndarray
+    defender: np.ndarray
+    trample: np.ndarray
+    mana_source: np.ndarray # Untapped permanents that can be tapped for mana
+    side_of: Dict[int, int] = field(default_factory=dict)
+
+    @classmethod
+    def from_graph(cls, graph: GameGraph, include_library: bool = False) -> "CompactState":
+        """
+        Snapshots the hands and battlefields of both players. With `include_library`,
+        library cards get rows too (in graph order, last row = top card), e.g. for rollouts.
+        """
+        entities = graph.entities
+        by_key = {instance_id.int: entity for instance_id, entity in entities.items()}
+        player_keys = [player_id.int for player_id in graph.players]
+        side_of = {key: side for side, key in enumerate(player_keys)}
+
+        zone_owner: Dict[int, int] = {} # zone key -> side
+        zone_type: Dict[int, int] = {}
+        zone_of: Dict[int, int] = {} # card key -> zone key
+        blocked = set()
+        controls, is_in_zone, blocking = vocab.ID_REL_CONTROLS, vocab.ID_REL_IS_IN_ZONE, vocab.ID_REL_BLOCKING
+        tracked_zones = (vocab.ID_ZONE_HAND, vocab.ID_ZONE_BATTLEFIELD, vocab.ID_ZONE_LIBRARY)
+        for rel in graph.relationships:
+            if rel.type_id == is_in_zone:
+                zone_of[rel.source.int] = rel.target.int
+            elif rel.type_id == controls:
+                side = side_of.get(rel.source.int)
+                target = by_key.get(rel.target.int)
+                if side is not None and target is not None and target.type_id in tracked_zones:
+                    zone_owner[rel.target.int] = side
+                    zone_type[rel.target.int] = target.type_id
+            elif rel.type_id == blocking:
+                blocked.add(rel.target.int)
+
+        library_size = np.zeros(2, dtype=np.int64)
+        hand_size = np.zeros(2, dtype=np.int64)
+        rows = []
+        row_of = {}
+        for key, zone_key in zone_of.items():
+            side = zone_owner.get(zone_key)
+            if side is None:
+                continue
+            zone = zone_type[zone_key]
+            if zone == vocab.ID_ZONE_LIBRARY:
+                library_size[side] += 1
+                if not include_library:
+                    continue
+            entity = by_key[key]
+            props = entity.properties
+            on_battlefield = zone == vocab.ID_ZONE_BATTLEFIELD
+            if zone == vocab.ID_ZONE_HAND:
+                hand_size[side] += 1
+            abilities = props.get('abilities')
+            keywords = abilities.get("keywords", []) if isinstance(abilities, dict) else []
+            mana_abilities = abilities.get("mana_abilities", []) if isinstance(abilities, dict) else []
+            flags = keyword_flags(keywords, props.get('keyword_names') or ())
+
+            if isinstance(entity, CompositeTokenEntity):
+                tokens = entity.tokens
+                count = len(tokens)
+                untapped = tokens[:, TOKEN_TAPPED] == 0
+                ready = int((untapped & (tokens[:, TOKEN_SUMMONING_SICK] == 0) & (tokens[:, TOKEN_ATTACKING] == 0)).sum())
+                power = _stat(props.get('power'))
+                toughness = _stat(props.get('toughness')) - (int(tokens[:, TOKEN_DAMAGE].max()) if count else 0)
+                row = (entity.type_id, side, _ZONE_CODES[zone], power, toughness, 0.0, 0, count, ready,
+                       int((untapped & (tokens[:, TOKEN_BLOCKING] == 0)).sum()), int(tokens[:, TOKEN_ATTACKING].sum()), False,
+                       False, True, True)
+            else:
+                tapped = bool(props.get('tapped'))
+                attacking = bool(props.get('is_attacking'))
+                sick = props.get('turn_entered', graph.turn_number) >= graph.turn_number and bool(props.get('has_summoning_sickness', True))
+                is_creature = bool(props.get('is_creature'))
+                row = (entity.type_id, side, _ZONE_CODES[zone],
+                       _stat(props.get('effective_power', props.get('power'))),
+                       _stat(props.get('effective_toughness', props.get('toughness'))) - _stat(props.get('damage_taken')),
+                       float(props.get('cmc') or 0), spell_damage(props.get('name')), 1,
+                       int(on_battlefield and is_creature and not tapped and not sick and not attacking),
+                       int(on_battlefield and is_creature and not tapped), int(attacking), key in blocked,
+                       bool(props.get('is_land')), is_creature, False)
+            mana_source = on_battlefield and not props.get('tapped') and (bool(props.get('is_land')) or any(a.get("cost", {}).get("tap") for a in mana_abilities))
+            row_of[key] = len(rows)
+            rows.append(row + flags + (mana_source,))
+
+        columns = list(zip(*rows)) if rows else [()] * 21
+        players = [by_key[key] for key in player_keys]
+        return cls(
+            player_keys=player_keys,
+            active_side=side_of.get(graph.active_player_id.int, 0) if graph.active_player_id is not None else 0,
+            turn_number=graph.turn_number,
+            life=np.array([p.properties.get('life_total', 0) for p in players], dtype=np.int64),
+            hand_size=hand_size,
+            library_size=library_size,
+            mana_pool=np.array([sum(p.properties.get('mana_pool', {}).values()) for p in players], dtype=np.int64),
+            lands_played=np.array([p.properties.get('lands_played_this_turn', 0) for p in players], dtype=np.int64),
+            row_of=row_of,
+            type_id=np.array(columns[0], dtype=np.int64),
+            side=np.array(columns[1], dtype=np.int64),
+            zone=np.array(columns[2], dtype=np.int8),
+            power=np.array(columns[3], dtype=np.int64),
+            toughness=np.array(columns[4], dtype=np.int64),
+            cmc=np.array(columns[5], dtype=np.float64),
+            spell_damage=np.array(columns[6], dtype=np.int64),
+            count=np.array(columns[7], dtype=np.int64),
+            ready=np.array(columns[8], dtype=np.int64),
+            untapped=np.array(columns[9], dtype=np.int64),
+            attacking=np.array(columns[10], dtype=np.int64),
+            blocked=np.array(columns[11], dtype=bool),
+            is_land=np.array(columns[12], dtype=bool),
+            is_creature=np.array(columns[13], dtype=bool),
+            is_token=np.array(columns[14], dtype=bool),
+            flying=np.array(columns[15], dtype=bool),
+            reach=np.array(columns[16], dtype=bool),
+            lifelink=np.array(columns[17], dtype=bool),
+            defender=np.array(columns[18], dtype=bool),
+            trample=np.array(columns[19], dtype=bool),
+            mana_source=np.array(columns[20], dtype=bool),
+            side_of=side_of,
+        )
+
+    def player_side(self, player_id: uuid.UUID) -> int:
+        return self.side_of[player_id.int]
+
+    def untapped_mana(self, side: int) -> int:
+        """Floating mana plus one per untapped mana source."""
+        return int(self.mana_pool[side] + np.count_nonzero(self.mana_source & (self.side == side)))
@@ -5,6 +5,9 @@ from the list of legal moves provided by the Rule Engine.
 """
 
 from typing import List
+
+import numpy as np
+
 from ..rule_engine.game_graph import GameGraph
 from ..rule_engine.game_state import GameState # Keep for now if evaluation still uses it
 from .evaluation import MultiHeadedEvaluator
@@ -48,25 +51,11 @@ class DecisionMaker:
             pass
 
         # 4. Prune moves and run search (e.g., MCTS)
-        # For now, we'll just use a simple evaluation of each move.
-        best_move = None
-        best_score = -float('inf')
-
-        for move in legal_moves:
-            # For each move, we would conceptually:
-            # a. Create a hypothetical future_state by applying the move.
-            # b. Score that future_state using the evaluator.
-            # c. The score would be a combination of synergy, impact, etc.
-            move_score = self.evaluator.impact_scorer.score_play(move, game_graph) # Pass GameGraph
-
-            if move_score > best_score:
-                best_score = move_score
-                best_move = move
-        
-        # A real implementation would use a much more robust search algorithm here.
-        # If no move seems good, it might default to the first legal move.
-        if best_move is None:
-            best_move = legal_moves[0]
+        # For now, we'll just use a simple evaluation of each move: the impact scorer
+        # applies every move as a one-step lookahead on a compact snapshot in one pass.
+        # These scores can also serve as MCTS priors or as a rollout policy.
+        move_scores = self.evaluator.impact_scorer.score_moves(legal_moves, game_graph)
+        best_move = legal_moves[int(np.argmax(move_scores))]
 
         return best_move
 
@@ -0,0 +1,223 @@
+"""
+Mutation-based deck discovery on top of parallel rollout self-play.
+
+Candidates are scored by R_final(D) = R(D) + λ·Robustness(D):
+- R(D) is the win rate of deck D against a gauntlet of fixed decks.
+- Robustness(D) = -max(0, R(D) - mean R(N)), where N ranges over k random one-card
+  neighbours of D. This is the win rate lost to a single swap, so sharp optima
+  (niche decks) are punished.
+λ is annealed linearly over the generations. Early generations favour robust decks;
+later ones let niche decks through.
+
+Games are played with the heuristic rollout policy (rollout_policy.simulate) by a
+SelfPlayFarm that spreads (deck, opponent) batches over worker processes. Results are
+cached by canonical decklist, so a candidate that comes back is never replayed.
+Mutations follow the deck size and copy limit of `_get_game_settings`; basic lands are
+exempt from the copy limit. Mana colors are not simulated by the rollouts, so color
+identity is not constrained.
+"""
+
+import multiprocessing
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..rule_engine.card_database import card_data_loader
+from ..rule_engine.game_initializer import _get_game_settings
+from .card_index import legal_card_ids
+from .rollout_policy import DRAW, HeuristicRolloutPolicy, RolloutState, simulate, standard_decklists
+from MTG_bot.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+Decklist = Tuple[Tuple[int, int], ...] # Canonical form: sorted (card_id, count) pairs
+
+def canonical(decklist: Sequence[int]) -> Decklist:
+    card_ids, counts = np.unique(np.asarray(decklist, dtype=np.int64), return_counts=True)
+    return tuple(zip(card_ids.tolist(), counts.tolist()))
+
+def expand(deck: Decklist) -> List[int]:
+    return [card_id for card_id, count in deck for _ in range(count)]
+
+@dataclass
+class DeckConstraints:
+    deck_size: int
+    max_copies: int
+    card_pool: np.ndarray # Card ids mutations may add
+    basic_lands: FrozenSet[int] = frozenset()
+
+    @classmethod
+    def from_game_mode(cls, game_mode: str = "Standard") -> "DeckConstraints":
+        settings = _get_game_settings(game_mode)
+        card_pool = legal_card_ids(game_mode)
+        basic_lands = frozenset(int(card_id) for card_id in card_pool
+                                if (card_data_loader.get_card_data_by_id(int(card_id)).get("type_line") or "").startswith("Basic Land"))
+        return cls(settings["deck_size"], settings["max_card_copies_per_deck"], card_pool, basic_lands)
+
+    def can_add(self, counts: Dict[int, int], card_id: int) -> bool:
+        return card_id in self.basic_lands or counts.get(card_id, 0) < self.max_copies
+
+def mutate(deck: Decklist, constraints: DeckConstraints, rng: np.random.Generator, num_swaps: int = 1) -> Decklist:
+    """Swaps `num_swaps` random cards of the deck for random legal cards."""
+    cards = expand(deck)
+    for position in rng.choice(len(cards), size=min(num_swaps, len(cards)), replace=False):
+        counts = dict(canonical(cards[:position] + cards[position + 1:]))
+        removed = cards[position]
+        for _ in range(100):
+            card_id = int(rng.choice(constraints.card_pool))
+            if card_id != removed and constraints.can_add(counts, card_id):
+                cards[position] = card_id
+                break
+    return canonical(cards)
+
+def random_deck(constraints: DeckConstraints, rng: np.random.Generator) -> Decklist:
+    cards: List[int] = []
+    counts: Dict[int, int] = {}
+    while len(cards) < constraints.deck_size:
+        card_id = int(rng.choice(constraints.card_pool))
+        if constraints.can_add(counts, card_id):
+            cards.append(card_id)
+            counts[card_id] = counts.get(card_id, 0) + 1
+    return canonical(cards)
+
+def play_games(task: Tuple[Decklist, Decklist, int, int, float]) -> List[float]:
+    """Plays `num_games` rollouts of deck vs opponent (alternating who starts); returns deck's score per game (1 win, 0.5 draw, 0 loss)."""
+    deck, opponent, num_games, seed, epsilon = task
+    rng = np.random.default_rng(seed)
+    policy = HeuristicRolloutPolicy(epsilon=epsilon, rng=rng)
+    decklists = [expand(deck), expand(opponent)]
+    scores = []
+    for game in range(num_games):
+        side = game % 2
+        winner = simulate(RolloutState.from_decklists(decklists if side == 0 else decklists[::-1], rng), (policy, policy))
+        scores.append(0.5 if winner == DRAW else float(winner == side))
+    return scores
+
+def play_matchup(task: Tuple[Decklist, Decklist, int, int, float]) -> float:
+    """Total score of deck over the games of `task`."""
+    return sum(play_games(task))
+
+class SelfPlayFarm:
+    """
+    Plays batches of matchups over a process pool and caches win rates by canonical
+    decklist. `processes=0` plays in the calling process.
+    """
+    def __init__(self, gauntlet: Sequence[Decklist], games_per_opponent: int = 20, processes: Optional[int] = None, epsilon: float = 0.1, seed: int = 0):
+        self.gauntlet = [tuple(deck) for deck in gauntlet]
+        self.games_per_opponent = games_per_opponent
+        self.epsilon = epsilon
+        self.rng = np.random.default_rng(seed)
+        self.cache: Dict[Decklist, float] = {}
+        self.games_played = 0
+        self.processes = os.cpu_count() if processes is None else processes
+        self._pool = multiprocessing.Pool(self.processes) if self.processes else None
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def win_rates(self, decks: Sequence[Decklist]) -> np.ndarray:
+        """Gauntlet win rate of every deck; only decks missing from the cache are played, in one batch."""
+        missing = list(dict.fromkeys(deck for deck in decks if deck not in self.cache))
+        tasks = [(deck, opponent, self.games_per_opponent, int(self.rng.integers(2**63)), self.epsilon) for deck in missing for opponent in self.gauntlet]
+        if tasks:
+            scores = self._pool.map(play_matchup, tasks, chunksize=max(1, len(tasks) // (4 * self.processes))) if self._pool else list(map(play_matchup, tasks))
+            per_deck = np.asarray(scores).reshape(len(missing), len(self.gauntlet)).sum(axis=1)
+            for deck, score in zip(missing, per_deck):
+                self.cache[deck] = float(score) / (self.games_per_opponent * len(self.gauntlet))
+            self.games_played += len(tasks) * self.games_per_opponent
+        return np.array([self.cache[deck] for deck in decks])
+
+@dataclass
+class Candidate:
+    deck: Decklist
+    win_rate: float
+    robustness: float
+    fitness: float
+
+@dataclass
+class GenerationStats:
+    generation: int
+    robustness_weight: float
+    best: Candidate
+    mean_fitness: float
+    games_played: int # Total so far
+    cache_size: int
+    seconds: float
+
+@dataclass
+class DeckEvolution:
+    farm: SelfPlayFarm
+    constraints: DeckConstraints
+    population: List[Decklist]
+    elite_size: int = 4
+    num_swaps: int = 2
+    num_neighbours: int = 4
+    robustness_start: float = 1.0 # λ at the first generation
+    robustness_end: float = 0.0 # λ at the last generation
+    rng: np.random.Generator = field(default_factory=np.random.default_rng)
+    history: List[GenerationStats] = field(default_factory=list)
+
+    def robustness_weight(self, generation: int, num_generations: int) -> float:
+        progress = generation / max(num_generations - 1, 1)
+        return self.robustness_start + (self.robustness_end - self.robustness_start) * progress
+
+    def evaluate(self, decks: Sequence[Decklist], robustness_weight: float) -> List[Candidate]:
+        """Scores the decks and their one-card neighbours with a single farm batch."""
+        neighbours = [[mutate(deck, self.constraints, self.rng, 1) for _ in range(self.num_neighbours)] for deck in decks]
+        rates = self.farm.win_rates(list(decks) + [n for group in neighbours for n in group])
+        win_rates = rates[:len(decks)]
+        neighbour_rates = rates[len(decks):].reshape(len(decks), self.num_neighbours) if self.num_neighbours else win_rates[:, None]
+        robustness = -np.maximum(0.0, win_rates - neighbour_rates.mean(axis=1))
+        fitness = win_rates + robustness_weight * robustness
+        return [Candidate(deck, float(r), float(b), float(f)) for deck, r, b, f in zip(decks, win_rates, robustness, fitness)]
+
+    def step(self, generation: int, num_generations: int) -> List[Candidate]:
+        """Evaluates the population, keeps the elite and refills the population with their mutants."""
+        start = time.perf_counter()
+        weight = self.robustness_weight(generation, num_generations)
+        candidates = sorted(self.evaluate(self.population, weight), key=lambda c: -c.fitness)
+        elite = [c.deck for c in candidates[:self.elite_size]]
+        children = [mutate(elite[i % len(elite)], self.constraints, self.rng, self.num_swaps) for i in range(len(self.population) - len(elite))]
+        self.population = elite + children
+        stats = GenerationStats(generation, weight, candidates[0], float(np.mean([c.fitness for c in candidates])),
+                                self.farm.games_played, len(self.farm.cache), time.perf_counter() - start)
+        self.history.append(stats)
+        logger.info(f"Generation {generation}: λ={weight:.2f}, best fitness {stats.best.fitness:.3f} (win rate {stats.best.win_rate:.3f}), "
+                    f"{stats.games_played} games, {stats.cache_size} cached decks, {stats.seconds:.1f}s")
+        return candidates
+
+    def run(self, num_generations: int) -> List[Candidate]:
+        """Runs the search; returns the last generation's candidates, best first."""
+        candidates = []
+        for generation in range(num_generations):
+            candidates = self.step(generation, num_generations)
+        return candidates
+
+def benchmark(num_generations: int = 3, population_size: int = 8, games_per_opponent: int = 10, processes: Optional[int] = None, seed: int = 0):
+    """Evolves mutants of the Standard sample decks against those decks and prints the time per generation."""
+    rng = np.random.default_rng(seed)
+    names, decklists = standard_decklists()
+    gauntlet = [canonical(decklist) for decklist in decklists]
+    constraints = DeckConstraints.from_game_mode("Standard")
+    population = [mutate(gauntlet[i % len(gauntlet)], constraints, rng, 4) for i in range(population_size)]
+    with SelfPlayFarm(gauntlet, games_per_opponent, processes, seed=seed) as farm:
+        evolution = DeckEvolution(farm, constraints, population, elite_size=2, rng=rng)
+        evolution.run(num_generations)
+    for stats in evolution.history:
+        print(f"generation {stats.generation}: λ={stats.robustness_weight:.2f} best win rate {stats.best.win_rate:.2f} "
+              f"(fitness {stats.best.fitness:.2f}), {stats.games_played} games so far, {stats.seconds:.1f}s")
+
+if __name__ == "__main__":
+    benchmark()
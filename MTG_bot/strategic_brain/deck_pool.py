@@ -0,0 +1,251 @@
+"""
+Elite pool of decks with win-rate estimates and matchup scheduling.
+
+The pool lives next to the `decks` table in mtg_bot.db. The `deck_pool` table holds,
+per deck, its game record, a novelty score (how far its card counts are from the
+other decks in the pool) and when it was last evaluated. `deck_matchups` holds the
+head-to-head records.
+
+Win rates are estimated with Wilson score intervals (a draw counts as half a win).
+Matchups are scheduled from a priority queue over the pool:
+- "ucb" (optimism) plays the decks whose upper bound is highest.
+- "uncertainty" plays the decks whose interval is widest.
+Both add a novelty bonus, so niche decks are not forgotten, and a staleness bonus, so
+decks are periodically re-evaluated against the current pool.
+"""
+
+import heapq
+import math
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..rule_engine.card_database import card_data_loader
+from MTG_bot import config
+from MTG_bot.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+PRIORITY_MODES = ("ucb", "uncertainty")
+
+def wilson_interval(wins: float, games: int, z: float = 1.96) -> Tuple[float, float]:
+    """Wilson score interval of a win rate; (0, 1) when there are no games."""
+    if games <= 0:
+        return 0.0, 1.0
+    p = wins / games
+    denominator = 1 + z * z / games
+    center = (p + z * z / (2 * games)) / denominator
+    half_width = z * math.sqrt(p * (1 - p) / games + z * z / (4 * games * games)) / denominator
+    return max(0.0, center - half_width), min(1.0, center + half_width)
+
+def novelty_scores(counts: np.ndarray, k: int = 5) -> np.ndarray:
+    """
+    Novelty of each deck: mean cosine distance to its k nearest other decks, over [D, V]
+    card-count vectors. A deck alone in the pool has novelty 1.
+    """
+    if len(counts) < 2:
+        return np.ones(len(counts))
+    unit = counts / np.maximum(np.linalg.norm(counts, axis=1, keepdims=True), 1e-12)
+    distance = 1.0 - unit @ unit.T
+    np.fill_diagonal(distance, np.inf)
+    k = min(k, len(counts) - 1)
+    return np.partition(distance, k - 1, axis=1)[:, :k].mean(axis=1)
+
+@dataclass
+class PoolEntry:
+    deck_id: int
+    deck_name: str
+    wins: float # Draws count as half a win
+    games: int
+    novelty: float
+    last_evaluated: Optional[float] # Unix time, None if never evaluated
+
+    @property
+    def win_rate(self) -> float:
+        return self.wins / self.games if self.games else 0.5
+
+    @property
+    def interval(self) -> Tuple[float, float]:
+        return wilson_interval(self.wins, self.games)
+
+class DeckPool:
+    """Elite deck pool backed by the `deck_pool` and `deck_matchups` tables."""
+    def __init__(self, db_path: str = config.MTG_BOT_DB_PATH, novelty_weight: float = 0.1,
+                 staleness_weight: float = 0.05, staleness_scale: float = 24 * 3600.0):
+        self.db_path = db_path
+        self.novelty_weight = novelty_weight
+        self.staleness_weight = staleness_weight
+        self.staleness_scale = staleness_scale # Seconds after which the staleness bonus is saturated
+        conn = sqlite3.connect(self.db_path)
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS deck_pool (
+                deck_id INTEGER PRIMARY KEY,
+                wins REAL NOT NULL DEFAULT 0,
+                games INTEGER NOT NULL DEFAULT 0,
+                novelty REAL NOT NULL DEFAULT 1,
+                added_at REAL NOT NULL,
+                last_evaluated REAL,
+                FOREIGN KEY (deck_id) REFERENCES decks(deck_id)
+            );
+            CREATE TABLE IF NOT EXISTS deck_matchups (
+                deck_id INTEGER NOT NULL,
+                opponent_id INTEGER NOT NULL,
+                wins REAL NOT NULL DEFAULT 0,
+                games INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (deck_id, opponent_id),
+                FOREIGN KEY (deck_id) REFERENCES decks(deck_id),
+                FOREIGN KEY (opponent_id) REFERENCES decks(deck_id)
+            );
+        """)
+        conn.commit()
+        conn.close()
+
+    def create_deck(self, deck_name: str, card_counts: Mapping[int, int], game_mode: str = "Standard", owner_id: int = 1) -> int:
+        """
+        Stores a new decklist (loader card_id -> quantity) in `decks`/`deck_cards` and adds
+        it to the pool. Loader ids are translated to database card ids by card name; a card
+        without a row in `cards` raises a ValueError before anything is stored.
+        """
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        db_ids = dict(cursor.execute("SELECT name, MIN(card_id) FROM cards GROUP BY name").fetchall())
+        rows = []
+        for card_id, quantity in card_counts.items():
+            if quantity <= 0:
+                continue
+            name = card_data_loader.get_card_data_by_id(int(card_id)).get("name")
+            if name not in db_ids:
+                conn.close()
+                raise ValueError(f"Card {card_id} ({name or 'unknown to the card loader'}) has no row in the cards table.")
+            rows.append((db_ids[name], int(quantity)))
+        cursor.execute("INSERT INTO decks (deck_name, owner_id, format) VALUES (?, ?, ?)", (deck_name, owner_id, game_mode))
+        deck_id = cursor.lastrowid
+        cursor.executemany("INSERT INTO deck_cards (deck_id, card_id, quantity) VALUES (?, ?, ?)",
+                           [(deck_id, db_card_id, quantity) for db_card_id, quantity in rows])
+        conn.commit()
+        conn.close()
+        self.add_decks([deck_id])
+        return deck_id
+
+    def load_decklist(self, deck_id: int) -> List[int]:
+        """A stored deck as a list of loader card ids (one entry per copy), e.g. for rollouts."""
+        conn = sqlite3.connect(self.db_path)
+        rows = conn.execute("""
+            SELECT c.name, dc.quantity FROM deck_cards dc JOIN cards c ON c.card_id = dc.card_id
+            WHERE dc.deck_id = ? ORDER BY c.name
+        """, (deck_id,)).fetchall()
+        conn.close()
+        return [card_data_loader.get_card_id_by_name(name) for name, quantity in rows for _ in range(quantity)]
+
+    def add_decks(self, deck_ids: Sequence[int]):
+        """Adds existing decks to the pool (already pooled decks keep their record) and refreshes novelty."""
+        conn = sqlite3.connect(self.db_path)
+        now = time.time()
+        conn.executemany("INSERT OR IGNORE INTO deck_pool (deck_id, added_at) VALUES (?, ?)", [(int(deck_id), now) for deck_id in deck_ids])
+        conn.commit()
+        conn.close()
+        self.update_novelty()
+
+    def remove_deck(self, deck_id: int):
+        """Drops a deck from the pool; the deck itself stays in `decks`."""
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("DELETE FROM deck_pool WHERE deck_id = ?", (deck_id,))
+        conn.execute("DELETE FROM deck_matchups WHERE deck_id = ? OR opponent_id = ?", (deck_id, deck_id))
+        conn.commit()
+        conn.close()
+        self.update_novelty()
+
+    def update_novelty(self, k: int = 5):
+        """Recomputes the novelty of every pooled deck from the card counts in `deck_cards`."""
+        conn = sqlite3.connect(self.db_path)
+        rows = conn.execute("""
+            SELECT p.deck_id, dc.card_id, dc.quantity
+            FROM deck_pool p JOIN deck_cards dc ON dc.deck_id = p.deck_id
+        """).fetchall()
+        deck_index: Dict[int, int] = {}
+        card_index: Dict[int, int] = {}
+        for deck_id, card_id, _ in rows:
+            deck_index.setdefault(deck_id, len(deck_index))
+            card_index.setdefault(card_id, len(card_index))
+        counts = np.zeros((len(deck_index), len(card_index)))
+        for deck_id, card_id, quantity in rows:
+            counts[deck_index[deck_id], card_index[card_id]] += quantity
+        novelty = novelty_scores(counts, k)
+        conn.executemany("UPDATE deck_pool SET novelty = ? WHERE deck_id = ?", [(float(n), deck_id) for deck_id, n in zip(deck_index, novelty)])
+        conn.commit()
+        conn.close()
+
+    def entries(self) -> List[PoolEntry]:
+        conn = sqlite3.connect(self.db_path)
+        rows = conn.execute("""
+            SELECT p.deck_id, d.deck_name, p.wins, p.games, p.novelty, p.last_evaluated
+            FROM deck_pool p JOIN decks d ON d.deck_id = p.deck_id
+            ORDER BY p.deck_id
+        """).fetchall()
+        conn.close()
+        return [PoolEntry(*row) for row in rows]
+
+    def record_results(self, results: Sequence[Tuple[int, int, float]]):
+        """
+        Records finished games as (deck_id, opponent_id, score) with score 1 (win),
+        0.5 (draw) or 0 (loss) for `deck_id`. Both decks' records are updated.
+        """
+        now = time.time()
+        conn = sqlite3.connect(self.db_path)
+        for deck_id, opponent_id, score in results:
+            for deck, opponent, deck_score in ((deck_id, opponent_id, score), (opponent_id, deck_id, 1.0 - score)):
+                conn.execute("UPDATE deck_pool SET wins = wins + ?, games = games + 1, last_evaluated = ? WHERE deck_id = ?", (deck_score, now, deck))
+                conn.execute("""
+                    INSERT INTO deck_matchups (deck_id, opponent_id, wins, games) VALUES (?, ?, ?, 1)
+                    ON CONFLICT (deck_id, opponent_id) DO UPDATE SET wins = wins + excluded.wins, games = games + 1
+                """, (deck, opponent, deck_score))
+        conn.commit()
+        conn.close()
+
+    def priority(self, entry: PoolEntry, mode: str = "ucb", now: Optional[float] = None) -> float:
+        """Scheduling priority of a deck; higher is evaluated sooner."""
+        if mode not in PRIORITY_MODES:
+            raise ValueError(f"Unknown priority mode '{mode}', expected one of {PRIORITY_MODES}")
+        low, high = entry.interval
+        base = high if mode == "ucb" else high - low
+        age = (now or time.time()) - entry.last_evaluated if entry.last_evaluated is not None else self.staleness_scale
+        return base + self.novelty_weight * entry.novelty + self.staleness_weight * min(age / self.staleness_scale, 1.0)
+
+    def next_matchups(self, num_matchups: int, mode: str = "ucb") -> List[Tuple[int, int]]:
+        """
+        Pops the `num_matchups` highest-priority decks off a priority queue and pairs each
+        with the pooled opponent it has played least (ties: the opponent with the best win
+        rate). Returns (deck_id, opponent_id) pairs; a deck can appear again once its
+        queued priority is exhausted.
+        """
+        entries = self.entries()
+        if len(entries) < 2:
+            return []
+        now = time.time()
+        queue = [(-self.priority(entry, mode, now), entry.deck_id) for entry in entries]
+        heapq.heapify(queue)
+        by_id = {entry.deck_id: entry for entry in entries}
+        win_rate = {entry.deck_id: entry.win_rate for entry in entries}
+
+        conn = sqlite3.connect(self.db_path)
+        head_to_head = {(deck, opponent): games for deck, opponent, games in conn.execute("SELECT deck_id, opponent_id, games FROM deck_matchups")}
+        conn.close()
+
+        matchups = []
+        while len(matchups) < num_matchups:
+            _, deck_id = heapq.heappop(queue)
+            opponent_id = min((opponent for opponent in win_rate if opponent != deck_id),
+                              key=lambda opponent: (head_to_head.get((deck_id, opponent), 0), -win_rate[opponent]))
+            matchups.append((deck_id, opponent_id))
+            head_to_head[(deck_id, opponent_id)] = head_to_head.get((deck_id, opponent_id), 0) + 1
+            head_to_head[(opponent_id, deck_id)] = head_to_head.get((opponent_id, deck_id), 0) + 1
+            # Requeue with the priority it would have after one more game at its current rate.
+            entry = by_id[deck_id]
+            entry.wins += entry.win_rate
+            entry.games += 1
+            entry.last_evaluated = now
+            heapq.heappush(queue, (-self.priority(entry, mode, now), deck_id))
+        return matchups
@@ -0,0 +1,329 @@
+"""
+Turns a GameGraph into padded entity-token arrays for the relational transformer
+described in mtg_rl_data_flow.md.
+
+Every entity (players, zones, cards, composite token groups) becomes one token with integer columns
+(type, zone, controller) and a small float feature vector. Relationships between
+entities are encoded as an [N, N] matrix of relation codes which the model maps
+to a learned attention bias.
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence
+import uuid
+
+import numpy as np
+
+try:
+    import torch
+except ImportError: # PyTorch is only needed for the tensor hand-off
+    torch = None
+
+from ..rule_engine.game_graph import GameGraph, CompositeTokenEntity, TOKEN_DAMAGE, TOKEN_TAPPED, TOKEN_SUMMONING_SICK, TOKEN_ATTACKING
+from ..rule_engine import vocabulary as vocab
+
+# --- Token vocabulary ---
+PAD_TOKEN = 0
+HIDDEN_TOKEN = 1 # A card whose identity the perspective player cannot see
+TYPE_ID_OFFSET = 2 # Entity type_ids are shifted past the special tokens
+
+# Zone column: 0 for entities outside any zone (players), otherwise 1 + index.
+ZONE_ORDER = (vocab.ID_ZONE_LIBRARY, vocab.ID_ZONE_HAND, vocab.ID_ZONE_BATTLEFIELD, vocab.ID_ZONE_GRAVEYARD, vocab.ID_ZONE_STACK, vocab.ID_ZONE_EXILE)
+# Controller column: 0 for no controller, 1 for the perspective player, 2 for the opponent.
+CONTROLLER_NONE, CONTROLLER_SELF, CONTROLLER_OPPONENT = 0, 1, 2
+
+# Relation codes: 0 means no edge, otherwise 1 + index. Edges point from source (row) to target (column).
+RELATION_TYPES = (vocab.ID_REL_CONTROLS, vocab.ID_REL_IS_IN_ZONE, vocab.ID_REL_BLOCKING, vocab.ID_REL_ENCHANTED_BY)
+NUM_RELATION_CODES = len(RELATION_TYPES) + 1
+
+TOKEN_FEATURES = (
+    "power", "toughness", "cmc", "tapped", "damage_taken", "is_attacking",
+    "has_summoning_sickness", "is_land", "is_creature", "life_total", "token_count",
+)
+NUM_TOKEN_FEATURES = len(TOKEN_FEATURES)
+
+# Cards are ordered by zone so that truncation drops the least relevant ones first.
+_ZONE_PRIORITY = {zone_id: i for i, zone_id in enumerate((
+    vocab.ID_ZONE_BATTLEFIELD, vocab.ID_ZONE_STACK, vocab.ID_ZONE_HAND,
+    vocab.ID_ZONE_GRAVEYARD, vocab.ID_ZONE_EXILE, vocab.ID_ZONE_LIBRARY,
+))}
+_NO_ZONE_PRIORITY = len(_ZONE_PRIORITY)
+
+def _as_number(value) -> float:
+    """Power/toughness can be '*' or None for some cards; treat those as 0."""
+    return value if isinstance(value, (int, float)) else 0
+
+@dataclass
+class EntityTokens:
+    """
+    Token arrays for one graph ([N, ...]) or a batch of graphs ([B, N, ...]).
+
+    All arrays are C-contiguous and use dtypes PyTorch accepts without conversion,
+    so `to_torch` shares memory with the NumPy buffers.
+    """
+    type_ids: np.ndarray # int64, entity type_id + TYPE_ID_OFFSET, or PAD_TOKEN / HIDDEN_TOKEN
+    zone_ids: np.ndarray # int64, see ZONE_ORDER
+    controller_ids: np.ndarray # int64, see CONTROLLER_*
+    features: np.ndarray # float32, [..., NUM_TOKEN_FEATURES]
+    mask: np.ndarray # bool, True for real tokens
+    relations: np.ndarray # int8, [..., N, N] relation codes
+
+    def to_torch(self) -> Dict[str, "torch.Tensor"]:
+        """Wraps the arrays as tensors without copying."""
+        if torch is None:
+            raise ImportError("PyTorch is required for EntityTokens.to_torch().")
+        return {
+            "type_ids": torch.from_numpy(self.type_ids),
+            "zone_ids": torch.from_numpy(self.zone_ids),
+            "controller_ids": torch.from_numpy(self.controller_ids),
+            "features": torch.from_numpy(self.features),
+            "mask": torch.from_numpy(self.mask),
+            "relations": torch.from_numpy(self.relations),
+        }
+
+    def relation_bias(self, bias_table: np.ndarray) -> np.ndarray:
+        """
+        Looks up an attention bias for every token pair.
+
+        `bias_table` has NUM_RELATION_CODES rows (optionally with a trailing heads
+        dimension); row 0 is the bias for unrelated pairs.
+        """
+        return bias_table[self.relations]
+
+def _allocate(batch_shape: tuple, num_tokens: int) -> EntityTokens:
+    return EntityTokens(
+        type_ids=np.zeros(batch_shape + (num_tokens,), dtype=np.int64),
+        zone_ids=np.zeros(batch_shape + (num_tokens,), dtype=np.int64),
+        controller_ids=np.zeros(batch_shape + (num_tokens,), dtype=np.int64),
+        features=np.zeros(batch_shape + (num_tokens, NUM_TOKEN_FEATURES), dtype=np.float32),
+        mask=np.zeros(batch_shape + (num_tokens,), dtype=bool),
+        relations=np.zeros(batch_shape + (num_tokens, num_tokens), dtype=np.int8),
+    )
+
+class EntityTokenEncoder:
+    """Encodes GameGraphs into entity tokens from the point of view of one player."""
+    def __init__(self, max_entities: int = 300):
+        self.max_entities = max_entities
+        self._zone_index = {zone_id: i + 1 for i, zone_id in enumerate(ZONE_ORDER) if zone_id is not None}
+        self._relation_code = {rel_id: i + 1 for i, rel_id in enumerate(RELATION_TYPES) if rel_id is not None}
+
+    def _collect(self, graph: GameGraph, perspective_id: Optional[uuid.UUID]):
+        """
+        Gathers per-entity rows and relation edges for one graph, ordered and truncated
+        to `max_entities`. UUIDs are keyed by their int since UUID hashing runs in Python.
+        """
+        if perspective_id is None:
+            perspective_id = graph.active_player_id
+        perspective_key = perspective_id.int if perspective_id is not None else None
+        entities = graph.entities
+        by_key = {instance_id.int: entity for instance_id, entity in entities.items()}
+        player_keys = {key for key, entity in by_key.items() if entity.type_id == vocab.ID_PLAYER}
+
+        zone_of: Dict[int, int] = {} # entity key -> key of the zone it is in
+        controller_of: Dict[int, int] = {} # entity key -> key of the controlling player
+        edges = []
+        relation_code = self._relation_code
+        controls, is_in_zone = vocab.ID_REL_CONTROLS, vocab.ID_REL_IS_IN_ZONE
+        for rel in graph.relationships:
+            code = relation_code.get(rel.type_id)
+            if code is None:
+                continue
+            source, target = rel.source.int, rel.target.int
+            if rel.type_id == is_in_zone:
+                zone_of[source] = target
+            elif rel.type_id == controls and source in player_keys:
+                controller_of[target] = source
+            edges.append((source, target, code))
+
+        def sort_key(key):
+            entity = by_key[key]
+            if key in player_keys:
+                return (0, 0)
+            if entity.type_id in self._zone_index:
+                return (1, 0)
+            zone = by_key.get(zone_of.get(key))
+            return (2, _ZONE_PRIORITY.get(zone.type_id, _NO_ZONE_PRIORITY) if zone else _NO_ZONE_PRIORITY)
+
+        order = sorted(by_key, key=sort_key)[:self.max_entities]
+        index_of = {key: i for i, key in enumerate(order)}
+
+        rows = []
+        for key in order:
+            entity = by_key[key]
+            props = entity.properties
+            if key in player_keys:
+                owner = key
+                zone_type = None
+            elif entity.type_id in self._zone_index:
+                owner = controller_of.get(key)
+                zone_type = entity.type_id
+            else:
+                owner = controller_of.get(key)
+                zone = by_key.get(zone_of.get(key))
+                zone_type = zone.type_id if zone else None
+
+            if owner is None:
+                controller = CONTROLLER_NONE
+            else:
+                controller = CONTROLLER_SELF if owner == perspective_key else CONTROLLER_OPPONENT
+            hidden = zone_type == vocab.ID_ZONE_LIBRARY or (zone_type == vocab.ID_ZONE_HAND and controller == CONTROLLER_OPPONENT)
+            is_card_token = key not in player_keys and entity.type_id not in self._zone_index
+            if hidden and is_card_token:
+                type_token = HIDDEN_TOKEN
+                features = None
+            elif isinstance(entity, CompositeTokenEntity):
+                # One token for the whole composite: summed power/toughness/damage and
+                # the fraction of tokens that are tapped, attacking or summoning sick.
+                type_token = entity.type_id + TYPE_ID_OFFSET
+                tokens = entity.tokens
+                count = len(tokens)
+                fraction = tokens[:, [TOKEN_TAPPED, TOKEN_ATTACKING, TOKEN_SUMMONING_SICK]].mean(axis=0) if count else (0.0, 0.0, 0.0)
+                features = (
+                    float(entity.token_power().sum()),
+                    float(entity.token_toughness().sum()),
+                    _as_number(props.get('cmc')),
+                    float(fraction[0]),
+                    float(tokens[:, TOKEN_DAMAGE].sum()),
+                    float(fraction[1]),
+                    float(fraction[2]),
+                    0.0,
+                    1.0,
+                    0.0,
+                    float(count),
+                )
+            else:
+                type_token = entity.type_id + TYPE_ID_OFFSET
+                features = (
+                    _as_number(props.get('effective_power', props.get('power'))),
+                    _as_number(props.get('effective_toughness', props.get('toughness'))),
+                    _as_number(props.get('cmc')),
+                    float(bool(props.get('tapped'))),
+                    _as_number(props.get('damage_taken')),
+                    float(bool(props.get('is_attacking'))),
+                    float(bool(props.get('has_summoning_sickness'))),
+                    float(bool(props.get('is_land'))),
+                    float(bool(props.get('is_creature'))),
+                    _as_number(props.get('life_total')),
+                    0.0,
+                )
+            rows.append((type_token, self._zone_index.get(zone_type, 0), controller, features))
+
+        kept_edges = [(index_of[s], index_of[t], code) for s, t, code in edges if s in index_of and t in index_of]
+        return rows, kept_edges
+
+    def _write(self, tokens: EntityTokens, batch_index, rows, edges):
+        """Writes collected rows/edges into the (possibly batched) preallocated arrays."""
+        n = len(rows)
+        type_ids = tokens.type_ids[batch_index]
+        zone_ids = tokens.zone_ids[batch_index]
+        controller_ids = tokens.controller_ids[batch_index]
+        features = tokens.features[batch_index]
+        type_ids[:n] = [row[0] for row in rows]
+        zone_ids[:n] = [row[1] for row in rows]
+        controller_ids[:n] = [row[2] for row in rows]
+        visible = [i for i, row in enumerate(rows) if row[3] is not None]
+        if visible:
+            features[visible] = [rows[i][3] for i in visible]
+        tokens.mask[batch_index][:n] = True
+        if edges:
+            sources, targets, codes = zip(*edges)
+            tokens.relations[batch_index][list(sources), list(targets)] = codes
+
+    def encode(self, graph: GameGraph, perspective_id: Optional[uuid.UUID] = None, pad_to: Optional[int] = None) -> EntityTokens:
+        """
+        Encodes one graph. Without `pad_to` the arrays have exactly one row per kept entity.
+        The perspective player defaults to the active player.
+        """
+        rows, edges = self._collect(graph, perspective_id)
+        tokens = _allocate((), pad_to or len(rows))
+        self._write(tokens, (), rows[:pad_to] if pad_to else rows, [e for e in edges if not pad_to or (e[0] < pad_to and e[1] < pad_to)])
+        return tokens
+
+    def encode_batch(self, graphs: Sequence[GameGraph], perspective_ids: Optional[Sequence[uuid.UUID]] = None, pad_to: Optional[int] = None) -> EntityTokens:
+        """
+        Encodes many graphs straight into one set of [B, N] arrays, where N is `pad_to`
+        or the largest entity count in the batch.
+        """
+        collected = [self._collect(graph, perspective_ids[i] if perspective_ids else None) for i, graph in enumerate(graphs)]
+        num_tokens = pad_to or max((len(rows) for rows, _ in collected), default=0)
+        tokens = _allocate((len(graphs),), num_tokens)
+        for i, (rows, edges) in enumerate(collected):
+            if len(rows) > num_tokens:
+                rows = rows[:num_tokens]
+                edges = [e for e in edges if e[0] < num_tokens and e[1] < num_tokens]
+            self._write(tokens, i, rows, edges)
+        return tokens
+
+def collate(samples: Sequence[EntityTokens], pad_to: Optional[int] = None) -> EntityTokens:
+    """Stacks individually encoded graphs into one padded batch (e.g. for a DataLoader)."""
+    num_tokens = pad_to or max((len(s.type_ids) for s in samples), default=0)
+    batch = _allocate((len(samples),), num_tokens)
+    for i, sample in enumerate(samples):
+        n = min(len(sample.type_ids), num_tokens)
+        batch.type_ids[i, :n] = sample.type_ids[:n]
+        batch.zone_ids[i, :n] = sample.zone_ids[:n]
+        batch.controller_ids[i, :n] = sample.controller_ids[:n]
+        batch.features[i, :n] = sample.features[:n]
+        batch.mask[i, :n] = sample.mask[:n]
+        batch.relations[i, :n, :n] = sample.relations[:n, :n]
+    return batch
+
+def _build_benchmark_graph(num_entities: int) -> GameGraph:
+    """Builds a two-player game with roughly `num_entities` entities and a few blockers."""
+    from ..rule_engine import game_initializer
+    from ..rule_engine.card_database import card_data_loader
+
+    cards_per_player = max(0, (num_entities - 10) // 2) # 2 players + 8 zones
+    forest = card_data_loader.get_card_id_by_name("Forest")
+    bear = card_data_loader.get_card_id_by_name("Colossal Dreadmaw")
+    decklist = [forest, bear] * (cards_per_player // 2) + [forest] * (cards_per_player % 2)
+    graph = game_initializer.initialize_game_state(decklist, list(decklist), shuffle=True)
+
+    # Put part of each library onto the battlefield so relations include blocks.
+    battlefields = {}
+    for rel in graph.relationships:
+        zone = graph.entities[rel.target]
+        if rel.type_id == vocab.ID_REL_CONTROLS and zone.type_id == vocab.ID_ZONE_BATTLEFIELD:
+            battlefields[rel.source] = zone
+    creatures = {player_id: [] for player_id in battlefields}
+    for player_id, battlefield in battlefields.items():
+        player = graph.entities[player_id]
+        owned = [graph.entities[r.target] for r in graph.get_relationships(source=player, rel_type=vocab.ID_REL_CONTROLS)]
+        for card in [c for c in owned if c.properties.get('is_creature')][:cards_per_player // 4]:
+            graph._move_card_to_zone(card, battlefield)
+            creatures[player_id].append(card)
+    attackers, blockers = creatures[graph.players[0]], creatures[graph.players[1]]
+    for attacker, blocker in zip(attackers, blockers):
+        attacker.properties['is_attacking'] = True
+        graph.add_relationship(blocker, attacker, vocab.ID_REL_BLOCKING)
+    return graph
+
+def benchmark(entity_counts=(50, 150, 300), batch_size: int = 64, repeats: int = 5):
+    """Prints encode/collate/hand-off throughput for graphs of the given sizes."""
+    encoder = EntityTokenEncoder(max_entities=max(entity_counts))
+    for num_entities in entity_counts:
+        graphs = [_build_benchmark_graph(num_entities) for _ in range(4)] * (batch_size // 4)
+        n = len(graphs[0].entities)
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            batch = encoder.encode_batch(graphs)
+        encode_rate = repeats * len(graphs) / (time.perf_counter() - start)
+
+        samples = [encoder.encode(graph) for graph in graphs]
+        start = time.perf_counter()
+        for _ in range(repeats):
+            collate(samples)
+        collate_rate = repeats * len(graphs) / (time.perf_counter() - start)
+
+        handoff = ""
+        if torch is not None:
+            start = time.perf_counter()
+            for _ in range(repeats):
+                batch.to_torch()
+            handoff = f" | to_torch: {(time.perf_counter() - start) / repeats * 1e6:.1f} us/batch"
+        print(f"{n:4d} entities | encode_batch: {encode_rate:8.0f} graphs/s | collate: {collate_rate:8.0f} graphs/s{handoff}")
+
+if __name__ == "__main__":
+    benchmark()
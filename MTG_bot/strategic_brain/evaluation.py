@@ -4,35 +4,328 @@ It contains the evaluation functions that score game states, enabling the bot
 to understand its position and make intelligent decisions.
 """
 
-from typing import List, Dict
-from ..rule_engine.game_graph import GameGraph, Entity
+from collections import Counter
+import time
+from typing import List, Dict, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from ..rule_engine.game_graph import GameGraph, Entity, CompositeTokenEntity, TOKEN_SUMMONING_SICK
+from ..rule_engine.actions import (
+    PlayLandAction, CastSpellAction, ActivateManaAbilityAction,
+    DeclareAttackerAction, DeclareBlockerAction, DeclareTokenAttackersAction, DeclareTokenBlockersAction,
+)
 from ..rule_engine import vocabulary as vocab
+from .card_embedder import CardEmbeddingStore
+from .compact_state import CompactState, ZONE_BATTLEFIELD, ZONE_HAND
+from .combat_solver import lethal_from_compact
 
 class SynergyScorer:
-    """Calculates the synergistic potential of a set of cards."""
-    def __init__(self, embeddings):
+    """
+    Calculates the synergistic potential of a set of cards.
+
+    The score is the average cosine similarity over all pairs of cards in the multiset.
+    With unit-length embeddings e_i and their sum s, the sum over all ordered pairs
+    i != j is |s|^2 - sum_i |e_i|^2, so a set costs one gather and one sum instead of
+    an O(n^2) pair loop.
+    """
+    def __init__(self, embeddings: Union[CardEmbeddingStore, Mapping[int, np.ndarray]], memo_size: int = 100_000):
         self.embeddings = embeddings
+        self.memo_size = memo_size
+        self._memo: Dict[Tuple[Tuple[int, int], ...], float] = {}
+        self._build_unit_matrix()
+
+    def _build_unit_matrix(self):
+        """Caches L2-normalized embeddings plus a trailing zero row for cards without one."""
+        if isinstance(self.embeddings, CardEmbeddingStore):
+            first_id, matrix = self.embeddings.first_card_id, np.asarray(self.embeddings.matrix, dtype=np.float32)
+            type_ids = np.arange(first_id, first_id + len(matrix))
+        elif self.embeddings:
+            type_ids = np.array(sorted(self.embeddings), dtype=np.int64)
+            matrix = np.stack([np.asarray(self.embeddings[t], dtype=np.float32) for t in type_ids.tolist()])
+            first_id = int(type_ids[0])
+        else:
+            type_ids, matrix, first_id = np.zeros(0, dtype=np.int64), np.zeros((0, 1), dtype=np.float32), 0
+
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        self._unit = np.concatenate([matrix / np.where(norms > 0, norms, 1.0), np.zeros((1, matrix.shape[1]), dtype=np.float32)])
+        self._zero_row = len(matrix)
+        # Rows with a zero vector behave like missing cards: they never add similarity.
+        self._has_embedding = np.append(norms[:, 0] > 0, False)
+        self._first_id = first_id
+        span = int(type_ids.max()) - first_id + 1 if len(type_ids) else 0
+        self._row_of = np.full(span, self._zero_row, dtype=np.int64)
+        self._row_of[type_ids - first_id] = np.arange(len(type_ids))
+
+    def _rows(self, type_ids: np.ndarray) -> np.ndarray:
+        if not len(self._row_of):
+            return np.full(len(type_ids), self._zero_row, dtype=np.int64)
+        offsets = type_ids - self._first_id
+        valid = (offsets >= 0) & (offsets < len(self._row_of))
+        return np.where(valid, self._row_of[np.where(valid, offsets, 0)], self._zero_row)
+
+    @staticmethod
+    def _pair_average(sum_vectors: np.ndarray, num_cards: np.ndarray, num_embedded: np.ndarray) -> np.ndarray:
+        pairs = num_cards * (num_cards - 1)
+        pair_sums = np.einsum('ij,ij->i', sum_vectors, sum_vectors) - num_embedded
+        return np.where(pairs > 0, pair_sums / np.maximum(pairs, 1), 0.0)
+
+    @staticmethod
+    def _as_counts(cards: Union[Sequence[int], Mapping[int, int]]) -> Tuple[Tuple[int, int], ...]:
+        """Canonical memo key: the sorted (type_id, count) pairs of a multiset."""
+        counts = cards if isinstance(cards, Mapping) else Counter(cards)
+        return tuple(sorted((int(t), int(c)) for t, c in counts.items() if c > 0))
 
     def score_set(self, cards: List[Entity]) -> float:
         """Scores the synergy of a given list of cards (e.g., a hand or board)."""
         if not cards:
             return 0.0
-        # A real implementation would use the embeddings to find clusters
-        # and complementary keywords/abilities.
-        # For example, calculating the average cosine similarity between all pairs of card embeddings.
-        return 0.0 # Placeholder
+        counts = Counter()
+        for card in cards:
+            counts[card.type_id] += card.count if isinstance(card, CompositeTokenEntity) else 1
+        return self.score_multiset(counts)
+
+    def score_multiset(self, cards: Union[Sequence[int], Mapping[int, int]]) -> float:
+        """Scores a multiset of card type_ids given as a list or a {type_id: count} mapping."""
+        return float(self.score_batch([cards])[0])
+
+    def score_batch(self, card_sets: Sequence[Union[Sequence[int], Mapping[int, int]]]) -> np.ndarray:
+        """Scores many hands/boards at once; repeated multisets are served from the memo."""
+        keys = [self._as_counts(cards) for cards in card_sets]
+        scores = np.zeros(len(keys), dtype=np.float64)
+        missing = {}
+        for i, key in enumerate(keys):
+            if key in self._memo:
+                scores[i] = self._memo[key]
+            else:
+                missing.setdefault(key, []).append(i)
+        if not missing:
+            return scores
+
+        unique_keys = list(missing)
+        lengths = np.array([len(key) for key in unique_keys], dtype=np.int64)
+        flat = np.array([pair for key in unique_keys for pair in key], dtype=np.int64).reshape(-1, 2)
+        rows = self._rows(flat[:, 0])
+        weights = flat[:, 1].astype(np.float32)
+        starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+        nonempty = lengths > 0
+
+        sum_vectors = np.zeros((len(unique_keys), self._unit.shape[1]), dtype=np.float32)
+        num_cards = np.zeros(len(unique_keys), dtype=np.float64)
+        num_embedded = np.zeros(len(unique_keys), dtype=np.float64)
+        if len(flat):
+            # One gather plus a segmented sum for every multiset in the batch.
+            sum_vectors[nonempty] = np.add.reduceat(self._unit[rows] * weights[:, None], starts[nonempty], axis=0)
+            num_cards[nonempty] = np.add.reduceat(weights, starts[nonempty])
+            num_embedded[nonempty] = np.add.reduceat(weights * self._has_embedding[rows], starts[nonempty])
+        unique_scores = self._pair_average(sum_vectors.astype(np.float64), num_cards, num_embedded)
+
+        if len(self._memo) + len(unique_keys) > self.memo_size:
+            self._memo.clear()
+        for key, score in zip(unique_keys, unique_scores.tolist()):
+            self._memo[key] = score
+            scores[missing[key]] = score
+        return scores
+
+# Per-move deltas computed by ImpactScorer, from the point of view of the moving player.
+IMPACT_FEATURES = (
+    "life_self", "life_opponent", "board_self", "board_opponent",
+    "cards_self", "cards_opponent", "mana_used", "lands",
+)
+(LIFE_SELF, LIFE_OPPONENT, BOARD_SELF, BOARD_OPPONENT,
+ CARDS_SELF, CARDS_OPPONENT, MANA_USED, LANDS) = range(len(IMPACT_FEATURES))
+
+# Move kinds understood by ImpactScorer; anything else (passing) has no immediate impact.
+MOVE_OTHER, MOVE_PLAY_LAND, MOVE_TAP_MANA, MOVE_CAST, MOVE_ATTACK, MOVE_BLOCK = range(6)
+
+DEFAULT_IMPACT_WEIGHTS = {
+    "board_self": 0.5, "board_opponent": -0.5,
+    "cards_self": 1.0, "cards_opponent": -1.0,
+    "mana_used": 0.3, "lands": 1.5,
+}
 
 class ImpactScorer:
-    """Calculates the immediate, contextual impact of a card or play."""
+    """
+    Calculates the immediate, contextual impact of a card or play.
+
+    Every legal move is applied as a one-step lookahead on a CompactState: instead of
+    cloning the graph, each move is turned into a row of deltas (IMPACT_FEATURES) in one
+    vectorized pass. Life deltas are valued through a concave utility so that the same
+    damage matters more the lower the life total, and reaching 0 life adds `lethal_bonus`.
+    Combat moves assume the opponent answers with their best single block.
+    """
+    def __init__(self, weights: Optional[Mapping[str, float]] = None, life_weight: float = 4.0, lethal_bonus: float = 100.0):
+        weights = {**DEFAULT_IMPACT_WEIGHTS, **(weights or {})}
+        self.weights = np.array([weights.get(name, 0.0) for name in IMPACT_FEATURES])
+        self.life_weight = life_weight
+        self.lethal_bonus = lethal_bonus
+
     def score_play(self, move, graph: GameGraph) -> float:
         """
         Scores the impact of a potential move in the current game context.
         Example: A 'Lightning Bolt' has low impact against an empty board at turn 2,
         but has game-winning impact when the opponent is at 3 life.
         """
-        # This requires simulating the move and evaluating the resulting state change.
-        # e.g., change in life totals, change in board presence (total power/toughness).
-        return 0.0 # Placeholder
+        return float(self.score_moves([move], graph)[0])
+
+    def score_moves(self, moves: Sequence, graph: GameGraph, state: Optional[CompactState] = None) -> np.ndarray:
+        """Scores a whole legal move list; pass `state` to reuse one snapshot for several calls."""
+        state = state or CompactState.from_graph(graph)
+        return self.score_deltas(*self.impact_deltas(moves, state))
+
+    def _encode_moves(self, moves: Sequence, state: CompactState):
+        """Move kind, mover side, card row, second row (attacker of a block) and count per move."""
+        kinds = np.zeros(len(moves), dtype=np.int64)
+        sides = np.zeros(len(moves), dtype=np.int64)
+        rows = np.full(len(moves), -1, dtype=np.int64)
+        targets = np.full(len(moves), -1, dtype=np.int64)
+        counts = np.ones(len(moves), dtype=np.int64)
+        row_of, side_of = state.row_of, state.side_of
+        for i, move in enumerate(moves):
+            sides[i] = side_of.get(move.player_id.int, state.active_side)
+            move_type = type(move)
+            if move_type is PlayLandAction:
+                kinds[i], rows[i] = MOVE_PLAY_LAND, row_of.get(move.card_id.int, -1)
+            elif move_type is ActivateManaAbilityAction:
+                kinds[i], rows[i] = MOVE_TAP_MANA, row_of.get(move.card_id.int, -1)
+            elif move_type is CastSpellAction:
+                kinds[i], rows[i] = MOVE_CAST, row_of.get(move.card_id.int, -1)
+            elif move_type is DeclareAttackerAction:
+                kinds[i], rows[i] = MOVE_ATTACK, row_of.get(move.card_id.int, -1)
+            elif move_type is DeclareTokenAttackersAction:
+                kinds[i], rows[i], counts[i] = MOVE_ATTACK, row_of.get(move.card_id.int, -1), move.count
+            elif move_type is DeclareBlockerAction:
+                kinds[i], rows[i], targets[i] = MOVE_BLOCK, row_of.get(move.blocker_id.int, -1), row_of.get(move.attacker_id.int, -1)
+            elif move_type is DeclareTokenBlockersAction:
+                kinds[i], rows[i], targets[i], counts[i] = MOVE_BLOCK, row_of.get(move.blocker_id.int, -1), row_of.get(move.attacker_id.int, -1), move.count
+        # Moves on cards outside the snapshot (e.g. already resolved) are treated as passes.
+        kinds[(rows < 0) | ((kinds == MOVE_BLOCK) & (targets < 0))] = MOVE_OTHER
+        return kinds, sides, rows, targets, counts
+
+    def impact_deltas(self, moves: Sequence, state: CompactState) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns (deltas [M, F], life before [M, 2]). Life columns of
+        `life before` are (mover, opponent) and already include unblocked combat damage
+        that is on its way, so blocks are valued by the damage they prevent.
+        """
+        kinds, sides, rows, targets, counts = self._encode_moves(moves, state)
+        opponents = 1 - sides
+        deltas = np.zeros((len(moves), len(IMPACT_FEATURES)))
+        life_before = np.stack([state.life[sides], state.life[opponents]], axis=1).astype(np.float64)
+        safe_rows = np.maximum(rows, 0)
+        power, toughness = state.power[safe_rows], state.toughness[safe_rows]
+        value = power + np.maximum(toughness, 0) # Board presence of one card/token
+
+        # Incoming unblocked damage per side (attacking creatures of the other side).
+        unblocked = (state.zone == ZONE_BATTLEFIELD) & ~state.blocked
+        incoming = np.zeros(2)
+        np.add.at(incoming, 1 - state.side[unblocked], (state.power * state.attacking)[unblocked])
+
+        # Lands and mana
+        land = kinds == MOVE_PLAY_LAND
+        deltas[land, LANDS] = 1.0
+        cast = kinds == MOVE_CAST
+        deltas[cast, MANA_USED] = state.cmc[safe_rows[cast]]
+        creature = cast & state.is_creature[safe_rows]
+        deltas[creature, BOARD_SELF] = value[creature]
+        deltas[cast, LIFE_OPPONENT] = -state.spell_damage[safe_rows[cast]]
+        tap = np.flatnonzero(kinds == MOVE_TAP_MANA)
+        if len(tap):
+            deltas[tap, MANA_USED] = self._tap_value(state, sides[tap])
+
+        attack = np.flatnonzero(kinds == MOVE_ATTACK)
+        if len(attack):
+            life_before[attack, 1] -= incoming[opponents[attack]]
+            self._attack_deltas(state, deltas, attack, rows[attack], sides[attack], counts[attack], life_before[attack, 1])
+
+        block = np.flatnonzero(kinds == MOVE_BLOCK)
+        if len(block):
+            life_before[block, 0] -= incoming[sides[block]]
+            self._block_deltas(state, deltas, block, rows[block], targets[block], counts[block])
+        return deltas, life_before
+
+    @staticmethod
+    def _tap_value(state: CompactState, sides: np.ndarray) -> np.ndarray:
+        """+1 if the extra floating mana gets a spell in hand closer to castable, -1 if it would float unused."""
+        values = np.full(len(sides), -1.0)
+        for side in np.unique(sides):
+            in_hand = (state.zone == ZONE_HAND) & (state.side == side) & ~state.is_land
+            pool = state.mana_pool[side]
+            if np.any((state.cmc[in_hand] > pool) & (state.cmc[in_hand] <= state.untapped_mana(side))):
+                values[sides == side] = 1.0
+        return values
+
+    @staticmethod
+    def _attack_deltas(state: CompactState, deltas: np.ndarray, moves: np.ndarray, rows: np.ndarray, sides: np.ndarray, counts: np.ndarray, opponent_life: np.ndarray):
+        """
+        Values attacks against the defender's best response: each attacker (or token) is
+        blocked by the untapped creature that gains the defender the most, if any block
+        is not a loss for them, and chump-blocked when its damage would be lethal.
+        """
+        blockers = np.flatnonzero((state.zone == ZONE_BATTLEFIELD) & state.is_creature & (state.untapped > 0))
+        a_power, a_toughness = state.power[rows], state.toughness[rows]
+        damage = a_power * counts
+        blocked_count = np.zeros(len(rows))
+        attackers_lost = np.zeros(len(rows))
+        blockers_lost_value = np.zeros(len(rows))
+        blockers_lost = np.zeros(len(rows))
+        if len(blockers):
+            b_power, b_toughness = state.power[blockers], state.toughness[blockers]
+            can_block = (state.side[blockers][None, :] != sides[:, None]) & (~state.flying[rows][:, None] | state.flying[blockers][None, :] | state.reach[blockers][None, :])
+            kills_attacker = b_power[None, :] >= a_toughness[:, None]
+            blocker_dies = a_power[:, None] >= b_toughness[None, :]
+            gain = kills_attacker * (a_power + a_toughness)[:, None] - blocker_dies * (b_power + b_toughness)[None, :]
+            willing = can_block & ((gain > 0) | ~blocker_dies)
+            lethal = damage >= opponent_life
+            willing |= can_block & lethal[:, None]
+            available = willing * state.untapped[blockers][None, :]
+            blocked_count = np.minimum(counts, available.sum(axis=1))
+            # The best blocker decides the outcome for a single attacker; tokens face as many blockers as there are.
+            best = np.argmax(np.where(willing, gain, -np.inf), axis=1)
+            picked = np.arange(len(rows))
+            attackers_lost = np.where(blocked_count > 0, np.minimum(blocked_count, (available * kills_attacker).sum(axis=1)), 0)
+            single = counts == 1
+            attackers_lost[single] = (blocked_count[single] > 0) & kills_attacker[picked[single], best[single]]
+            blockers_lost = np.where(blocked_count > 0, np.minimum(blocked_count, (available * blocker_dies).sum(axis=1)), 0)
+            blockers_lost[single] = (blocked_count[single] > 0) & blocker_dies[picked[single], best[single]]
+            blockers_lost_value = blockers_lost * (b_power + b_toughness)[best]
+            damage = a_power * (counts - blocked_count)
+
+        deltas[moves, LIFE_OPPONENT] -= damage
+        deltas[moves, LIFE_SELF] += damage * state.lifelink[rows]
+        deltas[moves, BOARD_SELF] -= attackers_lost * (a_power + np.maximum(a_toughness, 0))
+        deltas[moves, CARDS_SELF] -= attackers_lost * ~state.is_token[rows]
+        deltas[moves, BOARD_OPPONENT] -= blockers_lost_value
+        deltas[moves, CARDS_OPPONENT] -= blockers_lost
+
+    @staticmethod
+    def _block_deltas(state: CompactState, deltas: np.ndarray, moves: np.ndarray, rows: np.ndarray, targets: np.ndarray, counts: np.ndarray):
+        """Values blocks by the damage they prevent and the creatures that die on each side."""
+        b_power, b_toughness = state.power[rows], state.toughness[rows]
+        a_power, a_toughness = state.power[targets], state.toughness[targets]
+        prevented = np.where(state.blocked[targets], 0, a_power)
+        kills_attacker = b_power * counts >= a_toughness
+        blockers_lost = np.minimum(counts, a_power // np.maximum(b_toughness, 1))
+        deltas[moves, LIFE_SELF] += prevented
+        deltas[moves, BOARD_OPPONENT] -= kills_attacker * (a_power + np.maximum(a_toughness, 0))
+        deltas[moves, CARDS_OPPONENT] -= kills_attacker * ~state.is_token[targets]
+        deltas[moves, BOARD_SELF] -= blockers_lost * (b_power + np.maximum(b_toughness, 0))
+        deltas[moves, CARDS_SELF] -= blockers_lost * ~state.is_token[rows]
+
+    def _life_utility(self, life: np.ndarray) -> np.ndarray:
+        return self.life_weight * np.log1p(np.maximum(life, 0))
+
+    def score_deltas(self, deltas: np.ndarray, life_before: np.ndarray) -> np.ndarray:
+        """Weighted sum of the deltas plus the change in life utility and lethal bonuses."""
+        life_after = life_before + deltas[:, [LIFE_SELF, LIFE_OPPONENT]]
+        utility = self._life_utility(life_after) - self._life_utility(life_before)
+        lethal = (life_after <= 0) & (life_before > 0)
+        saved = (life_after > 0) & (life_before <= 0)
+        return (
+            deltas @ self.weights
+            + utility[:, 0] - utility[:, 1]
+            + self.lethal_bonus * (lethal[:, 1].astype(np.float64) - lethal[:, 0] + saved[:, 0] - saved[:, 1])
+        )
 
 class MultiHeadedEvaluator:
     """Combines multiple scoring models into a single evaluation function."""
@@ -56,21 +349,79 @@ class MultiHeadedEvaluator:
                 return [graph.entities[r.source] for r in cards_in_zone_rels]
             return []
 
+        state = CompactState.from_graph(graph)
+        side = state.active_side
+        threat = lethal_from_compact(state, 1 - side, next_turn=True, exact=True)
         scores = {
             "board_synergy": self.synergy_scorer.score_set(get_cards_in_zone(active_player, vocab.ID_ZONE_BATTLEFIELD)),
             "hand_potential": self.synergy_scorer.score_set(get_cards_in_zone(active_player, vocab.ID_ZONE_HAND)),
-            "opponent_threat": 0.0, # Placeholder for opponent board evaluation
+            "opponent_threat": min(1.0, threat.damage / max(int(state.life[side]), 1)), # Share of our life the opponent's next attack takes through our best blocks
             "hail_mary_needed": 0.0 # Value from 0 to 1 indicating desperation
         }
 
         # Hail Mary Logic: If opponent has lethal on board and we have no blockers,
         # the desperation/hail_mary_needed score should be high.
-        if self._is_desperate(graph):
+        if self._is_desperate(graph, state):
             scores["hail_mary_needed"] = 1.0
 
         return scores
 
-    def _is_desperate(self, graph: GameGraph) -> bool:
-        """A private method to determine if the bot is in a desperate situation."""
-        # Placeholder for logic that checks if the bot is about to lose.
-        return False
+    def _is_desperate(self, graph: GameGraph, state: Optional[CompactState] = None) -> bool:
+        """
+        The active player is desperate when the opponent's next attack is lethal through
+        our best blocks and our own attack this turn is not.
+        """
+        state = state or CompactState.from_graph(graph)
+        side = state.active_side
+        return lethal_from_compact(state, 1 - side, next_turn=True).lethal and not lethal_from_compact(state, side).lethal
+
+def _build_benchmark_moves(creatures_per_side: int = 8, hand_size: int = 7):
+    """A mid-game board: both sides have lands and creatures, side 0 has attacked with half of them."""
+    from ..rule_engine import game_initializer
+    from ..rule_engine.card_database import card_data_loader
+
+    forest = card_data_loader.get_card_id_by_name("Forest")
+    dreadmaw = card_data_loader.get_card_id_by_name("Colossal Dreadmaw")
+    graph = game_initializer.initialize_game_state([forest, dreadmaw] * 30, [forest, dreadmaw] * 30, shuffle=True)
+    graph.turn_number = 6
+    zones = {}
+    for rel in graph.relationships:
+        if rel.type_id == vocab.ID_REL_CONTROLS and graph.entities[rel.target].type_id in (vocab.ID_ZONE_BATTLEFIELD, vocab.ID_ZONE_HAND, vocab.ID_ZONE_LIBRARY):
+            zones[(rel.source, graph.entities[rel.target].type_id)] = graph.entities[rel.target]
+    cards_in = lambda player_id, zone_type: [graph.entities[r.source] for r in graph.get_relationships(target=zones[(player_id, zone_type)], rel_type=vocab.ID_REL_IS_IN_ZONE)]
+
+    for player_id in graph.players:
+        library = cards_in(player_id, vocab.ID_ZONE_LIBRARY)
+        for card in [c for c in library if c.properties.get('is_creature')][:creatures_per_side] + [c for c in library if c.properties.get('is_land')][:5]:
+            graph._move_card_to_zone(card, zones[(player_id, vocab.ID_ZONE_BATTLEFIELD)])
+            card.properties['turn_entered'] = 1
+    graph.create_tokens(graph.entities[graph.players[1]], dreadmaw, 10).tokens[:, TOKEN_SUMMONING_SICK] = 0
+
+    attacker_side, blocker_side = graph.players
+    attackers = [c for c in cards_in(attacker_side, vocab.ID_ZONE_BATTLEFIELD) if c.properties.get('is_creature')]
+    for attacker in attackers[::2]:
+        attacker.properties['is_attacking'] = True
+    moves = [PlayLandAction(attacker_side, c.instance_id) for c in cards_in(attacker_side, vocab.ID_ZONE_HAND) if c.properties.get('is_land')]
+    moves += [CastSpellAction(attacker_side, c.instance_id) for c in cards_in(attacker_side, vocab.ID_ZONE_HAND)[:hand_size] if not c.properties.get('is_land')]
+    moves += [ActivateManaAbilityAction(attacker_side, c.instance_id, 0) for c in cards_in(attacker_side, vocab.ID_ZONE_BATTLEFIELD) if c.properties.get('is_land')]
+    moves += [DeclareAttackerAction(attacker_side, c.instance_id) for c in attackers[1::2]]
+    blockers = [c for c in cards_in(blocker_side, vocab.ID_ZONE_BATTLEFIELD) if c.properties.get('is_creature') or isinstance(c, CompositeTokenEntity)]
+    moves += [DeclareBlockerAction(blocker_side, b.instance_id, a.instance_id) for b in blockers for a in attackers[::2]]
+    return graph, moves
+
+def benchmark(repeats: int = 200):
+    """Prints the time to snapshot a mid-game graph and to score its full move list."""
+    graph, moves = _build_benchmark_moves()
+    scorer = ImpactScorer()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        state = CompactState.from_graph(graph)
+    snapshot = (time.perf_counter() - start) / repeats
+    start = time.perf_counter()
+    for _ in range(repeats):
+        scorer.score_moves(moves, graph, state)
+    scoring = (time.perf_counter() - start) / repeats
+    print(f"{len(graph.entities)} entities, {len(moves)} moves: snapshot {snapshot * 1e3:.3f} ms | score all moves {scoring * 1e3:.3f} ms")
+
+if __name__ == "__main__":
+    benchmark()
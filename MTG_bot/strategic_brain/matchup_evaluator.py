@@ -0,0 +1,154 @@
+"""
+Sequential, early-stopping evaluation of deck vs deck matchups.
+
+Instead of a fixed number of games, a matchup is played in batches and checked after
+every batch. It stops on whichever comes first:
+- SPRT: the sequential probability ratio test of H0 "win rate = p0" against
+  H1 "win rate = p1" crosses its log-likelihood-ratio bounds (error rates alpha, beta).
+  Scores of 1 / 0.5 / 0 per game are used, so a draw adds half of a win's and half of
+  a loss's log-likelihood ratio.
+- Precision: the Wilson interval of the win rate is narrower than ±precision.
+- The fixed-N budget `max_games` runs out.
+Each result reports the games saved against always playing `max_games`. Games are
+played with deck_evolution.play_games, spread over a process pool, and can be
+recorded in the deck pool tables of mtg_bot.db.
+"""
+
+import math
+import multiprocessing
+import os
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from .deck_evolution import Decklist, canonical, play_games
+from .deck_pool import DeckPool, wilson_interval
+from .rollout_policy import standard_decklists
+from MTG_bot.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Reasons a matchup evaluation stopped
+STOP_H0, STOP_H1, STOP_PRECISION, STOP_MAX_GAMES = "accept_h0", "accept_h1", "precision", "max_games"
+
+@dataclass
+class SPRT:
+    """Sequential probability ratio test on per-game scores."""
+    p0: float = 0.45
+    p1: float = 0.55
+    alpha: float = 0.05
+    beta: float = 0.05
+
+    @property
+    def bounds(self) -> Tuple[float, float]:
+        """(lower, upper) log-likelihood-ratio bounds: below accepts H0, above accepts H1."""
+        return math.log(self.beta / (1 - self.alpha)), math.log((1 - self.beta) / self.alpha)
+
+    def llr(self, score: float, games: int) -> float:
+        """Log-likelihood ratio of H1 over H0 after `games` games totalling `score`."""
+        return score * math.log(self.p1 / self.p0) + (games - score) * math.log((1 - self.p1) / (1 - self.p0))
+
+    def decision(self, score: float, games: int) -> Optional[str]:
+        lower, upper = self.bounds
+        llr = self.llr(score, games)
+        return STOP_H1 if llr >= upper else STOP_H0 if llr <= lower else None
+
+@dataclass
+class MatchupResult:
+    scores: List[float] # Per game, from the deck's side
+    stop_reason: str
+    max_games: int
+
+    @property
+    def games(self) -> int:
+        return len(self.scores)
+
+    @property
+    def win_rate(self) -> float:
+        return sum(self.scores) / self.games if self.scores else 0.5
+
+    @property
+    def interval(self) -> Tuple[float, float]:
+        return wilson_interval(sum(self.scores), self.games)
+
+    @property
+    def games_saved(self) -> int:
+        return self.max_games - self.games
+
+class MatchupEvaluator:
+    """
+    Plays matchups in rounds of `batch_size` games per worker until the SPRT decides,
+    the win rate is known to ±`precision`, or `max_games` have been played.
+    `processes=0` plays in the calling process.
+    """
+    def __init__(self, sprt: Optional[SPRT] = None, precision: Optional[float] = 0.05, max_games: int = 1000,
+                 batch_size: int = 10, processes: Optional[int] = None, epsilon: float = 0.1, seed: int = 0):
+        self.sprt = sprt if sprt is not None else SPRT()
+        self.precision = precision
+        self.max_games = max_games
+        self.batch_size = batch_size
+        self.epsilon = epsilon
+        self.rng = np.random.default_rng(seed)
+        self.processes = os.cpu_count() if processes is None else processes
+        self._pool = multiprocessing.Pool(self.processes) if self.processes else None
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _stop_reason(self, scores: List[float]) -> Optional[str]:
+        decision = self.sprt.decision(sum(scores), len(scores))
+        if decision is not None:
+            return decision
+        low, high = wilson_interval(sum(scores), len(scores))
+        if self.precision is not None and (high - low) / 2 <= self.precision:
+            return STOP_PRECISION
+        return STOP_MAX_GAMES if len(scores) >= self.max_games else None
+
+    def evaluate(self, deck: Decklist, opponent: Decklist) -> MatchupResult:
+        scores: List[float] = []
+        reason = None
+        while reason is None:
+            # play_games alternates the starting deck, so even batch sizes keep starts balanced.
+            remaining = self.max_games - len(scores)
+            batches = [min(self.batch_size, remaining - i * self.batch_size) for i in range(max(self.processes, 1))]
+            tasks = [(deck, opponent, games, int(self.rng.integers(2**63)), self.epsilon) for games in batches if games > 0]
+            for batch in (self._pool.map(play_games, tasks) if self._pool else map(play_games, tasks)):
+                scores.extend(batch)
+            reason = self._stop_reason(scores)
+        return MatchupResult(scores, reason, self.max_games)
+
+    def evaluate_pool(self, pool: DeckPool, num_matchups: int, mode: str = "ucb") -> List[Tuple[int, int, MatchupResult]]:
+        """Evaluates the pool's next scheduled matchups and records the games in the pool tables."""
+        results = []
+        for deck_id, opponent_id in pool.next_matchups(num_matchups, mode):
+            result = self.evaluate(canonical(pool.load_decklist(deck_id)), canonical(pool.load_decklist(opponent_id)))
+            pool.record_results([(deck_id, opponent_id, score) for score in result.scores])
+            logger.info(f"Deck {deck_id} vs {opponent_id}: {result.win_rate:.3f} over {result.games} games ({result.stop_reason}, {result.games_saved} saved)")
+            results.append((deck_id, opponent_id, result))
+        return results
+
+def benchmark(max_games: int = 400, processes: Optional[int] = None, seed: int = 0):
+    """Evaluates the Standard sample decks against each other and themselves; prints games played vs fixed-N."""
+    names, decklists = standard_decklists()
+    decks = [canonical(decklist) for decklist in decklists]
+    with MatchupEvaluator(max_games=max_games, processes=processes, seed=seed) as evaluator:
+        for (i, j) in ((0, 1), (1, 0), (0, 0)):
+            start = time.perf_counter()
+            result = evaluator.evaluate(decks[i], decks[j])
+            low, high = result.interval
+            print(f"{names[i]} vs {names[j]}: win rate {result.win_rate:.3f} [{low:.3f}, {high:.3f}] after {result.games} games "
+                  f"({result.stop_reason}), {result.games_saved} of {max_games} saved, {time.perf_counter() - start:.1f}s")
+
+if __name__ == "__main__":
+    benchmark()
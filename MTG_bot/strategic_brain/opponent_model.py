@@ -4,46 +4,286 @@ It tries to infer hidden information, such as the opponent's deck archetype
 and the likely cards in their hand.
 """
 
-from typing import List, Dict
+import math
+import time
+import uuid
+from dataclasses import dataclass
+from typing import List, Dict, Mapping, Optional, Sequence, Union
+
+import numpy as np
+
 from ..rule_engine.game_state import GameState, Card
+from ..rule_engine.game_graph import GameGraph
+from ..rule_engine.actions import PlayLandAction, CastSpellAction
+from ..rule_engine.card_database import card_data_loader
+from ..rule_engine import vocabulary as vocab
+from .archetype_classifier import ArchetypeClassifier
+from MTG_bot.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+HIDDEN_ZONES = (vocab.ID_ZONE_HAND, vocab.ID_ZONE_LIBRARY)
+# (from zone, to zone) of the card an opponent move puts into view; the engine resolves spells straight onto the battlefield
+REVEALING_MOVES = {
+    PlayLandAction: (vocab.ID_ZONE_HAND, vocab.ID_ZONE_BATTLEFIELD),
+    CastSpellAction: (vocab.ID_ZONE_HAND, vocab.ID_ZONE_BATTLEFIELD),
+}
+
+@dataclass
+class Particles:
+    """
+    M sampled determinizations of the opponent's hidden zones.
+
+    Counts are [M, K] arrays whose columns follow `card_ids`; library order is
+    left open so each determinization can shuffle it lazily.
+    """
+    card_ids: np.ndarray
+    hand_counts: np.ndarray
+    library_counts: np.ndarray
+    weights: np.ndarray # Normalized importance weights, uniform without a prior
+
+    def __len__(self) -> int:
+        return len(self.hand_counts)
+
+    def hand(self, i: int) -> List[int]:
+        """The card type_ids in the hand of particle i."""
+        return np.repeat(self.card_ids, self.hand_counts[i]).tolist()
+
+    def library(self, i: int, rng: Optional[np.random.Generator] = None) -> List[int]:
+        """The library of particle i in a random order (last entry = top card)."""
+        cards = np.repeat(self.card_ids, self.library_counts[i])
+        (rng or np.random.default_rng()).shuffle(cards)
+        return cards.tolist()
+
+class BeliefTracker:
+    """
+    Exact card-count bookkeeping for one opponent whose decklist is known.
+
+    Cards that were seen in a public zone (battlefield, graveyard, exile, stack) or
+    revealed in hand are subtracted from the decklist; everything else is an unknown
+    multiset shared by the hand and the library. Cards put back into the library
+    become unknown again.
+    """
+    def __init__(self, decklist: Sequence[int]):
+        self.card_ids, self.deck_counts = np.unique(np.asarray(decklist, dtype=np.int64), return_counts=True)
+        self._index = {int(card_id): i for i, card_id in enumerate(self.card_ids)}
+        self.public_counts: Dict[int, np.ndarray] = {}
+        self.known_hand_counts = np.zeros(len(self.card_ids), dtype=np.int64)
+        self.unknown_counts = self.deck_counts.astype(np.int64)
+        self.hand_size = 0
+        self.library_size = len(decklist)
+
+    def _column(self, card_id: int) -> int:
+        column = self._index.get(card_id)
+        if column is None:
+            raise ValueError(f"Card {card_id} is not part of the tracked decklist.")
+        return column
+
+    def observe_move(self, from_zone: Optional[int], to_zone: int, card_id: Optional[int] = None):
+        """
+        Updates the counts for one card moving between zones of the opponent.
+
+        `card_id` is None when the card was not seen (e.g. a draw). `from_zone` is None
+        for cards that enter from outside the tracked deck. Moves from hand to hand are ignored.
+        """
+        if card_id is None and (from_zone not in HIDDEN_ZONES or to_zone not in HIDDEN_ZONES):
+            raise ValueError("Only moves between hidden zones can have an unknown card.")
+        if from_zone == to_zone == vocab.ID_ZONE_HAND:
+            return
+        column = self._column(card_id) if card_id is not None else None
+
+        if from_zone == vocab.ID_ZONE_HAND:
+            self.hand_size -= 1
+        elif from_zone == vocab.ID_ZONE_LIBRARY:
+            self.library_size -= 1
+        if column is not None:
+            if from_zone in HIDDEN_ZONES:
+                if from_zone == vocab.ID_ZONE_HAND and self.known_hand_counts[column] > 0:
+                    self.known_hand_counts[column] -= 1
+                elif self.unknown_counts[column] > 0:
+                    self.unknown_counts[column] -= 1
+                else:
+                    raise ValueError(f"Card {card_id} left a hidden zone but no unseen copy is left.")
+            elif from_zone is not None:
+                counts = self.public_counts.get(from_zone)
+                if counts is None or counts[column] == 0:
+                    raise ValueError(f"Card {card_id} left zone {from_zone} but no copy of it was seen there.")
+                counts[column] -= 1
+
+        if to_zone == vocab.ID_ZONE_HAND:
+            self.hand_size += 1
+            # A seen card entering the hand (bounced, or tutored from the library) stays known
+            if column is not None:
+                self.known_hand_counts[column] += 1
+        elif to_zone == vocab.ID_ZONE_LIBRARY:
+            self.library_size += 1
+            if column is not None:
+                self.unknown_counts[column] += 1
+        elif column is not None:
+            self.public_counts.setdefault(to_zone, np.zeros(len(self.card_ids), dtype=np.int64))[column] += 1
+
+    def possible_card_ids(self) -> np.ndarray:
+        """Card ids that may still be in the hand or library."""
+        return self.card_ids[(self.unknown_counts > 0) | (self.known_hand_counts > 0)]
+
+    def reveal_hand_card(self, card_id: int):
+        """Marks one card in hand as known (e.g. revealed by an effect)."""
+        column = self._column(card_id)
+        if self.unknown_counts[column] == 0:
+            raise ValueError(f"No unseen copy of card {card_id} is left to reveal.")
+        self.unknown_counts[column] -= 1
+        self.known_hand_counts[column] += 1
+
+    def sync_from_graph(self, graph: GameGraph, player_id: uuid.UUID):
+        """Rebuilds public counts and hidden zone sizes from the graph, keeping known hand cards."""
+        zones = {}
+        for rel in graph.relationships:
+            if rel.type_id == vocab.ID_REL_CONTROLS and rel.source == player_id:
+                zone = graph.entities.get(rel.target)
+                if zone is not None and zone.type_id in (vocab.ID_ZONE_HAND, vocab.ID_ZONE_LIBRARY, vocab.ID_ZONE_BATTLEFIELD, vocab.ID_ZONE_GRAVEYARD, vocab.ID_ZONE_STACK, vocab.ID_ZONE_EXILE):
+                    zones[rel.target] = zone.type_id
+
+        self.public_counts = {}
+        self.hand_size = self.library_size = 0
+        for rel in graph.relationships:
+            zone_type = zones.get(rel.target) if rel.type_id == vocab.ID_REL_IS_IN_ZONE else None
+            if zone_type is None:
+                continue
+            if zone_type == vocab.ID_ZONE_HAND:
+                self.hand_size += 1
+            elif zone_type == vocab.ID_ZONE_LIBRARY:
+                self.library_size += 1
+            else:
+                column = self._index.get(graph.entities[rel.source].type_id)
+                if column is None:
+                    logger.warning(f"Ignoring card {graph.entities[rel.source].type_id} that is not in the tracked decklist.")
+                    continue
+                self.public_counts.setdefault(zone_type, np.zeros(len(self.card_ids), dtype=np.int64))[column] += 1
+
+        seen = sum(self.public_counts.values(), np.zeros(len(self.card_ids), dtype=np.int64))
+        self.known_hand_counts = np.minimum(self.known_hand_counts, self.deck_counts - seen)
+        self.unknown_counts = self.deck_counts - seen - self.known_hand_counts
+
+    def sample(self, num_particles: int, rng: Optional[np.random.Generator] = None, prior: Optional[Mapping[int, float]] = None) -> Particles:
+        """
+        Samples hand/library splits consistent with the counts.
+
+        `prior` maps card ids to a relative likelihood of being held in hand (e.g. from an
+        archetype model); particles are then weighted by the product over unseen hand cards.
+        Likelihoods must be positive: a zero would give every particle holding the card zero weight.
+        """
+        rng = rng or np.random.default_rng()
+        unseen_hand = self.hand_size - int(self.known_hand_counts.sum())
+        if unseen_hand < 0 or unseen_hand + self.library_size != int(self.unknown_counts.sum()):
+            raise ValueError(f"Counts are inconsistent: {unseen_hand} unseen hand cards and {self.library_size} library cards, but {int(self.unknown_counts.sum())} unknown cards.")
+
+        drawn = rng.multivariate_hypergeometric(self.unknown_counts, unseen_hand, size=num_particles, method='count')
+        weights = np.full(num_particles, 1.0 / num_particles)
+        if prior is not None:
+            likelihoods = np.array([prior.get(int(card_id), 1.0) for card_id in self.card_ids], dtype=np.float64)
+            if (likelihoods <= 0).any():
+                raise ValueError("Prior likelihoods must be positive.")
+            log_prior = np.log(likelihoods)
+            log_weights = drawn @ log_prior
+            weights = np.exp(log_weights - log_weights.max())
+            weights /= weights.sum()
+        return Particles(
+            card_ids=self.card_ids,
+            hand_counts=drawn + self.known_hand_counts,
+            library_counts=self.unknown_counts - drawn,
+            weights=weights,
+        )
+
+    def hand_probabilities(self) -> Dict[int, float]:
+        """Exact probability that the hand holds at least one copy of each card."""
+        unseen_hand = self.hand_size - int(self.known_hand_counts.sum())
+        unknown_total = int(self.unknown_counts.sum())
+        probabilities = {}
+        for card_id, known, unknown in zip(self.card_ids.tolist(), self.known_hand_counts.tolist(), self.unknown_counts.tolist()):
+            if known:
+                probabilities[card_id] = 1.0
+            elif unknown and unseen_hand > 0:
+                probabilities[card_id] = 1.0 - math.comb(unknown_total - unknown, unseen_hand) / math.comb(unknown_total, unseen_hand)
+        return probabilities
 
 class OpponentModel:
     """Models the opponent's strategy and potential plays."""
-    def __init__(self):
-        # This could load pre-computed data about deck archetypes.
-        self.archetype_definitions = {}
+    def __init__(self, belief: Optional[BeliefTracker] = None, archetype_classifier: Optional[ArchetypeClassifier] = None):
+        self.archetype_classifier = archetype_classifier
         self.detected_archetype = "Unknown"
+        self.belief = belief
 
-    def update(self, opponent_move, game_state: GameState):
+    def update(self, opponent_move, game_state: Union[GameState, GameGraph]):
         """
         Updates the model with the latest action from the opponent.
-        This is where archetype detection would happen.
+        Moves that put a card into view (playing a land, casting a spell) update the card counts
+        and the archetype posterior; moves of cards already in view (tapping for mana, attacking)
+        would count the same card again.
         """
         # Example: if opponent plays Mountain -> Mountain -> Goblin Guide,
         # we can be fairly certain the archetype is "Mono-Red Aggro".
-        pass
+        zones = REVEALING_MOVES.get(type(opponent_move))
+        if zones is None or not isinstance(game_state, GameGraph) or opponent_move.card_id not in game_state.entities:
+            return
+        card_type_id = game_state.entities[opponent_move.card_id].type_id
+        if self.belief is not None:
+            self.belief.observe_move(*zones, card_type_id)
+        self.observe_revealed_card(card_type_id)
+
+    def observe_revealed_card(self, card_type_id: int):
+        """Feeds one revealed card to the archetype classifier."""
+        if self.archetype_classifier is None:
+            return
+        self.archetype_classifier.observe(card_type_id)
+        self.detected_archetype = self.archetype_classifier.ranked(1)[0][0]
 
     def infer_hand_probabilities(self) -> Dict[str, float]:
         """
-        Based on the detected archetype, returns a probability distribution
+        Based on the tracked card counts, returns a probability distribution
         over cards that are likely in the opponent's hand.
 
         Returns:
             A dictionary mapping card names to their probability of being in hand.
         """
-        if self.detected_archetype == "Mono-Red Aggro":
-            return {"Lightning Bolt": 0.75, "Rift Bolt": 0.6, "Goblin Guide": 0.2}
-        
-        return {}
+        if self.belief is None:
+            return {}
+        probabilities = {}
+        for card_id, probability in self.belief.hand_probabilities().items():
+            name = card_data_loader.get_card_data_by_id(card_id).get('name', str(card_id))
+            probabilities[name] = max(probabilities.get(name, 0.0), probability)
+        return probabilities
 
 def opponent_predictor(game_state_encoding):
     # This takes the output of the game-state encoder after the latest move has been made by an opponent.
     # Our beliefs about the opponent's hand don't change after our own turns.
-    
+
     # We predict M cards in the opponent's hand, and we can create P different versions of this prediction
     # to allow for the fact that simulating against a combined set of likely cards (e.g., cards 2 and 3)
     # is better than only simulating against the single most likely card.
-    
+
     # We predict cards by using the predicted entity encoding and finding candidate cards
     # with some variant of K-Nearest Neighbors (KNN) or an optimized, approximate KNN.
     pass
+
+def benchmark(num_particles: int = 100_000, repeats: int = 10):
+    """Prints the particle sampling rate for a 60-card deck after the opening hand."""
+    decklist = [card_id for card_id in card_data_loader.get_all_card_ids()[:15] for _ in range(4)]
+    tracker = BeliefTracker(decklist)
+    for _ in range(7):
+        tracker.observe_move(vocab.ID_ZONE_LIBRARY, vocab.ID_ZONE_HAND)
+    tracker.observe_move(vocab.ID_ZONE_HAND, vocab.ID_ZONE_BATTLEFIELD, decklist[0])
+    prior = {decklist[4]: 2.0}
+    rng = np.random.default_rng(0)
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        tracker.sample(num_particles, rng)
+    uniform_rate = repeats * num_particles / (time.perf_counter() - start)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        tracker.sample(num_particles, rng, prior=prior)
+    weighted_rate = repeats * num_particles / (time.perf_counter() - start)
+    print(f"uniform: {uniform_rate:,.0f} particles/s | with prior: {weighted_rate:,.0f} particles/s")
+
+if __name__ == "__main__":
+    benchmark()
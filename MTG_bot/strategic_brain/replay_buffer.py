@@ -0,0 +1,203 @@
+"""
+Self-play experience replay stored as fixed-schema shards on disk.
+
+Each decision is one record: the StateConverter observation, the legal-move mask, the
+MCTS visit distribution and the final outcome from the deciding player's side. Moves
+are the engine's legal-move list, padded to `max_moves` slots.
+
+A shard is a single .npy file holding a structured array, so one record is contiguous
+on disk and readers map the shards with np.memmap instead of loading them. Shards
+are kept small rather than zlib-compressed (a compressed .npz cannot be mapped):
+observations and visit distributions are float16 and the legal mask is bit-packed.
+Writers (one per self-play worker) write to a temporary file and rename it, so
+readers never see a half-written shard. Old shards are evicted by age, count or
+total size.
+"""
+
+import glob
+import os
+import time
+import uuid
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from .. import config
+from .state_converter import OBSERVATION_SIZE
+from MTG_bot.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+DEFAULT_MAX_MOVES = 64
+
+def record_dtype(observation_size: int = OBSERVATION_SIZE, max_moves: int = DEFAULT_MAX_MOVES) -> np.dtype:
+    """The fixed record schema of a shard."""
+    return np.dtype([
+        ("observation", np.float16, (observation_size,)),
+        ("legal", np.uint8, ((max_moves + 7) // 8,)), # np.packbits of the legal-move mask
+        ("policy", np.float16, (max_moves,)), # Normalised MCTS visit counts
+        ("outcome", np.int8), # +1 win, -1 loss, 0 draw, for the player who decided
+        ("turn", np.int16),
+    ])
+
+@dataclass
+class ReplayBatch:
+    observation: np.ndarray # [B, observation_size] float32
+    legal: np.ndarray # [B, max_moves] bool
+    policy: np.ndarray # [B, max_moves] float32
+    outcome: np.ndarray # [B] float32
+    turn: np.ndarray # [B] int64
+
+class ReplayWriter:
+    """
+    Buffers the decisions of the games a worker plays and writes them as shards. The
+    outcome of a decision is only known once its game ends, so records are staged per
+    game until `finish_game`.
+    """
+    def __init__(self, directory: str = config.REPLAY_BUFFER_DIR, shard_size: int = 4096,
+                 observation_size: int = OBSERVATION_SIZE, max_moves: int = DEFAULT_MAX_MOVES):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.shard_size = shard_size
+        self.max_moves = max_moves
+        self.dtype = record_dtype(observation_size, max_moves)
+        self._records = np.zeros(shard_size, dtype=self.dtype)
+        self._size = 0
+        self._game: List[tuple] = []
+        self._prefix = uuid.uuid4().hex[:8] # Keeps shard names unique across worker processes
+        self._next_shard = 0
+
+    def add(self, observation: np.ndarray, visit_counts: Sequence[float], side: int, turn: int = 0):
+        """Stages one decision; `visit_counts` has one entry per legal move."""
+        visits = np.asarray(visit_counts, dtype=np.float32)
+        if len(visits) > self.max_moves:
+            raise ValueError(f"{len(visits)} legal moves exceed the {self.max_moves} move slots of the replay schema")
+        self._game.append((observation, visits, side, turn))
+
+    def finish_game(self, winner: Optional[int]):
+        """Assigns the outcome to the staged decisions (winner None = draw) and queues them for writing."""
+        for observation, visits, side, turn in self._game:
+            record = self._records[self._size]
+            record["observation"] = observation
+            legal = np.zeros(self.max_moves, dtype=bool)
+            legal[:len(visits)] = True
+            record["legal"] = np.packbits(legal)
+            policy = np.zeros(self.max_moves, dtype=np.float32)
+            total = visits.sum()
+            policy[:len(visits)] = visits / total if total > 0 else 1.0 / max(len(visits), 1)
+            record["policy"] = policy
+            record["outcome"] = 0 if winner is None else (1 if winner == side else -1)
+            record["turn"] = turn
+            self._size += 1
+            if self._size == self.shard_size:
+                self.flush()
+        self._game = []
+
+    def flush(self) -> Optional[str]:
+        """Writes the finished records as a shard; returns its path (None if there was nothing to write)."""
+        if not self._size:
+            return None
+        path = os.path.join(self.directory, f"shard_{time.time_ns()}_{self._prefix}_{self._next_shard:06d}.npy")
+        with open(path + ".tmp", "wb") as f:
+            np.save(f, self._records[:self._size])
+        os.replace(path + ".tmp", path)
+        self._next_shard += 1
+        self._size = 0
+        return path
+
+class ReplayBuffer:
+    """Samples records uniformly from every shard in a directory, through memory maps."""
+    def __init__(self, directory: str = config.REPLAY_BUFFER_DIR, max_shards: Optional[int] = None,
+                 max_bytes: Optional[int] = None, max_age_seconds: Optional[float] = None):
+        self.directory = directory
+        self.max_shards = max_shards
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self._shards = {} # path -> memmapped records
+        self._paths: List[str] = []
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self.refresh()
+
+    def __len__(self) -> int:
+        return int(self._offsets[-1])
+
+    def refresh(self):
+        """Evicts old shards and maps any new ones. Shard names sort by creation time."""
+        paths = sorted(glob.glob(os.path.join(self.directory, "shard_*.npy")))
+        paths = self._evict(paths)
+        self._shards = {path: self._shards.get(path) if path in self._shards else np.load(path, mmap_mode="r") for path in paths}
+        self._paths = paths
+        self._offsets = np.concatenate([[0], np.cumsum([len(self._shards[path]) for path in paths])]).astype(np.int64)
+
+    def _evict(self, paths: List[str]) -> List[str]:
+        """Deletes the oldest shards that break the age, count or size limits; returns the kept paths."""
+        now = time.time()
+        sizes = [os.path.getsize(path) for path in paths]
+        keep_from = 0
+        if self.max_age_seconds is not None:
+            while keep_from < len(paths) and now - os.path.getmtime(paths[keep_from]) > self.max_age_seconds:
+                keep_from += 1
+        if self.max_shards is not None:
+            keep_from = max(keep_from, len(paths) - self.max_shards)
+        if self.max_bytes is not None:
+            kept_bytes = sum(sizes[keep_from:])
+            while keep_from < len(paths) and kept_bytes > self.max_bytes:
+                kept_bytes -= sizes[keep_from]
+                keep_from += 1
+        for path in paths[:keep_from]:
+            self._shards.pop(path, None)
+            os.remove(path)
+        if keep_from:
+            logger.info(f"Evicted {keep_from} replay shards from {self.directory}")
+        return paths[keep_from:]
+
+    def sample(self, batch_size: int, rng: Optional[np.random.Generator] = None) -> ReplayBatch:
+        """A uniformly random batch over all records. Rows are read shard by shard, in file order."""
+        if not len(self):
+            raise ValueError(f"No replay shards in {self.directory}")
+        rng = rng or np.random.default_rng()
+        indices = np.sort(rng.integers(len(self), size=batch_size))
+        shard_of = np.searchsorted(self._offsets, indices, side="right") - 1
+        records = np.empty(batch_size, dtype=self._shards[self._paths[0]].dtype)
+        bounds = np.searchsorted(shard_of, np.arange(len(self._paths) + 1))
+        for shard, (start, end) in enumerate(zip(bounds[:-1], bounds[1:])):
+            if start < end:
+                records[start:end] = self._shards[self._paths[shard]][indices[start:end] - self._offsets[shard]]
+        order = rng.permutation(batch_size)
+        records = records[order]
+        max_moves = records.dtype["policy"].shape[0]
+        return ReplayBatch(
+            observation=records["observation"].astype(np.float32),
+            legal=np.unpackbits(records["legal"], axis=1, count=max_moves).astype(bool),
+            policy=records["policy"].astype(np.float32),
+            outcome=records["outcome"].astype(np.float32),
+            turn=records["turn"].astype(np.int64),
+        )
+
+def benchmark(num_records: int = 200_000, batch_size: int = 256, num_batches: int = 400):
+    """Writes random shards to a temporary directory and prints write and sampling throughput."""
+    import tempfile
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as directory:
+        writer = ReplayWriter(directory)
+        observations = rng.integers(0, 20, size=(1000, OBSERVATION_SIZE)).astype(np.float32)
+        start = time.perf_counter()
+        for i in range(num_records):
+            writer.add(observations[i % 1000], rng.integers(0, 50, size=1 + i % 30), side=i % 2, turn=i % 40)
+            if i % 40 == 39:
+                writer.finish_game(winner=i % 3 - 1 if i % 3 < 2 else None)
+        writer.finish_game(winner=0)
+        writer.flush()
+        write_time = time.perf_counter() - start
+        buffer = ReplayBuffer(directory)
+        shard_bytes = sum(os.path.getsize(path) for path in buffer._paths)
+        start = time.perf_counter()
+        for _ in range(num_batches):
+            buffer.sample(batch_size, rng)
+        read_time = time.perf_counter() - start
+        print(f"{len(buffer)} records in {len(buffer._paths)} shards, {shard_bytes / len(buffer):.0f} bytes per record")
+        print(f"write: {num_records / write_time:,.0f} records/s, sample: {num_batches * batch_size / read_time:,.0f} records/s (batch {batch_size})")
+
+if __name__ == "__main__":
+    benchmark()
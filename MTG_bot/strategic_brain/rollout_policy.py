@@ -0,0 +1,352 @@
+"""
+Fast heuristic playouts for MCTS.
+
+Rollouts run on a RolloutState (flat NumPy columns, one row per card or token) with
+simplified rules instead of stepping the Engine: no priority passing, no mana
+colors, one combat per turn and spells resolve immediately. The policy plays a land,
+casts the most expensive affordable spells, attacks based on a race calculation and
+blocks with simple trades. With `epsilon` > 0 each decision is replaced by a uniformly
+random one with that probability; `epsilon=1` is the random baseline.
+"""
+
+import math
+import time
+from dataclasses import dataclass, fields
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..rule_engine.card_database import card_data_loader
+from .combat_solver import solve_combat
+from .compact_state import CompactState, ZONE_HAND, ZONE_BATTLEFIELD, ZONE_LIBRARY, ZONE_GRAVEYARD, keyword_flags, spell_damage
+from MTG_bot.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+DRAW = -1 # Winner of a game that hit the turn limit
+
+def _stat(value) -> int:
+    return value if isinstance(value, int) else 0
+
+@dataclass
+class RolloutState:
+    """Mutable game state for playouts. Libraries are row stacks whose last entry is the top card."""
+    type_id: np.ndarray
+    side: np.ndarray
+    zone: np.ndarray
+    power: np.ndarray
+    toughness: np.ndarray
+    damage: np.ndarray
+    cmc: np.ndarray
+    spell_damage: np.ndarray
+    is_land: np.ndarray
+    is_creature: np.ndarray
+    flying: np.ndarray
+    reach: np.ndarray
+    lifelink: np.ndarray
+    defender: np.ndarray
+    trample: np.ndarray
+    tapped: np.ndarray
+    sick: np.ndarray
+    libraries: List[List[int]]
+    life: np.ndarray
+    active_side: int = 0
+    turn: int = 1
+
+    def copy(self) -> "RolloutState":
+        values = {}
+        for f in fields(self):
+            value = getattr(self, f.name)
+            values[f.name] = value.copy() if isinstance(value, np.ndarray) else [list(stack) for stack in value] if f.name == "libraries" else value
+        return RolloutState(**values)
+
+    @classmethod
+    def from_compact(cls, state: CompactState, rng: Optional[np.random.Generator] = None) -> "RolloutState":
+        """
+        Expands a CompactState (built with `include_library=True`) into one row per card
+        or token. Library order is hidden information, so both libraries are shuffled.
+        """
+        rng = rng or np.random.default_rng()
+        rows = np.repeat(np.arange(len(state.type_id)), np.maximum(state.count, 1))
+        zone = state.zone[rows].astype(np.int8)
+        battlefield = zone == ZONE_BATTLEFIELD
+        tapped = battlefield & ~state.mana_source[rows] & (state.untapped[rows] == 0)
+        sick = battlefield & state.is_creature[rows] & (state.untapped[rows] > 0) & (state.ready[rows] == 0) & (state.attacking[rows] == 0)
+        side = state.side[rows]
+        libraries = [rng.permutation(np.flatnonzero((zone == ZONE_LIBRARY) & (side == s))).tolist() for s in (0, 1)]
+        return cls(
+            type_id=state.type_id[rows], side=side, zone=zone,
+            power=state.power[rows], toughness=state.toughness[rows], damage=np.zeros(len(rows), dtype=np.int64),
+            cmc=state.cmc[rows], spell_damage=state.spell_damage[rows],
+            is_land=state.is_land[rows], is_creature=state.is_creature[rows],
+            flying=state.flying[rows], reach=state.reach[rows], lifelink=state.lifelink[rows], defender=state.defender[rows], trample=state.trample[rows],
+            tapped=tapped, sick=sick, libraries=libraries, life=state.life.copy(),
+            active_side=state.active_side, turn=state.turn_number,
+        )
+
+    @classmethod
+    def from_decklists(cls, decklists: Sequence[Sequence[int]], rng: Optional[np.random.Generator] = None, start_life: int = 20, hand_size: int = 7) -> "RolloutState":
+        """A new game straight from two decklists of card ids (shuffled, opening hands drawn)."""
+        rng = rng or np.random.default_rng()
+        type_ids = np.concatenate([np.asarray(decklist, dtype=np.int64) for decklist in decklists])
+        side = np.repeat([0, 1], [len(decklist) for decklist in decklists])
+        data = [card_data_loader.get_card_data_by_id(int(type_id)) for type_id in type_ids]
+        flags = np.array([keyword_flags([], card.get('keyword_names') or ()) for card in data], dtype=bool).reshape(len(data), 5)
+        state = cls(
+            type_id=type_ids, side=side, zone=np.full(len(type_ids), ZONE_LIBRARY, dtype=np.int8),
+            power=np.array([_stat(card.get('power')) for card in data], dtype=np.int64),
+            toughness=np.array([_stat(card.get('toughness')) for card in data], dtype=np.int64),
+            damage=np.zeros(len(type_ids), dtype=np.int64),
+            cmc=np.array([float(card.get('cmc') or 0) for card in data]),
+            spell_damage=np.array([spell_damage(card.get('name')) for card in data], dtype=np.int64),
+            is_land=np.array([bool(card.get('is_land')) for card in data], dtype=bool),
+            is_creature=np.array([bool(card.get('is_creature')) for card in data], dtype=bool),
+            flying=flags[:, 0], reach=flags[:, 1], lifelink=flags[:, 2], defender=flags[:, 3], trample=flags[:, 4],
+            tapped=np.zeros(len(type_ids), dtype=bool), sick=np.zeros(len(type_ids), dtype=bool),
+            libraries=[rng.permutation(np.flatnonzero(side == s)).tolist() for s in (0, 1)],
+            life=np.array([start_life, start_life], dtype=np.int64),
+        )
+        for s in (0, 1):
+            for _ in range(hand_size):
+                state.draw(s)
+        return state
+
+    def draw(self, side: int) -> bool:
+        """Draws the top card; False if the library was empty (the player loses)."""
+        if not self.libraries[side]:
+            return False
+        self.zone[self.libraries[side].pop()] = ZONE_HAND
+        return True
+
+    def winner(self) -> Optional[int]:
+        """The winning side once a player is at 0 life, else None."""
+        if self.life[0] <= 0 or self.life[1] <= 0:
+            return DRAW if self.life[0] <= 0 and self.life[1] <= 0 else int(self.life[0] <= 0)
+        return None
+
+class HeuristicRolloutPolicy:
+    """Rule-based play for both players of a rollout, with epsilon-greedy noise."""
+    def __init__(self, epsilon: float = 0.0, rng: Optional[np.random.Generator] = None):
+        self.epsilon = epsilon
+        self.rng = rng or np.random.default_rng()
+
+    def _explore(self) -> bool:
+        return self.epsilon > 0 and self.rng.random() < self.epsilon
+
+    def main_phase(self, state: RolloutState, side: int):
+        """Plays a land, then casts the most expensive affordable spell until out of mana."""
+        mine = state.side == side
+        hand = np.flatnonzero(mine & (state.zone == ZONE_HAND))
+        lands_in_hand = hand[state.is_land[hand]]
+        if len(lands_in_hand) and not (self._explore() and self.rng.random() < 0.5):
+            state.zone[lands_in_hand[0]] = ZONE_BATTLEFIELD
+
+        untapped_lands = np.flatnonzero(mine & (state.zone == ZONE_BATTLEFIELD) & state.is_land & ~state.tapped)
+        mana = len(untapped_lands)
+        spells = hand[~state.is_land[hand]]
+        while len(spells):
+            affordable = spells[state.cmc[spells] <= mana]
+            if not len(affordable):
+                break
+            if self._explore():
+                choice = self.rng.integers(len(affordable) + 1)
+                if choice == len(affordable): # Random play may also stop casting
+                    break
+                card = affordable[choice]
+            else:
+                card = affordable[np.argmax(state.cmc[affordable])]
+            cost = int(math.ceil(state.cmc[card]))
+            state.tapped[untapped_lands[len(untapped_lands) - mana:len(untapped_lands) - mana + cost]] = True
+            mana -= cost
+            spells = spells[spells != card]
+            self._resolve(state, card, side)
+
+    @staticmethod
+    def _resolve(state: RolloutState, card: int, side: int):
+        if state.is_creature[card]:
+            state.zone[card] = ZONE_BATTLEFIELD
+            state.sick[card] = True
+        else:
+            state.zone[card] = ZONE_GRAVEYARD
+            state.life[1 - side] -= state.spell_damage[card]
+
+    @staticmethod
+    def _can_block(state: RolloutState, attackers: np.ndarray, blockers: np.ndarray) -> np.ndarray:
+        """[A, B] block legality (flying needs flying or reach)."""
+        return ~state.flying[attackers][:, None] | state.flying[blockers][None, :] | state.reach[blockers][None, :]
+
+    def choose_attackers(self, state: RolloutState, side: int) -> np.ndarray:
+        """
+        Attacks with everything when no blocks can stop lethal, races when our clock is
+        at least as fast as theirs (we strike first), otherwise attacks only with
+        creatures no untapped blocker can kill and survive.
+        """
+        battlefield = (state.zone == ZONE_BATTLEFIELD) & state.is_creature
+        ready = np.flatnonzero(battlefield & (state.side == side) & ~state.tapped & ~state.sick & ~state.defender)
+        if not len(ready):
+            return ready
+        if self.epsilon >= 1.0 or self._explore():
+            return ready[self.rng.random(len(ready)) < 0.5]
+
+        blockers = np.flatnonzero(battlefield & (state.side != side) & ~state.tapped)
+        if has_lethal(state, ready, blockers):
+            return ready[state.power[ready] > 0]
+        their_attackers = np.flatnonzero(battlefield & (state.side != side) & ~state.defender)
+        our_power = int(state.power[ready].sum())
+        their_power = int(state.power[their_attackers].sum())
+        our_clock = math.ceil(state.life[1 - side] / our_power) if our_power > 0 else math.inf
+        their_clock = math.ceil(state.life[side] / their_power) if their_power > 0 else math.inf
+        if our_clock <= their_clock or not len(blockers):
+            return ready[state.power[ready] > 0]
+
+        remaining = state.toughness - state.damage
+        can_block = self._can_block(state, ready, blockers)
+        eats_attacker = (state.power[blockers][None, :] >= remaining[ready][:, None]) & (remaining[blockers][None, :] > state.power[ready][:, None])
+        safe = ~(can_block & eats_attacker).any(axis=1) & (state.power[ready] > 0)
+        return ready[safe]
+
+    def choose_blockers(self, state: RolloutState, side: int, attackers: np.ndarray) -> np.ndarray:
+        """
+        Assigns at most one blocker per attacker, biggest attacker first: a blocker that
+        kills it and survives, else an even-or-better trade, else a chump block when the
+        unblocked damage would be lethal. Returns the blocker row per attacker (-1 = none).
+        """
+        blocks = np.full(len(attackers), -1, dtype=np.int64)
+        blockers = np.flatnonzero((state.zone == ZONE_BATTLEFIELD) & state.is_creature & (state.side == side) & ~state.tapped)
+        if not len(attackers) or not len(blockers):
+            return blocks
+        remaining = state.toughness - state.damage
+        can_block = self._can_block(state, attackers, blockers)
+        kills = state.power[blockers][None, :] >= remaining[attackers][:, None]
+        survives = remaining[blockers][None, :] > state.power[attackers][:, None]
+        value = state.power + state.toughness
+        free = np.ones(len(blockers), dtype=bool)
+        incoming = int(state.power[attackers].sum())
+
+        for i in np.argsort(-state.power[attackers], kind='stable'):
+            candidates = can_block[i] & free
+            if not candidates.any():
+                continue
+            if self.epsilon >= 1.0 or self._explore():
+                options = np.flatnonzero(candidates)
+                choice = self.rng.integers(len(options) + 1)
+                pick = options[choice] if choice < len(options) else -1
+            else:
+                cheapest = np.argsort(value[blockers], kind='stable')
+                good = cheapest[(candidates & kills[i] & survives[i])[cheapest]]
+                trade = cheapest[(candidates & kills[i] & (value[blockers] <= value[attackers[i]]))[cheapest]]
+                chump = cheapest[candidates[cheapest]]
+                if len(good):
+                    pick = good[0]
+                elif len(trade):
+                    pick = trade[0]
+                elif incoming >= state.life[side] and len(chump):
+                    pick = chump[0]
+                else:
+                    pick = -1
+            if pick >= 0:
+                blocks[i] = blockers[pick]
+                free[pick] = False
+                incoming -= state.power[attackers[i]]
+        return blocks
+
+def has_lethal(state: RolloutState, attackers: np.ndarray, blockers: np.ndarray) -> bool:
+    """Whether attacking with all of `attackers` kills the defender whatever `blockers` do."""
+    defender = 1 - int(state.side[attackers[0]]) if len(attackers) else 0
+    return solve_combat(
+        state.power[attackers].tolist(), state.flying[attackers].tolist(), state.trample[attackers].tolist(), state.lifelink[attackers].tolist(),
+        (state.toughness - state.damage)[blockers].tolist(), (state.flying[blockers] | state.reach[blockers]).tolist(),
+        int(state.life[defender]),
+    ).lethal
+
+def resolve_combat(state: RolloutState, attackers: np.ndarray, blocks: np.ndarray):
+    """Taps attackers, deals combat damage (with lifelink and trample) and moves dead creatures to the graveyard."""
+    side = state.active_side
+    state.tapped[attackers] = True
+    unblocked = attackers[blocks < 0]
+    state.life[1 - side] -= int(state.power[unblocked].sum())
+    state.life[side] += int(state.power[attackers[state.lifelink[attackers]]].sum())
+    blocked = blocks >= 0
+    trampling = blocked & state.trample[attackers]
+    excess = state.power[attackers[trampling]] - (state.toughness - state.damage)[blocks[trampling]]
+    state.life[1 - side] -= int(np.maximum(excess, 0).sum())
+    np.add.at(state.damage, blocks[blocked], state.power[attackers[blocked]])
+    np.add.at(state.damage, attackers[blocked], state.power[blocks[blocked]])
+    state.life[1 - side] += int(state.power[blocks[blocked][state.lifelink[blocks[blocked]]]].sum())
+    dead = (state.zone == ZONE_BATTLEFIELD) & state.is_creature & (state.damage >= state.toughness)
+    state.zone[dead] = ZONE_GRAVEYARD
+
+def play_turn(state: RolloutState, policies: Sequence[HeuristicRolloutPolicy]) -> Optional[int]:
+    """Plays one full turn of the active side; returns the winner if the game ended."""
+    side = state.active_side
+    mine = state.side == side
+    state.tapped[mine] = False
+    state.sick[mine] = False
+    if not state.draw(side):
+        return 1 - side
+    policies[side].main_phase(state, side)
+    winner = state.winner()
+    if winner is not None:
+        return winner
+
+    attackers = policies[side].choose_attackers(state, side)
+    if len(attackers):
+        resolve_combat(state, attackers, policies[1 - side].choose_blockers(state, 1 - side, attackers))
+        winner = state.winner()
+        if winner is not None:
+            return winner
+    state.damage[:] = 0
+    state.active_side = 1 - side
+    state.turn += 1
+    return None
+
+def simulate(state: RolloutState, policies: Sequence[HeuristicRolloutPolicy], max_turns: int = 60) -> int:
+    """Plays `state` (in place) to the end; returns the winning side or DRAW."""
+    for _ in range(max_turns):
+        winner = play_turn(state, policies)
+        if winner is not None:
+            return winner
+    return DRAW
+
+def rollout(state: RolloutState, perspective_side: int, policy: Optional[HeuristicRolloutPolicy] = None, max_turns: int = 60) -> float:
+    """Plays a copy of `state` with one policy for both sides: +1 win, -1 loss, 0 draw."""
+    policy = policy or HeuristicRolloutPolicy(epsilon=0.1)
+    winner = simulate(state.copy(), (policy, policy), max_turns)
+    return 0.0 if winner == DRAW else (1.0 if winner == perspective_side else -1.0)
+
+def standard_decklists() -> Tuple[List[str], List[List[int]]]:
+    """The Standard sample decks of the database as loader card ids."""
+    from .archetype_classifier import DeckSignatures
+    signatures = DeckSignatures.from_database(game_mode="Standard")
+    decklists = []
+    for counts in signatures.counts:
+        decklists.append([card_data_loader.get_card_id_by_name(name) for name, count in zip(signatures.card_names, counts.tolist()) for _ in range(count)])
+    return signatures.deck_names, decklists
+
+def benchmark(num_games: int = 400, seed: int = 0):
+    """Prints rollouts/sec and the win rate of the heuristic policy against the random baseline."""
+    rng = np.random.default_rng(seed)
+    names, decklists = standard_decklists()
+    heuristic = HeuristicRolloutPolicy(epsilon=0.0, rng=rng)
+    noisy = HeuristicRolloutPolicy(epsilon=0.1, rng=rng)
+    random_policy = HeuristicRolloutPolicy(epsilon=1.0, rng=rng)
+
+    states = [RolloutState.from_decklists(decklists, rng) for _ in range(num_games)]
+    start = time.perf_counter()
+    for state in states:
+        simulate(state, (noisy, noisy))
+    print(f"heuristic rollouts (epsilon=0.1): {num_games / (time.perf_counter() - start):.0f}/s")
+
+    wins = draws = 0
+    for game in range(num_games):
+        heuristic_side = game % 2
+        # Alternate decks and seats so neither the deck nor going first favours one policy.
+        pairing = decklists if game % 4 < 2 else decklists[::-1]
+        policies = (heuristic, random_policy) if heuristic_side == 0 else (random_policy, heuristic)
+        winner = simulate(RolloutState.from_decklists(pairing, rng), policies)
+        wins += winner == heuristic_side
+        draws += winner == DRAW
+    print(f"heuristic vs random over {num_games} games ({' / '.join(names)}): win rate {wins / num_games:.1%}, draws {draws / num_games:.1%}")
+
+if __name__ == "__main__":
+    benchmark()
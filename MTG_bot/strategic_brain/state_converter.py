@@ -1,86 +1,230 @@
-from typing import List, Dict
+import weakref
+from typing import List, Dict, Optional, Sequence, Tuple
 import numpy as np
 
-from ..rule_engine.game_graph import GameGraph, Entity
+from ..rule_engine.game_graph import GameGraph, Entity, CompositeTokenEntity, TOKEN_TAPPED
 from ..rule_engine import vocabulary as vocab
 
+# --- Observation layout ---
+# Each player gets one block (active player first, non-active player second),
+# followed by a small block of global game information.
+ZONE_ORDER = (vocab.ID_ZONE_LIBRARY, vocab.ID_ZONE_HAND, vocab.ID_ZONE_BATTLEFIELD, vocab.ID_ZONE_GRAVEYARD)
+CARD_TYPES = ("Land", "Creature", "Artifact", "Enchantment", "Instant", "Sorcery", "Planeswalker")
+MANA_ORDER = (vocab.ID_MANA_GREEN, vocab.ID_MANA_BLUE, vocab.ID_MANA_BLACK, vocab.ID_MANA_RED, vocab.ID_MANA_WHITE, vocab.ID_MANA_COLORLESS)
+PHASE_ORDER = (vocab.ID_PHASE_MULLIGAN, vocab.ID_PHASE_BEGINNING, vocab.ID_PHASE_MAIN1, vocab.ID_PHASE_COMBAT, vocab.ID_PHASE_MAIN2, vocab.ID_PHASE_ENDING)
+# Hidden zones of the non-active player only expose their total card count.
+HIDDEN_ZONES = (vocab.ID_ZONE_LIBRARY, vocab.ID_ZONE_HAND)
+
+ZONE_BLOCK_SIZE = len(CARD_TYPES) + 1 # One column per card type plus the zone total
+ZONE_TOTAL_COL = len(CARD_TYPES)
+BATTLEFIELD_SLOT = ZONE_ORDER.index(vocab.ID_ZONE_BATTLEFIELD)
+
+# Offsets inside a player block
+LIFE_OFFSET = 0
+ZONE_COUNTS_OFFSET = 1
+MANA_POOL_OFFSET = ZONE_COUNTS_OFFSET + len(ZONE_ORDER) * ZONE_BLOCK_SIZE
+UNTAPPED_SOURCES_OFFSET = MANA_POOL_OFFSET + len(MANA_ORDER) # Total, then one column per color
+BOARD_STATS_OFFSET = UNTAPPED_SOURCES_OFFSET + 1 + len(MANA_ORDER) # Power, toughness, untapped power
+LANDS_PLAYED_OFFSET = BOARD_STATS_OFFSET + 3
+PLAYER_BLOCK_SIZE = LANDS_PLAYED_OFFSET + 1
+
+# Offsets of the global block
+GLOBAL_OFFSET = 2 * PLAYER_BLOCK_SIZE
+TURN_OFFSET = GLOBAL_OFFSET
+PHASE_OFFSET = TURN_OFFSET + 1
+OBSERVATION_SIZE = PHASE_OFFSET + len(PHASE_ORDER)
+
+# Colors a land can tap for when it carries no parsed mana ability.
+_COLOR_IDENTITY_TO_MANA = {
+    'G': vocab.ID_MANA_GREEN, 'U': vocab.ID_MANA_BLUE, 'B': vocab.ID_MANA_BLACK,
+    'R': vocab.ID_MANA_RED, 'W': vocab.ID_MANA_WHITE, 'C': vocab.ID_MANA_COLORLESS,
+}
+
+def _as_number(value) -> float:
+    """Power/toughness can be '*' or None for some cards; treat those as 0."""
+    return value if isinstance(value, (int, float)) else 0
+
 class StateConverter:
     """
     Converts the GameGraph into a numerical observation vector for an RL agent.
+
+    Per player the observation holds the life total, card-type counts for every zone,
+    the mana pool, untapped mana sources, total power/toughness on the battlefield and
+    lands played this turn. The global block holds the turn number and the current phase.
     """
     def __init__(self):
-        # Define the fixed size of the observation vector
-        # 2 (player life) + 2 (cards in hand) + 2 (creatures on battlefield) + 2*6 (mana pools) + 5 (phase one-hot)
-        self.observation_size = 2 + 2 + 2 + 12 + 5 # Example size, will adjust as we add features
+        self.observation_size = OBSERVATION_SIZE
+        # Zone and card entities keep their identity for a whole game, so the zone
+        # owner/slot and each card's static features are cached per graph.
+        self._zone_cache: "weakref.WeakKeyDictionary[GameGraph, Dict]" = weakref.WeakKeyDictionary()
+        # Static per-card features keyed by card type_id.
+        self._card_cache: Dict[int, Tuple] = {}
+        self._phase_index = {phase_id: i for i, phase_id in enumerate(PHASE_ORDER) if phase_id is not None}
+
+    def clear_cache(self):
+        """Drops cached zone layouts and card features (e.g. after the card pool changed)."""
+        self._zone_cache = weakref.WeakKeyDictionary()
+        self._card_cache.clear()
 
     def convert_graph_to_observation(self, graph: GameGraph) -> np.ndarray:
         """
         Converts the GameGraph into a fixed-size numerical observation vector.
         """
-        observation = np.zeros(self.observation_size, dtype=np.float32)
-        
-        # --- Player Information ---
-        player1 = None
-        player2 = None
-        for entity in graph.entities.values():
-            if entity.type_id == vocab.ID_PLAYER:
-                if entity.instance_id == graph.active_player_id:
-                    player1 = entity # Active player
-                else:
-                    player2 = entity # Non-active player
-        
-        if player1 and player2:
-            # Helper to get cards in a zone for a player
-            def get_cards_in_zone(player_entity, zone_type_id, card_type_filter=None):
-                control_rels = graph.get_relationships(source=player_entity, rel_type=vocab.ID_REL_CONTROLS)
-                zone_entity = next((graph.entities[r.target] for r in control_rels if graph.entities[r.target].type_id == zone_type_id), None)
-                if zone_entity:
-                    cards_in_zone_rels = graph.get_relationships(target=zone_entity, rel_type=vocab.ID_REL_IS_IN_ZONE)
-                    cards = [graph.entities[r.source] for r in cards_in_zone_rels]
-                    if card_type_filter:
-                        return [card for card in cards if card.type_id == card_type_filter]
-                    return cards
-                return []
-
-            # Player 1 (Active Player)
-            observation[0] = player1.properties.get('life_total', 0)
-            observation[1] = len(get_cards_in_zone(player1, vocab.ID_ZONE_HAND)) # Cards in hand
-            observation[2] = len(get_cards_in_zone(player1, vocab.ID_ZONE_BATTLEFIELD, vocab.ID_CREATURE)) # Creatures on battlefield
-            # Add mana pool for player 1
-            mana_pool_p1 = player1.properties.get('mana_pool', {})
-            observation[3] = mana_pool_p1.get(vocab.ID_MANA_GREEN, 0)
-            observation[4] = mana_pool_p1.get(vocab.ID_MANA_BLUE, 0)
-            observation[5] = mana_pool_p1.get(vocab.ID_MANA_BLACK, 0)
-            observation[6] = mana_pool_p1.get(vocab.ID_MANA_RED, 0)
-            observation[7] = mana_pool_p1.get(vocab.ID_MANA_WHITE, 0)
-            observation[8] = mana_pool_p1.get(vocab.ID_MANA_COLORLESS, 0)
-
-            # Player 2 (Non-Active Player)
-            observation[9] = player2.properties.get('life_total', 0)
-            observation[10] = len(get_cards_in_zone(player2, vocab.ID_ZONE_HAND)) # Cards in hand
-            observation[11] = len(get_cards_in_zone(player2, vocab.ID_ZONE_BATTLEFIELD, vocab.ID_CREATURE)) # Creatures on battlefield
-            # Add mana pool for player 2
-            mana_pool_p2 = player2.properties.get('mana_pool', {})
-            observation[12] = mana_pool_p2.get(vocab.ID_MANA_GREEN, 0)
-            observation[13] = mana_pool_p2.get(vocab.ID_MANA_BLUE, 0)
-            observation[14] = mana_pool_p2.get(vocab.ID_MANA_BLACK, 0)
-            observation[15] = mana_pool_p2.get(vocab.ID_MANA_RED, 0)
-            observation[16] = mana_pool_p2.get(vocab.ID_MANA_WHITE, 0)
-            observation[17] = mana_pool_p2.get(vocab.ID_MANA_COLORLESS, 0)
-
-        # --- Game State Information ---
-        # Current Phase (one-hot encoding for simplicity, assuming 5 phases)
-        phase_one_hot = np.zeros(5)
-        if graph.phase == vocab.ID_PHASE_BEGINNING: phase_one_hot[0] = 1
-        elif graph.phase == vocab.ID_PHASE_MAIN1: phase_one_hot[1] = 1
-        elif graph.phase == vocab.ID_PHASE_COMBAT: phase_one_hot[2] = 1
-        elif graph.phase == vocab.ID_PHASE_MAIN2: phase_one_hot[3] = 1
-        elif graph.phase == vocab.ID_PHASE_ENDING: phase_one_hot[4] = 1
-        
-        # Concatenate phase one-hot encoding to the observation vector
-        observation[18:23] = phase_one_hot
-        
-        return observation
+        return np.asarray(self._encode(graph), dtype=np.float32)
+
+    def convert_batch(self, graphs: Sequence[GameGraph], out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Encodes many graphs into a [B, observation_size] float32 array.
+
+        If `out` is given it must have shape (len(graphs), observation_size) and is filled
+        in place, so training loops can reuse one buffer across batches.
+        """
+        if out is None:
+            out = np.empty((len(graphs), self.observation_size), dtype=np.float32)
+        elif out.shape != (len(graphs), self.observation_size):
+            raise ValueError(f"Output buffer has shape {out.shape}, expected {(len(graphs), self.observation_size)}.")
+        for row, graph in enumerate(graphs):
+            out[row] = self._encode(graph)
+        return out
+
+    def _get_zone_layout(self, graph: GameGraph) -> Dict:
+        """Returns (and caches) the players of a graph and the owner/slot of every zone."""
+        layout = self._zone_cache.get(graph)
+        if layout is not None:
+            return layout
+
+        players = list(graph.players) or [e.instance_id for e in graph.entities.values() if e.type_id == vocab.ID_PLAYER]
+        zone_slots = {zone_id: slot for slot, zone_id in enumerate(ZONE_ORDER)}
+        zones = {}
+        player_set = set(players)
+        for rel in graph.relationships:
+            if rel.type_id != vocab.ID_REL_CONTROLS or rel.source not in player_set:
+                continue
+            target = graph.entities.get(rel.target)
+            if target is not None and target.type_id in zone_slots:
+                # UUID hashing runs in Python, so the hot loop keys everything by the UUID's int.
+                zones[rel.target.int] = (rel.source, zone_slots[target.type_id], target.type_id in HIDDEN_ZONES)
+
+        layout = {"players": players, "zones": zones, "cards": {}}
+        self._zone_cache[graph] = layout
+        return layout
+
+    def _cache_card(self, layout: Dict, graph: GameGraph, instance_id) -> Tuple[Entity, Tuple]:
+        """Caches a card entity of a graph together with its static features."""
+        card = graph.entities[instance_id]
+        entry = (card, self._get_card_features(card))
+        layout["cards"][instance_id.int] = entry
+        return entry
+
+    def _get_card_features(self, card: Entity) -> Tuple[Tuple[int, ...], bool, Optional[Tuple[int, ...]]]:
+        """
+        Returns (type columns within a zone block, is_creature, mana columns) for a card.
+        The mana columns are None if the card is not a mana source.
+        """
+        features = self._card_cache.get(card.type_id)
+        if features is not None:
+            return features
+
+        props = card.properties
+        type_line = props.get('type_line') or ""
+        type_cols = [i for i, card_type in enumerate(CARD_TYPES) if card_type in type_line]
+        type_cols.append(ZONE_TOTAL_COL)
+        is_creature = bool(props.get('is_creature')) or "Creature" in type_line
+
+        mana_ids = set()
+        for ability in props.get('abilities', {}).get('mana_abilities', []):
+            mana_ids.update(ability.get('produces', {}).keys())
+        if not mana_ids and (props.get('is_land') or "Land" in type_line):
+            mana_ids.update(_COLOR_IDENTITY_TO_MANA[c] for c in props.get('color_identity', []) if c in _COLOR_IDENTITY_TO_MANA)
+        mana_cols = tuple(i for i, mana_id in enumerate(MANA_ORDER) if mana_id in mana_ids)
+        # Lands are mana sources even if their color could not be determined.
+        is_mana_source = bool(mana_cols) or bool(props.get('is_land'))
+
+        features = (tuple(type_cols), is_creature, mana_cols if is_mana_source else None)
+        self._card_cache[card.type_id] = features
+        return features
+
+    def _encode(self, graph: GameGraph) -> List[float]:
+        """Encodes one graph into a Python list that is copied into the output row in one go."""
+        values = [0.0] * self.observation_size
+        layout = self._get_zone_layout(graph)
+        active_id = graph.active_player_id
+        players = layout["players"]
+
+        player_base = {}
+        for player_id in players:
+            player_base[player_id] = 0 if player_id == active_id else PLAYER_BLOCK_SIZE
+
+        # Column offset of each zone block for the current active player.
+        zone_base = {}
+        for zone_id, (owner_id, slot, hidden) in layout["zones"].items():
+            base = player_base[owner_id]
+            zone_base[zone_id] = (
+                base + ZONE_COUNTS_OFFSET + slot * ZONE_BLOCK_SIZE,
+                hidden and owner_id != active_id,
+                base if slot == BATTLEFIELD_SLOT else None,
+            )
+
+        cards = layout["cards"]
+        is_in_zone = vocab.ID_REL_IS_IN_ZONE
+        for rel in graph.relationships:
+            if rel.type_id != is_in_zone:
+                continue
+            zone = zone_base.get(rel.target.int)
+            if zone is None:
+                continue
+            base, hidden, battlefield_base = zone
+            if hidden:
+                values[base + ZONE_TOTAL_COL] += 1
+                continue
+            card, features = cards.get(rel.source.int) or self._cache_card(layout, graph, rel.source)
+            if isinstance(card, CompositeTokenEntity):
+                self._encode_tokens(values, card, base, battlefield_base)
+                continue
+            for col in features[0]:
+                values[base + col] += 1
+            if battlefield_base is None:
+                continue
+
+            props = card.properties
+            untapped = not props.get('tapped', False)
+            if features[1]:
+                power = _as_number(props.get('effective_power', props.get('power')))
+                values[battlefield_base + BOARD_STATS_OFFSET] += power
+                values[battlefield_base + BOARD_STATS_OFFSET + 1] += _as_number(props.get('effective_toughness', props.get('toughness')))
+                if untapped:
+                    values[battlefield_base + BOARD_STATS_OFFSET + 2] += power
+            if untapped and features[2] is not None:
+                values[battlefield_base + UNTAPPED_SOURCES_OFFSET] += 1
+                for col in features[2]:
+                    values[battlefield_base + UNTAPPED_SOURCES_OFFSET + 1 + col] += 1
+
+        for player_id, base in player_base.items():
+            props = graph.entities[player_id].properties
+            values[base + LIFE_OFFSET] = props.get('life_total', 0)
+            mana_pool = props.get('mana_pool', {})
+            for i, mana_id in enumerate(MANA_ORDER):
+                values[base + MANA_POOL_OFFSET + i] = mana_pool.get(mana_id, 0)
+            values[base + LANDS_PLAYED_OFFSET] = props.get('lands_played_this_turn', 0)
+
+        values[TURN_OFFSET] = graph.turn_number
+        phase_index = self._phase_index.get(graph.phase)
+        if phase_index is not None:
+            values[PHASE_OFFSET + phase_index] = 1.0
+        return values
+
+    @staticmethod
+    def _encode_tokens(values: List[float], composite: CompositeTokenEntity, base: int, battlefield_base: Optional[int]):
+        """Adds a composite token entity as `count` creatures."""
+        values[base + CARD_TYPES.index("Creature")] += composite.count
+        values[base + ZONE_TOTAL_COL] += composite.count
+        if battlefield_base is None:
+            return
+        power = composite.token_power()
+        untapped = composite.tokens[:, TOKEN_TAPPED] == 0
+        values[battlefield_base + BOARD_STATS_OFFSET] += float(power.sum())
+        values[battlefield_base + BOARD_STATS_OFFSET + 1] += float(composite.token_toughness().sum())
+        values[battlefield_base + BOARD_STATS_OFFSET + 2] += float(power[untapped].sum())
 
 def game_state_encoder(game_state):
     # The game-state encoder must produce a fixed-size vector.
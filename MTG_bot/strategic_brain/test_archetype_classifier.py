@@ -0,0 +1,64 @@
+import unittest
+
+import numpy as np
+
+from MTG_bot.rule_engine import game_initializer
+from MTG_bot.rule_engine.actions import ActivateManaAbilityAction, PlayLandAction
+from MTG_bot.rule_engine.card_database import card_data_loader
+from MTG_bot.strategic_brain.archetype_classifier import ArchetypeClassifier, DeckSignatures
+from MTG_bot.strategic_brain.opponent_model import OpponentModel
+
+class TestArchetypeClassifier(unittest.TestCase):
+
+    def setUp(self):
+        self.classifier = ArchetypeClassifier.from_database(game_mode="Standard")
+
+    def test_signatures_from_database(self):
+        """Every Standard deck gets a 60-card signature."""
+        signatures = self.classifier.signatures
+        self.assertEqual(set(signatures.deck_names), {"Green Stompy", "Blue-Red Spells"})
+        np.testing.assert_array_equal(signatures.counts.sum(axis=1), [60, 60])
+
+    def test_revealed_cards_rank_archetypes(self):
+        """Revealed cards move the posterior towards the deck that plays them."""
+        self.assertAlmostEqual(self.classifier.posterior()[0], 0.5)
+        model = OpponentModel(archetype_classifier=self.classifier)
+        model.observe_revealed_card(card_data_loader.get_card_id_by_name("Forest"))
+        self.assertEqual(model.detected_archetype, "Green Stompy")
+
+        for name in ("Opt", "Opt", "Cancel"):
+            self.classifier.observe_name(name)
+        ranking = self.classifier.ranked()
+        self.assertEqual(ranking[0][0], "Blue-Red Spells")
+        self.assertAlmostEqual(sum(p for _, p in ranking), 1.0)
+        self.assertGreater(self.classifier.card_prior()[card_data_loader.get_card_id_by_name("Opt")], 0.0)
+
+        self.classifier.reset()
+        self.assertEqual(self.classifier.num_observed, 0)
+
+    def test_only_new_cards_update_posterior(self):
+        """Playing a land counts it once; tapping it for mana later does not count it again."""
+        forest = card_data_loader.get_card_id_by_name("Forest")
+        graph = game_initializer.initialize_game_state([forest] * 60, [forest] * 60, shuffle=False)
+        player = graph.players[1]
+        card_id = next(uid for uid, entity in graph.entities.items() if entity.type_id == forest)
+        model = OpponentModel(archetype_classifier=self.classifier)
+
+        model.update(PlayLandAction(player, card_id), graph)
+        self.assertEqual(self.classifier.num_observed, 1)
+        posterior = self.classifier.posterior().copy()
+        for _ in range(2):
+            model.update(ActivateManaAbilityAction(player, card_id, 0), graph)
+        self.assertEqual(self.classifier.num_observed, 1)
+        np.testing.assert_allclose(self.classifier.posterior(), posterior)
+
+    def test_unknown_cards_do_not_rule_out_decks(self):
+        """A card outside every decklist leaves the ranking unchanged."""
+        signatures = DeckSignatures(np.arange(2), ["A", "B"], ["x", "y"], np.array([[4, 0], [0, 4]], dtype=np.int32))
+        classifier = ArchetypeClassifier(signatures)
+        classifier.observe_name("not in any deck")
+        np.testing.assert_allclose(classifier.posterior(), [0.5, 0.5])
+
+
+if __name__ == '__main__':
+    unittest.main()
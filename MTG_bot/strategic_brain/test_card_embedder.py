@@ -0,0 +1,66 @@
+import json
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from MTG_bot.rule_engine.card_database import card_data_loader
+from MTG_bot.strategic_brain import card_embedder
+from MTG_bot.strategic_brain.card_embedder import CardEmbeddingStore
+
+class TestCardEmbedder(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.card_ids, cls.embeddings, cls.feature_names = card_embedder.create_card_embeddings()
+
+    def test_structured_features(self):
+        """Keywords from MTGJSON/effects_json and card types end up in the embedding."""
+        self.assertEqual(self.embeddings.shape, (len(card_data_loader.card_id_to_data), len(self.feature_names)))
+        row = list(self.card_ids).index(card_data_loader.get_card_id_by_name("Alpine Watchdog"))
+        features = dict(zip(self.feature_names, self.embeddings[row]))
+        self.assertEqual(features["type:Creature"], 1.0)
+        self.assertEqual(features["keyword:vigilance"], 1.0)
+        self.assertEqual(features["keyword:flying"], 0.0)
+
+    def test_text_features(self):
+        """An optional text encoder is appended as L2-normalized columns."""
+        _, embeddings, names = card_embedder.create_card_embeddings(text_encoder=lambda texts: np.ones((len(texts), 4)))
+        self.assertEqual(embeddings.shape[1], len(self.feature_names) + 4)
+        np.testing.assert_allclose(embeddings[:, -4:], 0.5)
+
+    def test_memmap_store(self):
+        """The saved store is memory-mapped and indexed by card_id."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "embeddings")
+            card_embedder.save_embedding_store(path, self.card_ids, self.embeddings, self.feature_names)
+            store = CardEmbeddingStore(path)
+            self.assertIsInstance(store.matrix, np.memmap)
+            self.assertEqual(store.dim, len(self.feature_names))
+            np.testing.assert_array_equal(store[int(self.card_ids[5])], self.embeddings[5])
+            np.testing.assert_array_equal(store.gather(self.card_ids[:3]), self.embeddings[:3])
+            with self.assertRaises(IndexError):
+                store.gather([store.first_card_id - 1])
+            with self.assertRaises(IndexError):
+                store[store.first_card_id + len(store.matrix)]
+            del store
+
+    def test_stale_store_is_rejected(self):
+        """A store whose card ids now name other cards fails to load."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "embeddings")
+            card_embedder.save_embedding_store(path, self.card_ids, self.embeddings, self.feature_names)
+            with open(path + ".json", encoding="utf-8") as f:
+                metadata = json.load(f)
+            # Simulate a renumbered cards table: two cards swap ids.
+            metadata["card_names"][:2] = metadata["card_names"][1::-1]
+            metadata["checksum"] = card_embedder.card_ids_checksum(metadata["card_ids"], metadata["card_names"])
+            with open(path + ".json", "w", encoding="utf-8") as f:
+                json.dump(metadata, f)
+            with self.assertRaisesRegex(ValueError, "stale"):
+                CardEmbeddingStore(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from MTG_bot.rule_engine.card_database import card_data_loader
+from MTG_bot.strategic_brain.card_index import CardIndex, legal_card_ids
+
+class TestCardIndex(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        centers = rng.normal(size=(20, 16))
+        self.vectors = centers[rng.integers(20, size=2000)] + 0.3 * rng.normal(size=(2000, 16))
+        self.ids = np.arange(1000, 3000)
+        self.queries = self.vectors[rng.integers(2000, size=50)] + 0.1 * rng.normal(size=(50, 16))
+        self.index = CardIndex.build(self.ids, self.vectors, num_lists=20)
+
+    def test_search_matches_exact_search(self):
+        """Probing every list is exact; probing a few lists keeps a high recall."""
+        exact_ids, exact_scores = self.index.exact_search(self.queries, k=5)
+        all_ids, all_scores = self.index.search(self.queries, k=5, nprobe=20)
+        np.testing.assert_array_equal(all_ids, exact_ids)
+        np.testing.assert_allclose(all_scores, exact_scores, rtol=1e-5)
+
+        ids, _ = self.index.search(self.queries, k=5, nprobe=4)
+        recall = np.mean([len(np.intersect1d(a, b)) / 5 for a, b in zip(ids, exact_ids)])
+        self.assertGreater(recall, 0.9)
+
+        single_ids, _ = self.index.search(self.queries[0], k=5, nprobe=20)
+        np.testing.assert_array_equal(single_ids[0], exact_ids[0])
+
+    def test_allowed_ids_filter_results(self):
+        """Only allowed cards are returned; missing slots are padded with -1."""
+        allowed = self.ids[::3]
+        ids, _ = self.index.search(self.queries, k=5, nprobe=20, allowed_ids=allowed)
+        self.assertTrue(np.isin(ids, allowed).all())
+
+        ids, scores = self.index.search(self.queries, k=5, allowed_ids=[1000, 1001])
+        self.assertTrue(np.isin(ids[:, :2], [1000, 1001]).all())
+        self.assertTrue((ids[:, 2:] == -1).all())
+        self.assertTrue(np.isneginf(scores[:, 2:]).all())
+
+    def test_more_lists_than_vectors(self):
+        """Asking for more lists than there are vectors clamps the list count."""
+        index = CardIndex.build(self.ids[:5], self.vectors[:5], num_lists=20)
+        self.assertEqual(len(index.centroids), 5)
+        ids, _ = index.search(self.vectors[:1], k=1, nprobe=5)
+        self.assertEqual(int(ids[0, 0]), int(self.ids[0]))
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "card_index")
+            self.index.save(path)
+            loaded = CardIndex.load(path)
+        np.testing.assert_array_equal(loaded.search(self.queries, k=5)[0], self.index.search(self.queries, k=5)[0])
+
+    def test_legal_card_ids(self):
+        forest = card_data_loader.get_card_id_by_name("Forest")
+        self.assertIn(forest, legal_card_ids("Standard"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import unittest
+
+import numpy as np
+
+from MTG_bot.rule_engine import game_initializer
+from MTG_bot.rule_engine.card_database import card_data_loader
+from MTG_bot.strategic_brain.combat_solver import _brute_force_damage, lethal_from_compact, solve_combat
+from MTG_bot.strategic_brain.compact_state import CompactState
+from MTG_bot.strategic_brain.evaluation import MultiHeadedEvaluator
+
+class TestCombatSolver(unittest.TestCase):
+
+    def _solve(self, attackers, blockers, life, exact=True):
+        """attackers: (power, flying, trample, lifelink); blockers: (toughness, flying or reach)."""
+        power, flying, trample, lifelink = zip(*attackers) if attackers else ((),) * 4
+        toughness, flyers = zip(*blockers) if blockers else ((), ())
+        return solve_combat(power, flying, trample, lifelink, toughness, flyers, life, exact)
+
+    def test_flying_needs_flying_or_reach(self):
+        """A ground blocker cannot stop a flyer; a reach blocker can."""
+        attackers = [(3, True, False, False), (2, False, False, False)]
+        self.assertEqual(self._solve(attackers, [(5, False)], 20).damage, 3)
+        self.assertEqual(self._solve(attackers, [(5, True)], 20).damage, 2)
+        self.assertEqual(self._solve(attackers, [(5, False), (1, True)], 20).damage, 0)
+
+    def test_trample_gang_blocks(self):
+        """Blocked tramplers only lose the blockers' toughness, so the defender may gang-block."""
+        attackers = [(6, False, True, False), (2, False, False, False)]
+        self.assertEqual(self._solve(attackers, [(3, False), (3, False)], 20).damage, 2)
+        # Against small blockers, blocking the non-trampler saves more than a gang block.
+        self.assertEqual(self._solve(attackers, [(1, False), (1, False)], 20).damage, 5)
+        self.assertTrue(self._solve(attackers, [(1, False), (1, False)], 5, exact=False).lethal)
+        self.assertFalse(self._solve(attackers, [(1, False), (1, False)], 6, exact=False).lethal)
+
+    def test_lethal_and_life_gain(self):
+        result = self._solve([(2, False, False, True)] * 3, [(1, False)], 4, exact=False)
+        self.assertTrue(result.lethal)
+        self.assertEqual(result.life_gain, 6)
+        self.assertFalse(self._solve([(2, False, False, True)] * 3, [(1, False)] * 2, 4, exact=False).lethal)
+
+    def test_matches_brute_force(self):
+        """Identical creatures are searched once per class; the optimum still matches every assignment."""
+        rng = np.random.default_rng(0)
+        for _ in range(300):
+            num_attackers, num_blockers = rng.integers(1, 6), rng.integers(0, 6)
+            power = rng.integers(0, 5, num_attackers).tolist()
+            flying = (rng.random(num_attackers) < 0.3).tolist()
+            trample = (rng.random(num_attackers) < 0.5).tolist()
+            toughness = rng.integers(1, 4, num_blockers).tolist()
+            flyers = (rng.random(num_blockers) < 0.3).tolist()
+            life = int(rng.integers(1, 15))
+            expected = _brute_force_damage(power, flying, trample, toughness, flyers)
+            self.assertEqual(solve_combat(power, flying, trample, [False] * num_attackers, toughness, flyers, life, exact=True).damage, expected)
+            self.assertEqual(solve_combat(power, flying, trample, [False] * num_attackers, toughness, flyers, life).lethal, expected >= life)
+
+class TestLethalFromGraph(unittest.TestCase):
+
+    def setUp(self):
+        forest = card_data_loader.get_card_id_by_name("Forest")
+        self.graph = game_initializer.initialize_game_state([forest] * 60, [forest] * 60)
+        self.players = [self.graph.entities[player_id] for player_id in self.graph.players]
+
+    def _add_creatures(self, side, name, count):
+        """Adds `count` tokens of a creature that have been on the battlefield since before this turn."""
+        tokens = self.graph.create_tokens(self.players[side], card_data_loader.get_card_id_by_name(name), count)
+        tokens.tokens[:, :] = 0
+
+    def test_next_turn_lethal_makes_us_desperate(self):
+        self.graph.active_player_id = self.graph.players[0]
+        self._add_creatures(1, "Pack Leader", 5)
+        self._add_creatures(0, "Concordia Pegasus", 1)
+        self.players[0].properties['life_total'] = 8
+
+        state = CompactState.from_graph(self.graph)
+        self.assertTrue(lethal_from_compact(state, 1, next_turn=True).lethal)
+        self.assertFalse(lethal_from_compact(state, 0).lethal)
+        evaluator = MultiHeadedEvaluator(embeddings={})
+        scores = evaluator.assess_game_potential(self.graph)
+        self.assertEqual(scores["hail_mary_needed"], 1.0)
+        self.assertEqual(scores["opponent_threat"], 1.0)
+
+        # With lethal of our own (the Pegasus flies over ground blockers) we are not desperate.
+        self.players[1].properties['life_total'] = 1
+        self.assertFalse(evaluator._is_desperate(self.graph))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+
+import numpy as np
+
+from MTG_bot.strategic_brain.deck_evolution import DeckConstraints, DeckEvolution, SelfPlayFarm, canonical, expand, mutate, random_deck
+from MTG_bot.strategic_brain.rollout_policy import standard_decklists
+
+class TestDeckEvolution(unittest.TestCase):
+
+    def setUp(self):
+        self.rng = np.random.default_rng(0)
+        self.constraints = DeckConstraints.from_game_mode("Standard")
+        self.gauntlet = [canonical(decklist) for decklist in standard_decklists()[1]]
+
+    def test_constraints(self):
+        self.assertEqual((self.constraints.deck_size, self.constraints.max_copies), (60, 4))
+        self.assertTrue(self.constraints.basic_lands)
+
+    def test_mutations_keep_decks_legal(self):
+        deck = self.gauntlet[0]
+        self.assertEqual(canonical(expand(deck)), deck)
+        for _ in range(20):
+            mutant = mutate(deck, self.constraints, self.rng, num_swaps=3)
+            cards = expand(mutant)
+            self.assertEqual(len(cards), 60)
+            self.assertLessEqual(sum(abs(a - b) for a, b in zip(np.bincount(cards, minlength=2000), np.bincount(expand(deck), minlength=2000))), 6)
+            for card_id, count in mutant:
+                self.assertTrue(count <= 4 or card_id in self.constraints.basic_lands)
+        deck = random_deck(self.constraints, self.rng)
+        self.assertEqual(len(expand(deck)), 60)
+
+    def test_farm_caches_by_decklist(self):
+        with SelfPlayFarm(self.gauntlet, games_per_opponent=2, processes=0) as farm:
+            shuffled = canonical(list(reversed(expand(self.gauntlet[0]))))
+            rates = farm.win_rates([self.gauntlet[0], shuffled])
+            self.assertEqual(rates[0], rates[1])
+            self.assertEqual(farm.games_played, 4)
+            farm.win_rates([self.gauntlet[0]])
+            self.assertEqual(farm.games_played, 4)
+
+    def test_evolution_anneals_robustness(self):
+        population = [mutate(self.gauntlet[i % 2], self.constraints, self.rng, 4) for i in range(4)]
+        with SelfPlayFarm(self.gauntlet, games_per_opponent=2, processes=0) as farm:
+            evolution = DeckEvolution(farm, self.constraints, population, elite_size=2, num_neighbours=2, rng=self.rng)
+            candidates = evolution.run(2)
+        self.assertEqual([stats.robustness_weight for stats in evolution.history], [1.0, 0.0])
+        self.assertEqual(len(evolution.population), 4)
+        fitness = [candidate.fitness for candidate in candidates]
+        self.assertEqual(fitness, sorted(fitness, reverse=True))
+        for candidate in candidates:
+            self.assertLessEqual(candidate.robustness, 0.0)
+            self.assertAlmostEqual(candidate.fitness, candidate.win_rate)
+
+
+if __name__ == '__main__':
+    unittest.main()
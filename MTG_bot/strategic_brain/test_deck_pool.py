@@ -0,0 +1,81 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from MTG_bot import config
+from MTG_bot.rule_engine.card_database import card_data_loader
+from MTG_bot.strategic_brain.deck_pool import DeckPool, novelty_scores, wilson_interval
+
+class TestDeckPool(unittest.TestCase):
+
+    def setUp(self):
+        # Work on a copy so the pool tables never touch the tracked database.
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "mtg_bot.db")
+        shutil.copy(config.MTG_BOT_DB_PATH, self.db_path)
+        self.pool = DeckPool(self.db_path)
+        self.pool.add_decks([1, 2])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_wilson_interval(self):
+        self.assertEqual(wilson_interval(0, 0), (0.0, 1.0))
+        low, high = wilson_interval(50, 100)
+        self.assertAlmostEqual((low + high) / 2, 0.5)
+        narrow_low, narrow_high = wilson_interval(500, 1000)
+        self.assertLess(narrow_high - narrow_low, high - low)
+
+    def test_novelty(self):
+        counts = np.array([[4, 0, 0], [4, 1, 0], [0, 0, 4]], dtype=float)
+        novelty = novelty_scores(counts, k=1)
+        self.assertEqual(int(np.argmax(novelty)), 2)
+        self.assertTrue(np.all(novelty_scores(counts[:1]) == 1))
+
+    def test_record_results(self):
+        self.pool.record_results([(1, 2, 1.0), (1, 2, 0.5), (2, 1, 1.0)])
+        entries = {entry.deck_id: entry for entry in self.pool.entries()}
+        self.assertEqual(entries[1].games, 3)
+        self.assertAlmostEqual(entries[1].wins, 1.5)
+        self.assertAlmostEqual(entries[2].wins, 1.5)
+        self.assertIsNotNone(entries[1].last_evaluated)
+
+    def test_scheduling_prefers_uncertain_and_novel_decks(self):
+        """A fresh deck is scheduled before well-measured ones, against its least-played opponent."""
+        forest, mountain = card_data_loader.get_card_id_by_name("Forest"), card_data_loader.get_card_id_by_name("Mountain")
+        new_deck = self.pool.create_deck("Evolved", {forest: 30, mountain: 30})
+        self.assertEqual(sorted(self.pool.load_decklist(new_deck)), sorted([forest] * 30 + [mountain] * 30))
+        self.pool.record_results([(1, 2, 1.0)] * 30 + [(1, 2, 0.0)] * 30)
+        matchups = self.pool.next_matchups(3, mode="uncertainty")
+        self.assertEqual(matchups[0][0], new_deck)
+        self.assertEqual(len(matchups), 3)
+        for deck_id, opponent_id in matchups:
+            self.assertNotEqual(deck_id, opponent_id)
+
+        ucb = self.pool.next_matchups(1, mode="ucb")
+        self.assertEqual(ucb[0][0], new_deck)
+        with self.assertRaises(ValueError):
+            self.pool.next_matchups(1, mode="greedy")
+
+    def test_create_deck_rejects_unknown_cards(self):
+        """Decks are stored under database card ids; a card the database lacks is a clear error."""
+        forest = card_data_loader.get_card_id_by_name("Forest")
+        deck_id = self.pool.create_deck("Forests", {forest: 60})
+        self.assertEqual(self.pool.load_decklist(deck_id), [forest] * 60)
+        num_entries = len(self.pool.entries())
+        with self.assertRaisesRegex(ValueError, "no row in the cards table"):
+            self.pool.create_deck("Broken", {forest: 59, -1: 1})
+        self.assertEqual(len(self.pool.entries()), num_entries)
+
+    def test_remove_deck(self):
+        self.pool.record_results([(1, 2, 1.0)])
+        self.pool.remove_deck(2)
+        self.assertEqual([entry.deck_id for entry in self.pool.entries()], [1])
+        self.assertEqual(self.pool.next_matchups(1), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
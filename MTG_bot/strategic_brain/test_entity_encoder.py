@@ -0,0 +1,84 @@
+import unittest
+
+import numpy as np
+
+from MTG_bot.rule_engine import game_initializer
+from MTG_bot.rule_engine import vocabulary as vocab
+from MTG_bot.rule_engine.card_database import card_data_loader
+from MTG_bot.strategic_brain import entity_encoder as ee
+from MTG_bot.strategic_brain.entity_encoder import EntityTokenEncoder, collate
+
+class TestEntityEncoder(unittest.TestCase):
+
+    def setUp(self):
+        forest = card_data_loader.get_card_id_by_name("Forest")
+        dreadmaw = card_data_loader.get_card_id_by_name("Colossal Dreadmaw")
+        self.graph = game_initializer.initialize_game_state(
+            decklist1=[forest, dreadmaw] * 10,
+            decklist2=[forest, dreadmaw] * 10,
+            shuffle=False,
+        )
+        self.encoder = EntityTokenEncoder()
+
+    def _zone(self, player_id, zone_id):
+        player = self.graph.entities[player_id]
+        return next(self.graph.entities[r.target] for r in self.graph.get_relationships(source=player, rel_type=vocab.ID_REL_CONTROLS) if self.graph.entities[r.target].type_id == zone_id)
+
+    def test_hidden_cards(self):
+        """Libraries and the opponent's hand are hidden; the own hand is visible."""
+        tokens = self.encoder.encode(self.graph)
+        self.assertEqual(len(tokens.type_ids), len(self.graph.entities))
+        self.assertTrue(tokens.mask.all())
+
+        hand = ee.ZONE_ORDER.index(vocab.ID_ZONE_HAND) + 1
+        library = ee.ZONE_ORDER.index(vocab.ID_ZONE_LIBRARY) + 1
+        own_hand = (tokens.zone_ids == hand) & (tokens.controller_ids == ee.CONTROLLER_SELF) & (tokens.type_ids != vocab.ID_ZONE_HAND + ee.TYPE_ID_OFFSET)
+        opponent_hand = (tokens.zone_ids == hand) & (tokens.controller_ids == ee.CONTROLLER_OPPONENT) & (tokens.type_ids == ee.HIDDEN_TOKEN)
+        self.assertEqual(own_hand.sum(), 7)
+        self.assertTrue((tokens.type_ids[own_hand] >= ee.TYPE_ID_OFFSET).all())
+        self.assertEqual(opponent_hand.sum(), 7)
+        self.assertFalse(tokens.features[opponent_hand].any())
+        self.assertEqual(((tokens.zone_ids == library) & (tokens.type_ids == ee.HIDDEN_TOKEN)).sum(), 26)
+
+    def test_relations(self):
+        """Blocking edges show up as relation codes between blocker and attacker."""
+        player1, player2 = self.graph.players
+        attacker, blocker = None, None
+        for player_id in (player1, player2):
+            library = self._zone(player_id, vocab.ID_ZONE_LIBRARY)
+            card = next(self.graph.entities[r.source] for r in self.graph.get_relationships(target=library, rel_type=vocab.ID_REL_IS_IN_ZONE) if self.graph.entities[r.source].properties.get('is_creature'))
+            self.graph._move_card_to_zone(card, self._zone(player_id, vocab.ID_ZONE_BATTLEFIELD))
+            attacker, blocker = (card, blocker) if player_id == player1 else (attacker, card)
+        self.graph.add_relationship(blocker, attacker, vocab.ID_REL_BLOCKING)
+
+        tokens = self.encoder.encode(self.graph)
+        blocking_code = ee.RELATION_TYPES.index(vocab.ID_REL_BLOCKING) + 1
+        sources, targets = np.nonzero(tokens.relations == blocking_code)
+        self.assertEqual(len(sources), 1)
+        self.assertEqual(tokens.features[targets[0], 0], 6)
+        # Battlefield cards are ordered right after players and zones.
+        self.assertLess(max(sources[0], targets[0]), 2 + 8 + 2)
+
+        bias = tokens.relation_bias(np.arange(ee.NUM_RELATION_CODES, dtype=np.float32))
+        self.assertEqual(bias[sources[0], targets[0]], blocking_code)
+
+    def test_batch_and_collate(self):
+        """encode_batch and collate agree and pad/truncate to the requested size."""
+        other = game_initializer.initialize_game_state(
+            decklist1=[card_data_loader.get_card_id_by_name("Island")] * 5,
+            decklist2=[card_data_loader.get_card_id_by_name("Swamp")] * 5,
+        )
+        batch = self.encoder.encode_batch([self.graph, other])
+        collated = collate([self.encoder.encode(self.graph), self.encoder.encode(other)])
+        for name in ("type_ids", "zone_ids", "controller_ids", "features", "mask", "relations"):
+            np.testing.assert_array_equal(getattr(batch, name), getattr(collated, name))
+        self.assertEqual(batch.mask[1].sum(), len(other.entities))
+        self.assertTrue((batch.type_ids[1][~batch.mask[1]] == ee.PAD_TOKEN).all())
+
+        truncated = self.encoder.encode_batch([self.graph], pad_to=20)
+        self.assertEqual(truncated.relations.shape, (1, 20, 20))
+        self.assertTrue(truncated.mask.all())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+import unittest
+
+import numpy as np
+
+from MTG_bot.rule_engine import game_initializer
+from MTG_bot.rule_engine import vocabulary as vocab
+from MTG_bot.rule_engine.actions import CastSpellAction, DeclareAttackerAction, DeclareBlockerAction, PassPriorityAction, PlayLandAction
+from MTG_bot.rule_engine.card_database import card_data_loader
+from MTG_bot.strategic_brain.compact_state import CompactState
+from MTG_bot.strategic_brain.evaluation import ImpactScorer, SynergyScorer, LIFE_OPPONENT, BOARD_SELF, CARDS_OPPONENT
+
+class TestSynergyScorer(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.embeddings = {400 + i: rng.normal(size=16) for i in range(20)}
+        self.scorer = SynergyScorer(self.embeddings)
+
+    def _brute_force(self, type_ids):
+        vectors = [self.embeddings[t] / np.linalg.norm(self.embeddings[t]) if t in self.embeddings else np.zeros(16) for t in type_ids]
+        n = len(vectors)
+        return np.mean([vectors[i] @ vectors[j] for i in range(n) for j in range(n) if i != j])
+
+    def test_matches_pairwise_average(self):
+        """The vectorized score equals the average cosine similarity over all pairs."""
+        hand = [400, 400, 401, 405, 12345]
+        self.assertAlmostEqual(self.scorer.score_multiset(hand), self._brute_force(hand), places=5)
+        self.assertAlmostEqual(self.scorer.score_multiset({400: 2, 401: 1, 405: 1, 12345: 1}), self._brute_force(hand), places=5)
+        self.assertEqual(self.scorer.score_multiset([400]), 0.0)
+
+    def test_batch_and_memo(self):
+        """Batched scores match single scores and repeated multisets are memoized."""
+        sets = [[400, 401], [], [402, 403, 404], [401, 400]]
+        scores = self.scorer.score_batch(sets)
+        self.assertEqual(scores[1], 0.0)
+        self.assertEqual(scores[0], scores[3])
+        self.assertAlmostEqual(scores[2], self._brute_force(sets[2]), places=5)
+        self.assertEqual(len(self.scorer._memo), 3)
+        self.assertEqual(SynergyScorer({}).score_batch(sets).tolist(), [0.0] * 4)
+
+    def test_score_set_on_entities(self):
+        """Card entities are scored by their type_id."""
+        forest = card_data_loader.get_card_id_by_name("Forest")
+        dreadmaw = card_data_loader.get_card_id_by_name("Colossal Dreadmaw")
+        graph = game_initializer.initialize_game_state([forest, dreadmaw] * 10, [forest] * 20)
+        scorer = SynergyScorer({forest: np.array([1.0, 0.0]), dreadmaw: np.array([0.0, 1.0])})
+        cards = [e for e in graph.entities.values() if e.type_id in (forest, dreadmaw)][:4]
+        self.assertAlmostEqual(scorer.score_set(cards), scorer.score_multiset([c.type_id for c in cards]))
+
+class TestImpactScorer(unittest.TestCase):
+
+    def setUp(self):
+        forest = card_data_loader.get_card_id_by_name("Forest")
+        self.graph = game_initializer.initialize_game_state([forest] * 60, [forest] * 60, shuffle=False)
+        self.graph.turn_number = 5
+        self.me, self.opponent = self.graph.players
+        self.scorer = ImpactScorer()
+
+    def _add_card(self, player_id, name, zone_type=vocab.ID_ZONE_BATTLEFIELD):
+        player = self.graph.entities[player_id]
+        card = self.graph.add_entity(card_data_loader.get_card_id_by_name(name))
+        card.properties['turn_entered'] = 1
+        zone = next(self.graph.entities[r.target] for r in self.graph.get_relationships(source=player, rel_type=vocab.ID_REL_CONTROLS) if self.graph.entities[r.target].type_id == zone_type)
+        self.graph.add_relationship(player, card, vocab.ID_REL_CONTROLS)
+        self.graph._move_card_to_zone(card, zone)
+        return card
+
+    def test_snapshot(self):
+        """The compact state reflects hands, battlefields and keywords."""
+        pegasus = self._add_card(self.me, "Concordia Pegasus")
+        state = CompactState.from_graph(self.graph)
+        row = state.row_of[pegasus.instance_id.int]
+        self.assertTrue(state.flying[row])
+        self.assertEqual((state.power[row], state.toughness[row]), (1, 3))
+        np.testing.assert_array_equal(state.hand_size, [7, 7])
+        np.testing.assert_array_equal(state.library_size, [53, 53])
+
+    def test_attacks_are_valued_against_the_best_block(self):
+        """Free damage is good, attacking into a blocker that eats the attacker is worse than passing."""
+        attackers = [self._add_card(self.me, name) for name in ("Pack Leader", "Concordia Pegasus", "Staunch Shieldmate", "Colossal Dreadmaw")]
+        self._add_card(self.opponent, "Celestial Enforcer")
+        moves = [PassPriorityAction(self.me)] + [DeclareAttackerAction(self.me, card.instance_id) for card in attackers]
+        state = CompactState.from_graph(self.graph)
+        deltas, _ = self.scorer.impact_deltas(moves, state)
+        np.testing.assert_array_equal(deltas[:, LIFE_OPPONENT], [0, 0, -1, 0, -6]) # Flying is unblockable here, the 2/3 won't chump the 6/6
+        np.testing.assert_array_equal(deltas[:, BOARD_SELF], [0, -4, 0, 0, 0]) # The 2/2 dies to the 2/3, the 1/3 bounces off
+
+        scores = self.scorer.score_moves(moves, self.graph, state)
+        self.assertEqual(scores[0], 0.0)
+        self.assertLess(scores[1], scores[0])
+        self.assertGreater(scores[2], scores[0])
+        self.assertEqual(int(np.argmax(scores)), 4)
+
+    def test_lethal_and_burn_depend_on_life(self):
+        """The same damage is worth more at low life and winning outweighs everything."""
+        pegasus = self._add_card(self.me, "Concordia Pegasus")
+        move = DeclareAttackerAction(self.me, pegasus.instance_id)
+        healthy = self.scorer.score_play(move, self.graph)
+        self.graph.entities[self.opponent].properties['life_total'] = 5
+        low = self.scorer.score_play(move, self.graph)
+        self.graph.entities[self.opponent].properties['life_total'] = 1
+        lethal = self.scorer.score_play(move, self.graph)
+        self.assertLess(healthy, low)
+        self.assertGreater(lethal, self.scorer.lethal_bonus)
+
+    def test_blocks_and_main_phase_moves(self):
+        """Blocks that kill the attacker beat chump blocks; lands and creatures have positive impact."""
+        attacker = self._add_card(self.opponent, "Pack Leader")
+        attacker.properties['is_attacking'] = True
+        wall = self._add_card(self.me, "Staunch Shieldmate")
+        chump = self._add_card(self.me, "Selfless Savior")
+        enforcer = self._add_card(self.me, "Celestial Enforcer")
+        moves = [DeclareBlockerAction(self.me, blocker.instance_id, attacker.instance_id) for blocker in (wall, chump, enforcer)]
+        deltas, _ = self.scorer.impact_deltas(moves, CompactState.from_graph(self.graph))
+        np.testing.assert_array_equal(deltas[:, CARDS_OPPONENT], [0, 0, -1])
+        scores = self.scorer.score_moves(moves, self.graph)
+        self.assertGreater(scores[2], scores[0])
+        self.assertGreater(scores[0], scores[1])
+
+        land = self._add_card(self.me, "Forest", vocab.ID_ZONE_HAND)
+        creature = self._add_card(self.me, "Daybreak Charger", vocab.ID_ZONE_HAND)
+        scores = self.scorer.score_moves([PlayLandAction(self.me, land.instance_id), CastSpellAction(self.me, creature.instance_id)], self.graph)
+        self.assertTrue((scores > 0).all())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from MTG_bot import config
+from MTG_bot.strategic_brain.deck_evolution import canonical
+from MTG_bot.strategic_brain.deck_pool import DeckPool
+from MTG_bot.strategic_brain.matchup_evaluator import SPRT, STOP_H0, STOP_H1, STOP_MAX_GAMES, MatchupEvaluator
+from MTG_bot.strategic_brain.rollout_policy import standard_decklists
+
+class TestMatchupEvaluator(unittest.TestCase):
+
+    def setUp(self):
+        self.decks = [canonical(decklist) for decklist in standard_decklists()[1]]
+
+    def test_sprt(self):
+        sprt = SPRT(p0=0.45, p1=0.55, alpha=0.05, beta=0.05)
+        self.assertIsNone(sprt.decision(5, 10))
+        self.assertEqual(sprt.decision(80, 100), STOP_H1)
+        self.assertEqual(sprt.decision(20, 100), STOP_H0)
+        # A draw counts half: ten draws leave the test where it started.
+        self.assertAlmostEqual(sprt.llr(5, 10), 0.0)
+
+    def test_lopsided_matchup_stops_early(self):
+        """Green Stompy beats Blue-Red Spells often enough that far fewer than max_games are needed."""
+        with MatchupEvaluator(max_games=400, processes=0) as evaluator:
+            result = evaluator.evaluate(self.decks[0], self.decks[1])
+            self.assertEqual(result.stop_reason, STOP_H1)
+            self.assertLess(result.games, 100)
+            self.assertEqual(result.games_saved, 400 - result.games)
+
+            reverse = evaluator.evaluate(self.decks[1], self.decks[0])
+            self.assertEqual(reverse.stop_reason, STOP_H0)
+
+    def test_max_games(self):
+        with MatchupEvaluator(SPRT(p0=0.49, p1=0.51), precision=None, max_games=15, batch_size=4, processes=0) as evaluator:
+            result = evaluator.evaluate(self.decks[0], self.decks[0])
+        self.assertEqual(result.stop_reason, STOP_MAX_GAMES)
+        self.assertEqual(result.games, 15)
+        self.assertEqual(result.games_saved, 0)
+
+    def test_results_recorded_in_pool(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "mtg_bot.db")
+            shutil.copy(config.MTG_BOT_DB_PATH, db_path)
+            pool = DeckPool(db_path)
+            pool.add_decks([1, 2])
+            with MatchupEvaluator(max_games=100, processes=0) as evaluator:
+                results = evaluator.evaluate_pool(pool, 1)
+            deck_id, opponent_id, result = results[0]
+            entries = {entry.deck_id: entry for entry in pool.entries()}
+            self.assertEqual(entries[deck_id].games, result.games)
+            self.assertEqual(entries[opponent_id].games, result.games)
+            self.assertAlmostEqual(entries[deck_id].wins, sum(result.scores))
+
+
+if __name__ == '__main__':
+    unittest.main()
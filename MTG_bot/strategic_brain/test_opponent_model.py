@@ -0,0 +1,104 @@
+import unittest
+
+import numpy as np
+
+from MTG_bot.rule_engine import game_initializer
+from MTG_bot.rule_engine import vocabulary as vocab
+from MTG_bot.rule_engine.actions import CastSpellAction, PlayLandAction
+from MTG_bot.rule_engine.card_database import card_data_loader
+from MTG_bot.strategic_brain.opponent_model import BeliefTracker, OpponentModel
+
+class TestBeliefTracker(unittest.TestCase):
+
+    def setUp(self):
+        self.mountain = card_data_loader.get_card_id_by_name("Mountain")
+        self.shock = card_data_loader.get_card_id_by_name("Shock")
+        self.decklist = [self.mountain] * 24 + [self.shock] * 36
+        self.tracker = BeliefTracker(self.decklist)
+        self.m, self.s = self.tracker._index[self.mountain], self.tracker._index[self.shock]
+        for _ in range(7):
+            self.tracker.observe_move(vocab.ID_ZONE_LIBRARY, vocab.ID_ZONE_HAND)
+
+    def test_incremental_updates(self):
+        """Played cards leave the unknown pool; bounced cards become known hand cards."""
+        self.tracker.observe_move(vocab.ID_ZONE_HAND, vocab.ID_ZONE_BATTLEFIELD, self.mountain)
+        self.tracker.observe_move(vocab.ID_ZONE_HAND, vocab.ID_ZONE_GRAVEYARD, self.shock)
+        self.tracker.observe_move(vocab.ID_ZONE_BATTLEFIELD, vocab.ID_ZONE_HAND, self.mountain)
+        self.assertEqual((self.tracker.hand_size, self.tracker.library_size), (6, 53))
+        self.assertEqual((self.tracker.unknown_counts[self.m], self.tracker.unknown_counts[self.s]), (23, 35))
+        self.assertEqual((self.tracker.known_hand_counts[self.m], self.tracker.known_hand_counts[self.s]), (1, 0))
+
+        particles = self.tracker.sample(1000, np.random.default_rng(0))
+        self.assertTrue((particles.hand_counts.sum(axis=1) == 6).all())
+        self.assertTrue((particles.hand_counts[:, self.m] >= 1).all())
+        totals = particles.hand_counts + particles.library_counts
+        self.assertTrue((totals[:, self.m] == 24).all() and (totals[:, self.s] == 35).all())
+        self.assertEqual(len(particles.library(0)), 53)
+        self.assertAlmostEqual(self.tracker.hand_probabilities()[self.mountain], 1.0)
+
+    def test_revealed_tutor(self):
+        """A card revealed while moving from library to hand becomes a known hand card."""
+        self.tracker.observe_move(vocab.ID_ZONE_LIBRARY, vocab.ID_ZONE_HAND, self.shock)
+        self.assertEqual((self.tracker.hand_size, self.tracker.library_size), (8, 52))
+        self.assertEqual((self.tracker.unknown_counts[self.s], self.tracker.known_hand_counts[self.s]), (35, 1))
+        particles = self.tracker.sample(100, np.random.default_rng(0))
+        self.assertTrue((particles.hand_counts.sum(axis=1) == 8).all())
+        self.assertTrue((particles.hand_counts[:, self.s] >= 1).all())
+
+    def test_move_from_unseen_public_zone(self):
+        """Moving a card out of a public zone it was never seen in is a clear error."""
+        with self.assertRaisesRegex(ValueError, "no copy of it was seen"):
+            self.tracker.observe_move(vocab.ID_ZONE_GRAVEYARD, vocab.ID_ZONE_HAND, self.shock)
+        self.tracker.observe_move(vocab.ID_ZONE_HAND, vocab.ID_ZONE_GRAVEYARD, self.shock)
+        with self.assertRaisesRegex(ValueError, "no copy of it was seen"):
+            self.tracker.observe_move(vocab.ID_ZONE_GRAVEYARD, vocab.ID_ZONE_HAND, self.mountain)
+
+    def test_sync_from_graph(self):
+        """Counts rebuilt from a GameGraph match the zone contents."""
+        graph = game_initializer.initialize_game_state(self.decklist, self.decklist, shuffle=False)
+        tracker = BeliefTracker(self.decklist)
+        tracker.sync_from_graph(graph, graph.players[1])
+        self.assertEqual((tracker.hand_size, tracker.library_size), (7, 53))
+        self.assertEqual(int(tracker.unknown_counts.sum()), 60)
+
+    def test_update_tracks_observed_moves(self):
+        """Land plays and casts fed to OpponentModel.update move the card out of the hidden zones."""
+        decklist = [self.shock] + [self.mountain] * 59
+        graph = game_initializer.initialize_game_state(decklist, decklist, shuffle=False)
+        player = graph.players[1]
+        zones = {r.target: graph.entities[r.target].type_id for r in graph.relationships if r.type_id == vocab.ID_REL_CONTROLS and r.source == player}
+        hand = [r.source for r in graph.relationships if r.type_id == vocab.ID_REL_IS_IN_ZONE and zones.get(r.target) == vocab.ID_ZONE_HAND]
+        shock = next(uid for uid in hand if graph.entities[uid].type_id == self.shock)
+        mountain = next(uid for uid in hand if graph.entities[uid].type_id == self.mountain)
+
+        tracker = BeliefTracker(decklist)
+        tracker.sync_from_graph(graph, player)
+        model = OpponentModel(belief=tracker)
+        model.update(CastSpellAction(player, shock), graph)
+        model.update(PlayLandAction(player, mountain), graph)
+
+        self.assertEqual(tracker.possible_card_ids().tolist(), [self.mountain])
+        self.assertEqual((tracker.hand_size, tracker.library_size), (5, 53))
+        particles = tracker.sample(100, np.random.default_rng(0))
+        self.assertTrue((particles.hand_counts.sum(axis=1) == 5).all())
+        self.assertTrue((particles.hand_counts[:, self.s] == 0).all())
+
+    def test_prior_weights(self):
+        """A prior favouring a card shifts the weighted particle mass towards hands holding it."""
+        particles = self.tracker.sample(20000, np.random.default_rng(1), prior={self.shock: 3.0})
+        self.assertAlmostEqual(particles.weights.sum(), 1.0)
+        uniform_mean = particles.hand_counts[:, self.s].mean()
+        weighted_mean = particles.weights @ particles.hand_counts[:, self.s]
+        self.assertGreater(weighted_mean, uniform_mean)
+
+        with self.assertRaisesRegex(ValueError, "must be positive"):
+            self.tracker.sample(10, prior={self.shock: 0.0})
+
+        model = OpponentModel(belief=self.tracker)
+        probabilities = model.infer_hand_probabilities()
+        self.assertEqual(set(probabilities), {"Mountain", "Shock"})
+        self.assertEqual(OpponentModel().infer_hand_probabilities(), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from MTG_bot.strategic_brain.replay_buffer import ReplayBuffer, ReplayWriter
+
+class TestReplayBuffer(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = self.tmp.name
+        self.rng = np.random.default_rng(0)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _write_game(self, writer, turns, winner):
+        for turn in range(turns):
+            writer.add(np.full(writer.dtype["observation"].shape, turn, dtype=np.float32), [3, 1] if turn % 2 else [1, 1, 2], side=turn % 2, turn=turn)
+        writer.finish_game(winner)
+
+    def test_round_trip(self):
+        """Outcomes follow the deciding side, visits are normalised over the legal moves."""
+        writer = ReplayWriter(self.directory, shard_size=8)
+        self._write_game(writer, 6, winner=0)
+        self._write_game(writer, 6, winner=None)
+        writer.flush()
+        buffer = ReplayBuffer(self.directory)
+        self.assertEqual(len(buffer), 12)
+        self.assertEqual(len(buffer._paths), 2)
+
+        batch = buffer.sample(500, self.rng)
+        self.assertTrue(np.all(batch.observation[:, 0] == batch.turn))
+        even = batch.turn % 2 == 0
+        np.testing.assert_array_equal(batch.legal.sum(axis=1), np.where(even, 3, 2))
+        np.testing.assert_allclose(batch.policy[even, :3], np.tile([0.25, 0.25, 0.5], (even.sum(), 1)), atol=1e-3)
+        np.testing.assert_allclose(batch.policy.sum(axis=1), 1.0, atol=1e-2)
+        self.assertEqual(set(batch.outcome[even]) | set(batch.outcome[~even]), {1.0, -1.0, 0.0})
+        self.assertTrue(np.all(batch.outcome[even] >= 0))
+        self.assertTrue(np.all(batch.outcome[~even] <= 0))
+
+    def test_eviction(self):
+        writer = ReplayWriter(self.directory, shard_size=4)
+        for _ in range(5):
+            self._write_game(writer, 4, winner=1)
+        buffer = ReplayBuffer(self.directory, max_shards=3)
+        self.assertEqual(len(buffer), 12)
+        self.assertEqual(len(os.listdir(self.directory)), 3)
+
+        shard_bytes = os.path.getsize(buffer._paths[0])
+        buffer.max_bytes = 2 * shard_bytes
+        buffer.refresh()
+        self.assertEqual(len(buffer), 8)
+
+        old = buffer._paths[0]
+        os.utime(old, (0, 0))
+        buffer.max_age_seconds = 3600
+        buffer.refresh()
+        self.assertNotIn(old, buffer._paths)
+        self.assertEqual(len(buffer), 4)
+
+    def test_too_many_moves(self):
+        writer = ReplayWriter(self.directory, max_moves=4)
+        with self.assertRaises(ValueError):
+            writer.add(np.zeros(writer.dtype["observation"].shape), [1] * 5, side=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
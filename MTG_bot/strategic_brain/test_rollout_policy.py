@@ -0,0 +1,84 @@
+import unittest
+
+import numpy as np
+
+from MTG_bot.rule_engine import game_initializer
+from MTG_bot.rule_engine.card_database import card_data_loader
+from MTG_bot.strategic_brain.compact_state import CompactState, ZONE_BATTLEFIELD, ZONE_GRAVEYARD, ZONE_HAND
+from MTG_bot.strategic_brain.rollout_policy import DRAW, HeuristicRolloutPolicy, RolloutState, resolve_combat, simulate, standard_decklists
+
+class TestRolloutPolicy(unittest.TestCase):
+
+    def setUp(self):
+        self.rng = np.random.default_rng(0)
+        self.names, self.decklists = standard_decklists()
+        self.policy = HeuristicRolloutPolicy(rng=self.rng)
+
+    def _ids(self, *names):
+        return [card_data_loader.get_card_id_by_name(name) for name in names]
+
+    def _state(self, cards_0, cards_1):
+        """A state whose listed cards start on the battlefield, untapped and able to attack."""
+        state = RolloutState.from_decklists([self._ids(*cards_0), self._ids(*cards_1)], self.rng, hand_size=0)
+        state.zone[:] = ZONE_BATTLEFIELD
+        state.libraries = [[], []]
+        return state
+
+    def test_new_game(self):
+        state = RolloutState.from_decklists(self.decklists, self.rng)
+        for side in (0, 1):
+            self.assertEqual(np.count_nonzero((state.side == side) & (state.zone == ZONE_HAND)), 7)
+            self.assertEqual(len(state.libraries[side]), 53)
+
+    def test_main_phase_casts_most_expensive_spell(self):
+        """A land is played and the mana goes to the most expensive affordable spell."""
+        state = RolloutState.from_decklists([self._ids("Forest", "Forest", "Forest", "Pack Leader", "Thrashing Brontodon", "Colossal Dreadmaw"), self._ids("Forest")], self.rng, hand_size=0)
+        state.zone[:3] = [ZONE_BATTLEFIELD, ZONE_BATTLEFIELD, ZONE_HAND]
+        state.zone[3:6] = ZONE_HAND
+        self.policy.main_phase(state, 0)
+        np.testing.assert_array_equal(state.zone[:6], [ZONE_BATTLEFIELD] * 3 + [ZONE_HAND, ZONE_BATTLEFIELD, ZONE_HAND])
+        self.assertTrue(state.tapped[:3].all())
+        self.assertTrue(state.sick[4])
+
+    def test_blocks_and_race(self):
+        """Blockers prefer blocks that survive, chump only against lethal, and attacks race."""
+        state = self._state(["Pack Leader", "Colossal Dreadmaw"], ["Celestial Enforcer", "Selfless Savior"])
+        attackers = np.array([0, 1])
+        np.testing.assert_array_equal(self.policy.choose_blockers(state, 1, attackers), [2, -1])
+        state.life[1] = 6
+        np.testing.assert_array_equal(self.policy.choose_blockers(state, 1, attackers), [2, 3])
+
+        resolve_combat(state, attackers, np.array([2, 3]))
+        np.testing.assert_array_equal(state.zone, [ZONE_GRAVEYARD, ZONE_BATTLEFIELD, ZONE_BATTLEFIELD, ZONE_GRAVEYARD])
+        self.assertEqual(state.life[1], 1) # Colossal Dreadmaw tramples over the chump blocker
+
+        # Behind in the race, only attackers that no blocker eats are sent.
+        state = self._state(["Pack Leader", "Concordia Pegasus"], ["Celestial Enforcer", "Colossal Dreadmaw"])
+        np.testing.assert_array_equal(self.policy.choose_attackers(state, 0), [1])
+        state.life[1] = 3
+        np.testing.assert_array_equal(self.policy.choose_attackers(state, 0), [0, 1])
+
+    def test_from_compact_expands_tokens(self):
+        forest = card_data_loader.get_card_id_by_name("Forest")
+        graph = game_initializer.initialize_game_state([forest] * 60, [forest] * 60)
+        graph.create_tokens(graph.entities[graph.players[0]], card_data_loader.get_card_id_by_name("Pack Leader"), 3)
+        state = RolloutState.from_compact(CompactState.from_graph(graph, include_library=True), self.rng)
+        self.assertEqual(len(state.type_id), 123)
+        self.assertEqual(np.count_nonzero(state.zone == ZONE_BATTLEFIELD), 3)
+        self.assertTrue(state.sick[state.zone == ZONE_BATTLEFIELD].all())
+        self.assertEqual([len(library) for library in state.libraries], [53, 53])
+
+    def test_heuristic_beats_random(self):
+        random_policy = HeuristicRolloutPolicy(epsilon=1.0, rng=self.rng)
+        wins = 0
+        for game in range(40):
+            side = game % 2
+            policies = (self.policy, random_policy) if side == 0 else (random_policy, self.policy)
+            winner = simulate(RolloutState.from_decklists(self.decklists, self.rng), policies)
+            self.assertIn(winner, (0, 1, DRAW))
+            wins += winner == side
+        self.assertGreater(wins, 24)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+
+import numpy as np
+
+from MTG_bot.rule_engine import game_initializer
+from MTG_bot.rule_engine import vocabulary as vocab
+from MTG_bot.rule_engine.card_database import card_data_loader
+from MTG_bot.strategic_brain import state_converter as sc
+from MTG_bot.strategic_brain.state_converter import StateConverter
+
+class TestStateConverter(unittest.TestCase):
+
+    def setUp(self):
+        forest = card_data_loader.get_card_id_by_name("Forest")
+        dreadmaw = card_data_loader.get_card_id_by_name("Colossal Dreadmaw")
+        mountain = card_data_loader.get_card_id_by_name("Mountain")
+        shock = card_data_loader.get_card_id_by_name("Shock")
+        self.graph = game_initializer.initialize_game_state(
+            decklist1=[forest] * 24 + [dreadmaw] * 36,
+            decklist2=[mountain] * 24 + [shock] * 36,
+            shuffle=False,
+        )
+        self.converter = StateConverter()
+        self.player1 = self.graph.entities[self.graph.players[0]]
+
+    def _zone_col(self, player_slot: int, zone_id: int, col: int) -> int:
+        return player_slot * sc.PLAYER_BLOCK_SIZE + sc.ZONE_COUNTS_OFFSET + sc.ZONE_ORDER.index(zone_id) * sc.ZONE_BLOCK_SIZE + col
+
+    def _zone(self, player, zone_id):
+        return next(self.graph.entities[r.target] for r in self.graph.get_relationships(source=player, rel_type=vocab.ID_REL_CONTROLS) if self.graph.entities[r.target].type_id == zone_id)
+
+    def test_zone_counts(self):
+        """Hand and library totals are encoded for both players, card types only for the active one."""
+        obs = self.converter.convert_graph_to_observation(self.graph)
+        self.assertEqual(obs.shape, (sc.OBSERVATION_SIZE,))
+        self.assertEqual(obs[sc.LIFE_OFFSET], 20)
+        self.assertEqual(obs[self._zone_col(0, vocab.ID_ZONE_HAND, sc.ZONE_TOTAL_COL)], 7)
+        self.assertEqual(obs[self._zone_col(0, vocab.ID_ZONE_LIBRARY, sc.ZONE_TOTAL_COL)], 53)
+        self.assertEqual(obs[self._zone_col(1, vocab.ID_ZONE_HAND, sc.ZONE_TOTAL_COL)], 7)
+
+        land_col = sc.CARD_TYPES.index("Land")
+        own_lands = obs[self._zone_col(0, vocab.ID_ZONE_HAND, land_col)] + obs[self._zone_col(0, vocab.ID_ZONE_LIBRARY, land_col)]
+        self.assertEqual(own_lands, 24)
+        # The opponent's hidden zones only reveal their size.
+        self.assertEqual(obs[self._zone_col(1, vocab.ID_ZONE_HAND, land_col)], 0)
+
+    def test_battlefield_stats(self):
+        """Creatures add power/toughness and untapped lands count as mana sources."""
+        battlefield = self._zone(self.player1, vocab.ID_ZONE_BATTLEFIELD)
+        library = self._zone(self.player1, vocab.ID_ZONE_LIBRARY)
+        library_cards = [self.graph.entities[r.source] for r in self.graph.get_relationships(target=library, rel_type=vocab.ID_REL_IS_IN_ZONE)]
+        land = next(c for c in library_cards if c.properties.get('is_land'))
+        creature = next(c for c in library_cards if c.properties.get('is_creature'))
+        self.graph._move_card_to_zone(land, battlefield)
+        self.graph._move_card_to_zone(creature, battlefield)
+
+        obs = self.converter.convert_graph_to_observation(self.graph)
+        self.assertEqual(obs[sc.BOARD_STATS_OFFSET], 6)
+        self.assertEqual(obs[sc.BOARD_STATS_OFFSET + 1], 6)
+        self.assertEqual(obs[sc.UNTAPPED_SOURCES_OFFSET], 1)
+        self.assertEqual(obs[sc.UNTAPPED_SOURCES_OFFSET + 1 + sc.MANA_ORDER.index(vocab.ID_MANA_GREEN)], 1)
+
+        land.properties['tapped'] = True
+        creature.properties['tapped'] = True
+        obs = self.converter.convert_graph_to_observation(self.graph)
+        self.assertEqual(obs[sc.UNTAPPED_SOURCES_OFFSET], 0)
+        self.assertEqual(obs[sc.BOARD_STATS_OFFSET + 2], 0)
+
+    def test_convert_batch(self):
+        """Batch rows match single conversions and a preallocated buffer is filled in place."""
+        other = game_initializer.initialize_game_state(
+            decklist1=[card_data_loader.get_card_id_by_name("Island")] * 40,
+            decklist2=[card_data_loader.get_card_id_by_name("Swamp")] * 40,
+        )
+        out = np.full((2, sc.OBSERVATION_SIZE), -1, dtype=np.float32)
+        result = self.converter.convert_batch([self.graph, other], out=out)
+        self.assertIs(result, out)
+        np.testing.assert_array_equal(out[0], self.converter.convert_graph_to_observation(self.graph))
+        np.testing.assert_array_equal(out[1], self.converter.convert_graph_to_observation(other))
+        with self.assertRaises(ValueError):
+            self.converter.convert_batch([self.graph], out=out)
+
+
+if __name__ == '__main__':
+    unittest.main()
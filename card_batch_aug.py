@@ -0,0 +1,325 @@
+import functools
+import math
+import time
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+# --- Constants ---
+IMG_SIZE = 224                              # Same size as IMG_SIZE in card_recognition_nn.py
+IMAGENET_MEAN = (0.485, 0.456, 0.406)       # A.Normalize defaults
+IMAGENET_STD = (0.229, 0.224, 0.225)
+MAX_KERNEL = 7                              # Largest blur kernel (MotionBlur blur_limit=7 in strong_card_aug)
+MEDIAN_KERNELS = (3, 5)                     # MedianBlur(blur_limit=5) apertures
+GRID_STEPS = 5                              # GridDistortion(num_steps=5, distort_limit=0.3)
+GRID_DISTORT_LIMIT = 0.3
+CHUNK_SIZE = 16                             # Images processed together; keeps float intermediates cache-sized
+
+def _sorting_network(n):
+    """Comparators (i, j) of Batcher's odd-even merge sort for n inputs (any n, not just powers of 2)."""
+    pairs = []
+    p = 1
+    while p < n:
+        k = p
+        while k >= 1:
+            for j in range(k % p, n - k, 2 * k):
+                for i in range(min(k, n - j - k)):
+                    if (i + j) // (2 * p) == (i + j + k) // (2 * p):
+                        pairs.append((i + j, i + j + k))
+            k //= 2
+        p *= 2
+    return pairs
+
+@functools.lru_cache(maxsize=None)
+def median_network(n):
+    """The comparators of _sorting_network(n) that the middle output depends on."""
+    needed, pairs = {n // 2}, []
+    for i, j in reversed(_sorting_network(n)):
+        if i in needed or j in needed:
+            pairs.append((i, j))
+            needed |= {i, j}
+    return pairs[::-1]
+
+class BatchCardAugment:
+    """
+    CPU batch version of strong_card_aug for uint8 batches [B, H, W, 3] (e.g. straight from
+    the image cache with transform=None). Parameters are sampled per sample, but every step
+    runs once for the whole batch as tensor ops:
+      - one homography per sample (random resized crop or affine, then perspective) and
+        a grid distortion folded into the same sampling grid, applied with a single grid_sample
+      - Gaussian or motion blur as grouped convolutions with a kernel per sample, median
+        blur as a selection network over the shifted copies of the batch
+      - brightness/contrast/saturation/hue jitter as one 3x3 color matrix per sample;
+        noise, gamma and grayscale only on the samples that drew them
+      - coarse dropout as per-sample hole boxes turned into one mask by a bmm
+    Returns normalized float tensors [B, 3, size, size], like A.Normalize + ToTensorV2.
+    Large batches are processed `chunk_size` images at a time so the float intermediates
+    stay in cache.
+    strong_card_aug distorts the grid last; here it is sampled with the other geometric
+    steps, so dropout holes stay rectangular instead of being distorted with the image.
+    """
+    def __init__(self, size=IMG_SIZE, chunk_size=CHUNK_SIZE, seed=None):
+        self.size = size
+        self.chunk_size = chunk_size
+        self.generator = torch.Generator()
+        self.generator.manual_seed(seed if seed is not None else torch.seed())
+        self.mean = torch.tensor(IMAGENET_MEAN).view(1, 3, 1, 1)
+        self.std = torch.tensor(IMAGENET_STD).view(1, 3, 1, 1)
+        self.luma_weights = torch.tensor([0.299, 0.587, 0.114])
+        self.luma = self.luma_weights.repeat(3, 1).unsqueeze(0) # [1, 3, 3], every output channel = gray
+        # Pixel-centre coordinates in [-1, 1] (align_corners=False convention)
+        self.coords = (2 * torch.arange(size, dtype=torch.float32) + 1) / size - 1
+
+    def _uniform(self, low, high, n):
+        return low + (high - low) * torch.rand(n, generator=self.generator)
+
+    def _chance(self, p, n):
+        return torch.rand(n, generator=self.generator) < p
+
+    def __call__(self, images):
+        if isinstance(images, np.ndarray):
+            images = torch.from_numpy(images)
+        out = torch.empty((len(images), 3, self.size, self.size))
+        for i in range(0, len(images), self.chunk_size):
+            self._augment(images[i:i + self.chunk_size], out[i:i + self.chunk_size])
+        return out
+
+    def _augment(self, images, out):
+        # Warp and blur are linear, so they run on 0-255 values; the color matrix rescales to [0, 1]
+        n, height, width, _ = images.shape
+        x = torch.empty((n, 3, height, width)).copy_(images.permute(0, 3, 1, 2))
+        if height != self.size or width != self.size:
+            x = F.interpolate(x, size=(self.size, self.size), mode="bilinear", align_corners=False)
+        x = self._warp(x, n)
+        x = self._blur(x, n)
+        x = self._color(x, n)
+        x = self._dropout(x, n)
+        torch.div(x.sub_(self.mean), self.std, out=out)
+
+    def _grid_distortion(self, n):
+        """
+        GridDistortion (p=0.3) as per-sample x and y coordinate maps [n, size]. Like
+        Albumentations, each axis is cut into GRID_STEPS cells whose widths are scaled by
+        1 + U(-limit, limit) and renormalized to span the image, and coordinates are
+        interpolated linearly within a cell; samples that did not draw it get the identity.
+        """
+        active = self._chance(0.3, n).view(n, 1, 1)
+        steps = 1 + self._uniform(-GRID_DISTORT_LIMIT, GRID_DISTORT_LIMIT, n * 2 * GRID_STEPS).view(n, 2, GRID_STEPS)
+        steps = torch.where(active, steps, torch.ones(1))
+        steps = steps / steps.sum(dim=2, keepdim=True)
+        knots = torch.cumsum(steps, dim=2) - steps # Source position of each cell's left/top edge, in [0, 1)
+        position = (self.coords + 1) / 2 * GRID_STEPS
+        cell = position.long().clamp_(max=GRID_STEPS - 1).expand(n, 2, -1)
+        source = knots.gather(2, cell) + (position - cell) * steps.gather(2, cell)
+        return 2 * source[:, 0] - 1, 2 * source[:, 1] - 1
+
+    def _warp(self, x, n):
+        """
+        Maps output to input coordinates with one 3x3 matrix per sample and samples the batch
+        once. The grid distortion is separable, so it only changes the per-sample column and
+        row coordinates fed to the homography; each row of the homography is a column term
+        plus a row term, so the grid is still built with broadcasting instead of a per-pixel
+        matrix product.
+        """
+        eye = torch.eye(3).repeat(n, 1, 1)
+        geometric = self._chance(0.8, n)
+        use_crop = self._chance(0.5, n) & geometric
+        use_affine = geometric & ~use_crop
+
+        # RandomResizedCrop(scale=(0.35, 1), ratio=(0.75, 1.3)): output spans a sub-window of the input
+        area = self._uniform(0.35, 1.0, n)
+        log_ratio = self._uniform(math.log(0.75), math.log(1.3), n)
+        crop_w = torch.sqrt(area * torch.exp(log_ratio)).clamp(max=1.0)
+        crop_h = torch.sqrt(area / torch.exp(log_ratio)).clamp(max=1.0)
+        crop = eye.clone()
+        crop[:, 0, 0], crop[:, 1, 1] = crop_w, crop_h
+        crop[:, 0, 2] = (1 - crop_w) * self._uniform(-1, 1, n)
+        crop[:, 1, 2] = (1 - crop_h) * self._uniform(-1, 1, n)
+
+        # Affine(scale=(0.8, 1.2), rotate=(-35, 35), shear=(-12, 12)), inverted to output -> input
+        scale = self._uniform(0.8, 1.2, n)
+        angle = torch.deg2rad(self._uniform(-35, 35, n))
+        shear = torch.deg2rad(self._uniform(-12, 12, n))
+        forward = eye.clone()
+        forward[:, 0, 0] = scale * torch.cos(angle)
+        forward[:, 0, 1] = scale * (-torch.sin(angle) + torch.tan(shear) * torch.cos(angle))
+        forward[:, 1, 0] = scale * torch.sin(angle)
+        forward[:, 1, 1] = scale * (torch.cos(angle) + torch.tan(shear) * torch.sin(angle))
+        affine = torch.linalg.inv(forward)
+
+        matrix = torch.where(use_crop.view(n, 1, 1), crop, torch.where(use_affine.view(n, 1, 1), affine, eye))
+
+        # Perspective(scale=(0.04, 0.12)) as small random projective terms
+        perspective = self._chance(0.4, n)
+        strength = self._uniform(0.04, 0.12, n) * perspective
+        projective = eye.clone()
+        projective[:, 2, 0] = strength * self._uniform(-1, 1, n) * 2
+        projective[:, 2, 1] = strength * self._uniform(-1, 1, n) * 2
+        matrix = matrix @ projective
+
+        m = matrix.view(n, 9, 1, 1)
+        xs, ys = self._grid_distortion(n)
+        xs, ys = xs.view(n, 1, -1), ys.view(n, -1, 1)
+        grid = torch.empty((n, self.size, self.size, 2))
+        denominator = (m[:, 6] * xs + m[:, 8]).add(m[:, 7] * ys).clamp_(min=1e-6)
+        torch.div((m[:, 0] * xs + m[:, 2]).add(m[:, 1] * ys), denominator, out=grid[..., 0])
+        torch.div((m[:, 3] * xs + m[:, 5]).add(m[:, 4] * ys), denominator, out=grid[..., 1])
+        return F.grid_sample(x, grid, mode="bilinear", padding_mode="zeros", align_corners=False)
+
+    def _blur(self, x, n):
+        """
+        Gaussian, motion or median blur (p=0.5, one of the three): Gaussian and motion as one
+        grouped convolution with a kernel per sample (two separable 1-D passes for Gaussian,
+        a 2-D line kernel for motion), median over the 3x3 or 5x5 neighbourhood with a
+        selection network.
+        """
+        blur = self._chance(0.5, n)
+        kind = torch.randint(3, (n,), generator=self.generator)
+        radius = MAX_KERNEL // 2
+        offsets = torch.arange(-radius, radius + 1, dtype=torch.float32)
+
+        gaussian = (blur & (kind == 0)).nonzero().flatten()
+        if len(gaussian):
+            m = len(gaussian)
+            sigma = self._uniform(0.5, 1.5, m).view(m, 1)
+            kernel = torch.exp(-offsets.view(1, -1) ** 2 / (2 * sigma ** 2))
+            kernel = (kernel / kernel.sum(dim=1, keepdim=True)).repeat_interleave(3, dim=0).view(m * 3, 1, 1, -1)
+            out = F.pad(x[gaussian].reshape(1, m * 3, self.size, self.size), (radius,) * 4, mode="replicate")
+            out = F.conv2d(F.conv2d(out, kernel, groups=m * 3), kernel.transpose(2, 3), groups=m * 3)
+            x[gaussian] = out.view(m, 3, self.size, self.size)
+
+        motion = (blur & (kind == 1)).nonzero().flatten()
+        if len(motion):
+            # A line of random length and angle through the kernel centre
+            m = len(motion)
+            length = self._uniform(1.5, radius + 0.5, m).view(m, 1, 1)
+            angle = self._uniform(0, math.pi, m).view(m, 1, 1)
+            oy, ox = offsets.view(1, -1, 1), offsets.view(1, 1, -1)
+            along = ox * torch.cos(angle) + oy * torch.sin(angle)
+            across = -ox * torch.sin(angle) + oy * torch.cos(angle)
+            kernel = ((across.abs() < 0.5) & (along.abs() <= length)).float()
+            kernel = (kernel / kernel.sum(dim=(1, 2), keepdim=True)).repeat_interleave(3, dim=0).unsqueeze(1)
+            out = F.pad(x[motion].reshape(1, m * 3, self.size, self.size), (radius,) * 4, mode="replicate")
+            x[motion] = F.conv2d(out, kernel, groups=m * 3).view(m, 3, self.size, self.size)
+
+        median = (blur & (kind == 2)).nonzero().flatten()
+        if len(median):
+            aperture = torch.tensor(MEDIAN_KERNELS)[torch.randint(len(MEDIAN_KERNELS), (len(median),), generator=self.generator)]
+            for kernel_size in MEDIAN_KERNELS:
+                samples = median[aperture == kernel_size]
+                if len(samples):
+                    x[samples] = self._median(x[samples], kernel_size)
+        return x
+
+    def _median(self, x, kernel_size):
+        """
+        MedianBlur of a [m, 3, size, size] batch. The kernel_size ** 2 taps are the shifted
+        views of the padded batch (what F.unfold would copy out), rounded to uint8 like the
+        Albumentations input; the middle one is selected with min/max over whole tensors.
+        """
+        padded = F.pad(x, (kernel_size // 2,) * 4, mode="replicate").round_().to(torch.uint8)
+        taps = [padded[..., dy:dy + self.size, dx:dx + self.size].contiguous()
+                for dy in range(kernel_size) for dx in range(kernel_size)]
+        low = torch.empty_like(taps[0])
+        for i, j in median_network(len(taps)):
+            torch.minimum(taps[i], taps[j], out=low)
+            torch.maximum(taps[i], taps[j], out=taps[j])
+            taps[i], low = low, taps[i]
+        return taps[len(taps) // 2].float()
+
+    def _color(self, x, n):
+        """
+        ColorJitter (p=0.7) as one affine color transform per sample: brightness, contrast,
+        saturation and hue rotation are folded into a 3x3 matrix and an offset, applied with
+        a single bmm that also maps the 0-255 input to [0, 1]. Then ISO-like noise (p=0.4), RandomGamma (p=0.3) and ToGray (p=0.08),
+        each only on the samples that drew it.
+        """
+        eye = torch.eye(3).expand(n, 3, 3)
+        jitter = self._chance(0.7, n).view(n, 1, 1)
+        brightness = torch.where(jitter, self._uniform(0.5, 1.5, n).view(n, 1, 1), torch.ones(n, 1, 1))
+        contrast = torch.where(jitter, self._uniform(0.5, 1.5, n).view(n, 1, 1), torch.ones(n, 1, 1))
+        saturation = torch.where(jitter, self._uniform(0.5, 1.5, n).view(n, 1, 1), torch.ones(n, 1, 1))
+        hue = torch.where(jitter.view(n), self._uniform(-0.1, 0.1, n), torch.zeros(n)) * 2 * math.pi
+
+        # Saturation: (x - gray) * s + gray, with gray = LUMA @ x
+        luma = self.luma.expand(n, 3, 3)
+        saturate = saturation * eye + (1 - saturation) * luma
+
+        # Hue: rotation about the gray axis
+        cos, sin = torch.cos(hue).view(n, 1, 1), torch.sin(hue).view(n, 1, 1)
+        cross = torch.tensor([[0.0, -1.0, 1.0], [1.0, 0.0, -1.0], [-1.0, 1.0, 0.0]]) / math.sqrt(3)
+        rotate = cos * eye + (1 - cos) / 3 + sin * cross
+
+        # Contrast about the mean gray level of the brightened image
+        mean_gray = (x.mean(dim=(2, 3)) @ self.luma_weights).view(n, 1, 1) * brightness / 255
+        matrix = rotate @ saturate * (brightness * contrast / 255)
+        offset = (rotate @ saturate @ torch.ones(n, 3, 1)) * (1 - contrast) * mean_gray
+        x = torch.baddbmm(offset, matrix, x.view(n, 3, -1)).view(n, 3, self.size, self.size).clamp_(0, 1)
+
+        noise = self._chance(0.4, n).nonzero().flatten()
+        if len(noise):
+            m = len(noise)
+            intensity = self._uniform(0.1, 0.5, m).view(m, 1, 1, 1) * 0.1
+            color_shift = self._uniform(0.01, 0.15, m).view(m, 1, 1, 1) * 0.1
+            # Zero-mean, unit-variance uniform grain (cheaper to draw than normals); its channel
+            # mean, rescaled to unit variance, is the shared luminance part
+            grain = (torch.rand((m, 3, self.size, self.size), generator=self.generator) - 0.5) * math.sqrt(12)
+            grain = grain * color_shift + grain.mean(dim=1, keepdim=True) * (intensity * math.sqrt(3))
+            x[noise] = (x[noise] + grain).clamp_(0, 1)
+
+        gamma = self._chance(0.3, n).nonzero().flatten()
+        if len(gamma):
+            x[gamma] = x[gamma].pow(self._uniform(0.7, 1.3, len(gamma)).view(-1, 1, 1, 1))
+
+        to_gray = self._chance(0.08, n).nonzero().flatten()
+        if len(to_gray):
+            x[to_gray] = torch.einsum("ij,njhw->nihw", self.luma[0], x[to_gray])
+        return x
+
+    def _dropout(self, x, n, max_holes=4):
+        """
+        CoarseDropout (p=0.35): 1-4 holes of 10-25% or 20-35% of the side, filled with 0.
+        The hole mask is the product of per-hole row and column indicators, one bmm per batch.
+        """
+        active = self._chance(0.35, n)
+        large = self._chance(0.5, n).view(n, 1)
+        num_holes = torch.randint(1, max_holes + 1, (n,), generator=self.generator)
+        hole_used = (torch.arange(max_holes).view(1, -1) < num_holes.view(n, 1)) & active.view(n, 1)
+
+        low = torch.where(large, torch.tensor(0.2), torch.tensor(0.1))
+        high = torch.where(large, torch.tensor(0.35), torch.tensor(0.25))
+        h = (low + (high - low) * torch.rand((n, max_holes), generator=self.generator)) * self.size
+        w = (low + (high - low) * torch.rand((n, max_holes), generator=self.generator)) * self.size
+        top = torch.rand((n, max_holes), generator=self.generator) * (self.size - h)
+        left = torch.rand((n, max_holes), generator=self.generator) * (self.size - w)
+
+        pixels = torch.arange(self.size, dtype=torch.float32).view(1, 1, -1)
+        rows = ((pixels >= top[..., None]) & (pixels < (top + h)[..., None]) & hole_used[..., None]).float()
+        cols = ((pixels >= left[..., None]) & (pixels < (left + w)[..., None])).float()
+        holes = rows.transpose(1, 2) @ cols # [n, size, size], > 0 inside any hole
+        return x.mul_((holes == 0).unsqueeze(1))
+
+def benchmark(batch_size=64, num_batches=5, size=IMG_SIZE):
+    """Images/sec of BatchCardAugment vs strong_card_aug applied image by image."""
+    from card_recognition_nn import strong_card_aug
+    images = np.random.default_rng(0).integers(0, 256, size=(batch_size, size, size, 3), dtype=np.uint8)
+    batched = BatchCardAugment(size, seed=0)
+
+    strong_card_aug(image=images[0])
+    batched(images[:2])
+
+    start = time.perf_counter()
+    for _ in range(num_batches):
+        torch.stack([strong_card_aug(image=image)['image'] for image in images])
+    per_image_rate = batch_size * num_batches / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for _ in range(num_batches):
+        batched(images)
+    batched_rate = batch_size * num_batches / (time.perf_counter() - start)
+    print(f"strong_card_aug:      {per_image_rate:.0f} images/sec")
+    print(f"Batched augmentation: {batched_rate:.0f} images/sec (batch {batch_size}, {torch.get_num_threads()} threads)")
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,162 @@
+import functools
+import glob
+import json
+import multiprocessing
+import os
+import re
+import time
+
+import numpy as np
+import cv2
+
+from yt_frame_extractor import FRAME_INTERVAL_SECONDS, VIDEO_INFO_FILE, ignore_window
+
+# --- Constants ---
+FRAMES_DIR = "scraped_frames"         # Output of yt_frame_extractor.py: <video_id>_<title>/frame_NNNN.png
+CROPS_DIR = "card_crops"              # Rectified crops: <video_id>_<timestamp>_<n>.png
+VIDEO_ID_LENGTH = 11                  # YouTube ids are 11 characters and may contain '_'
+CROP_SIZE = 224                       # IMG_SIZE of card_recognition_nn.py; cards are stretched to a square like the training scans
+DETECT_WIDTH = 640                    # Frames are searched for cards at this width
+MIN_CARD_AREA = 0.01                  # Card area as a fraction of the frame
+MAX_CARD_AREA = 0.9
+CARD_ASPECT = 88 / 63                 # Long side / short side of a card
+ASPECT_TOLERANCE = 0.3                # Allowed deviation of the measured aspect, for perspective
+MIN_RECT_FILL = 0.85                  # Contour area / min-area-rect area for contours that are not clean quads
+CHUNK_SIZE = 32                       # Frames per worker task
+
+def order_corners(quad):
+    """Corners [4, 2] ordered top-left, top-right, bottom-right, bottom-left with the short side on top."""
+    center = quad.mean(axis=0)
+    # Clockwise in image coordinates (y down), starting from the corner closest to the top-left
+    quad = quad[np.argsort(np.arctan2(quad[:, 1] - center[1], quad[:, 0] - center[0]))]
+    quad = np.roll(quad, -int(np.argmin(quad.sum(axis=1))), axis=0)
+    if np.linalg.norm(quad[1] - quad[0]) > np.linalg.norm(quad[2] - quad[1]):
+        quad = np.roll(quad, 1, axis=0)
+    return quad
+
+def _card_quad(contour, frame_area):
+    area = cv2.contourArea(contour)
+    if not MIN_CARD_AREA * frame_area <= area <= MAX_CARD_AREA * frame_area:
+        return None
+    hull = cv2.convexHull(contour)
+    quad = cv2.approxPolyDP(hull, 0.02 * cv2.arcLength(hull, True), True).reshape(-1, 2)
+    if len(quad) != 4:
+        # Rounded corners, sleeves and fingers break the polygon; accept a box the contour fills
+        (cx, cy), (w, h), angle = rect = cv2.minAreaRect(contour)
+        if area < MIN_RECT_FILL * w * h:
+            return None
+        quad = cv2.boxPoints(rect)
+    quad = order_corners(quad.astype(np.float32))
+    short_side = (np.linalg.norm(quad[1] - quad[0]) + np.linalg.norm(quad[2] - quad[3])) / 2
+    long_side = (np.linalg.norm(quad[2] - quad[1]) + np.linalg.norm(quad[3] - quad[0])) / 2
+    if abs(long_side / max(short_side, 1e-6) - CARD_ASPECT) > ASPECT_TOLERANCE:
+        return None
+    return quad
+
+def find_card_quads(frame, detect_width=DETECT_WIDTH):
+    """
+    Corners [4, 2] (order_corners order, frame coordinates) of every card-shaped
+    quadrilateral in an RGB or BGR frame. The frame is searched at `detect_width`:
+    Canny edges closed into outlines, external contours, then a polygon or box fit
+    filtered by area and card aspect ratio.
+    """
+    scale = min(1.0, detect_width / frame.shape[1])
+    small = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA) if scale < 1 else frame
+    gray = cv2.cvtColor(small, cv2.COLOR_RGB2GRAY) if small.ndim == 3 else small
+    gray = cv2.GaussianBlur(gray, (5, 5), 0)
+    median = float(np.median(gray))
+    edges = cv2.Canny(gray, 0.66 * median, 1.33 * median)
+    edges = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_RECT, (5, 5)))
+    contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    frame_area = gray.shape[0] * gray.shape[1]
+    quads = [_card_quad(contour, frame_area) for contour in contours]
+    return [quad / scale for quad in quads if quad is not None]
+
+def rectify(frame, quad, size=CROP_SIZE):
+    """Perspective-warps the card inside `quad` to a size x size crop."""
+    target = np.array([[0, 0], [size - 1, 0], [size - 1, size - 1], [0, size - 1]], dtype=np.float32)
+    return cv2.warpPerspective(frame, cv2.getPerspectiveTransform(quad.astype(np.float32), target), (size, size),
+                               flags=cv2.INTER_AREA)
+
+def crop_cards(frame):
+    """Rectified CROP_SIZE x CROP_SIZE crops of every card found in the frame (a VideoCardPipeline detector)."""
+    return [rectify(frame, quad) for quad in find_card_quads(frame)]
+
+@functools.lru_cache(maxsize=None)
+def video_timing(video_dir):
+    """
+    (ignore_start, frame_interval) of a yt_frame_extractor folder, from its VIDEO_INFO_FILE.
+    Older folders have none: the video duration is then estimated from the frame count,
+    assuming a short if that estimate is under a minute, and ignore_window applied to it.
+    """
+    info_path = os.path.join(video_dir, VIDEO_INFO_FILE)
+    if os.path.exists(info_path):
+        with open(info_path) as f:
+            info = json.load(f)
+        return info["ignore_start"], info["frame_interval"]
+    num_frames = len(glob.glob(os.path.join(video_dir, "*.png")))
+    short_start, short_end = ignore_window(0)
+    ignore_start, _ = ignore_window(num_frames * FRAME_INTERVAL_SECONDS + short_start + short_end)
+    print(f"Warning: no {VIDEO_INFO_FILE} in {video_dir}; assuming the first {ignore_start}s were skipped")
+    return ignore_start, FRAME_INTERVAL_SECONDS
+
+def frame_source(frame_path, frames_dir=FRAMES_DIR):
+    """
+    (video_id, timestamp) of a yt_frame_extractor frame, with the timestamp in seconds from
+    the start of the video (like stream_frames): frame_0001.png is taken right after the
+    skipped intro.
+    """
+    video_dir = os.path.relpath(frame_path, frames_dir).split(os.sep)[0]
+    ignore_start, interval = video_timing(os.path.join(frames_dir, video_dir))
+    frame_number = int(re.search(r"(\d+)\.\w+$", frame_path).group(1))
+    return video_dir[:VIDEO_ID_LENGTH], ignore_start + (frame_number - 1) * interval
+
+def crop_name(video_id, timestamp, index):
+    return f"{video_id}_{timestamp:g}_{index}.png"
+
+def process_frames(task):
+    """Worker: detects and writes the crops of a chunk of frames; returns (frames, crops, CPU seconds)."""
+    paths, frames_dir, crops_dir = task
+    start = time.process_time()
+    num_crops = 0
+    for path in paths:
+        frame = cv2.imread(path)
+        if frame is None:
+            continue
+        video_id, timestamp = frame_source(path, frames_dir)
+        for index, crop in enumerate(crop_cards(frame)):
+            cv2.imwrite(os.path.join(crops_dir, crop_name(video_id, timestamp, index)), crop)
+            num_crops += 1
+    return len(paths), num_crops, time.process_time() - start
+
+def detect_directory(frames_dir=FRAMES_DIR, crops_dir=CROPS_DIR, processes=None, chunk_size=CHUNK_SIZE):
+    """
+    Crops every card in every frame under frames_dir into crops_dir, with frames split
+    into chunks of `chunk_size` across `processes` workers (default: one per CPU).
+    Reports wall-clock throughput and frames/sec per core (frames per worker CPU second).
+    """
+    os.makedirs(crops_dir, exist_ok=True)
+    paths = sorted(glob.glob(os.path.join(frames_dir, "*", "*.png")))
+    tasks = [(paths[i:i + chunk_size], frames_dir, crops_dir) for i in range(0, len(paths), chunk_size)]
+    processes = processes or os.cpu_count() or 1
+    print(f"Detecting cards in {len(paths)} frames with {processes} process(es)...")
+
+    start = time.time()
+    num_frames = num_crops = 0
+    cpu_seconds = 0.0
+    with multiprocessing.Pool(processes) as pool:
+        for frames, crops, seconds in pool.imap_unordered(process_frames, tasks):
+            num_frames += frames
+            num_crops += crops
+            cpu_seconds += seconds
+    wall_seconds = time.time() - start
+
+    print(f"{num_crops} card crops from {num_frames} frames in {wall_seconds:.1f}s: "
+          f"{num_frames / max(wall_seconds, 1e-9):.1f} frames/s, {num_frames / max(cpu_seconds, 1e-9):.1f} frames/s per core")
+    return num_frames, num_crops
+
+def main():
+    detect_directory()
+
+if __name__ == "__main__":
+    main()
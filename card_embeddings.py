@@ -0,0 +1,289 @@
+import os
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+import torch.optim as optim
+from torch.utils.data import DataLoader
+from tqdm import tqdm
+
+from card_batch_aug import BatchCardAugment, IMAGENET_MEAN, IMAGENET_STD
+from hard_negative_mining import HardNegativeMiner, HardNegativeBatchSampler
+from card_recognition_nn import (IMG_SIZE, AugmentedMTGCardDataset, CachedImages, MagicCardNet,
+                                 create_source_aware_splits, load_all_labels_json)
+
+# --- Constants ---
+DATASET_DIR = "mtg_datasets"        # Clean Scryfall scans from MTGDatasetBuilder (card_extraction.py)
+INDEX_DIR = "card_index"            # Persisted prototype index: embeddings.npy + labels.json
+MODEL_PATH = "./magic_card_models/embedding_model.pth"
+EMBEDDING_DIM = 256
+ARCFACE_SCALE = 30.0
+ARCFACE_MARGIN = 0.3                # Additive angular margin, radians
+TOP_K = 5
+
+# --- Model ---
+class CardEmbeddingNet(nn.Module):
+    """
+    MagicCardNet's convolutional features followed by a projection to an L2-normalized
+    embedding. Cards are recognized by nearest prototype instead of a class layer, so
+    adding a set only needs its clean scans embedded into the index.
+    """
+    def __init__(self, channels=[64, 128, 256, 512], pool_size=(4, 4), embedding_dim=EMBEDDING_DIM, dropout=0.3):
+        super().__init__()
+        backbone = MagicCardNet(num_classes=1, channels=channels, pool_size=pool_size, dropout=dropout)
+        self.features = backbone.features
+        self.adaptive_pool = backbone.adaptive_pool
+        pool_features = channels[-1] * pool_size[0] * pool_size[1]
+        self.embedding = nn.Sequential(
+            nn.Dropout(dropout),
+            nn.Linear(pool_features, embedding_dim),
+            nn.BatchNorm1d(embedding_dim)
+        )
+
+    @classmethod
+    def from_classifier(cls, classifier, channels, pool_size, embedding_dim=EMBEDDING_DIM, dropout=0.3):
+        """Starts from the features of a trained MagicCardNet (e.g. a grid search checkpoint)."""
+        model = cls(channels, pool_size, embedding_dim, dropout)
+        model.features.load_state_dict(classifier.features.state_dict())
+        return model
+
+    def forward(self, x):
+        for block in self.features:
+            x = block(x)
+        x = self.adaptive_pool(x)
+        x = torch.flatten(x, 1)
+        return F.normalize(self.embedding(x), dim=1)
+
+class ArcFaceHead(nn.Module):
+    """
+    Additive angular margin softmax (ArcFace): logits are s * cos(theta + m) for the true
+    class and s * cos(theta) otherwise, with theta the angle between the embedding and the
+    class weight. Only used for training; inference compares embeddings directly.
+    """
+    def __init__(self, embedding_dim, num_classes, scale=ARCFACE_SCALE, margin=ARCFACE_MARGIN):
+        super().__init__()
+        self.weight = nn.Parameter(torch.empty(num_classes, embedding_dim))
+        nn.init.xavier_uniform_(self.weight)
+        self.scale = scale
+        self.margin = margin
+
+    def forward(self, embeddings, labels):
+        cosine = F.linear(embeddings, F.normalize(self.weight, dim=1)).clamp(-1 + 1e-7, 1 - 1e-7)
+        target = torch.cos(torch.acos(cosine.gather(1, labels.view(-1, 1))) + self.margin)
+        return self.scale * cosine.scatter(1, labels.view(-1, 1), target)
+
+def train_embedding_epoch(model, head, loader, optimizer, device, batch_aug=None):
+    model.train()
+    head.train()
+    total_loss = 0
+    pbar = tqdm(loader, desc="Training", leave=False)
+    for data, target in pbar:
+        if batch_aug is not None:
+            data = batch_aug(data)
+        data, target = data.to(device), target.to(device)
+        optimizer.zero_grad()
+        loss = F.cross_entropy(head(model(data), target), target)
+        loss.backward()
+        optimizer.step()
+        total_loss += loss.item()
+        pbar.set_postfix({'Loss': f'{loss.item():.4f}'})
+    return total_loss / len(loader)
+
+def embed_images(model, images, device, batch_size=64):
+    """Embeds uint8 images [N, IMG_SIZE, IMG_SIZE, 3] (e.g. CachedImages) with the val_aug normalization."""
+    mean = torch.tensor(IMAGENET_MEAN).view(1, 3, 1, 1)
+    std = torch.tensor(IMAGENET_STD).view(1, 3, 1, 1)
+    model.eval()
+    embeddings = np.empty((len(images), model.embedding[1].out_features), dtype=np.float32)
+    with torch.no_grad():
+        for i in range(0, len(images), batch_size):
+            batch = torch.from_numpy(np.asarray(images[i:i + batch_size])).permute(0, 3, 1, 2).contiguous().float().div_(255)
+            batch = ((batch - mean) / std).to(device)
+            embeddings[i:i + batch_size] = model(batch).cpu().numpy()
+    return embeddings
+
+# --- Prototype index ---
+class PrototypeIndex:
+    """
+    L2-normalized prototype embeddings [N, D] with one labels row per prototype
+    (unique_id, name, set, filename). Top-k search is one matrix product and an
+    argpartition, which takes milliseconds for ~30k prototypes on CPU.
+    """
+    LABEL_COLUMNS = ["unique_id", "name", "set", "filename"]
+
+    def __init__(self, embedding_dim=EMBEDDING_DIM):
+        self.embeddings = np.empty((0, embedding_dim), dtype=np.float32)
+        self.labels = pd.DataFrame(columns=self.LABEL_COLUMNS)
+
+    def __len__(self):
+        return len(self.embeddings)
+
+    def add(self, embeddings, labels):
+        """Adds prototypes; existing prototypes of the same unique_ids are replaced."""
+        keep = ~self.labels["unique_id"].isin(labels["unique_id"]).to_numpy()
+        self.embeddings = np.concatenate([self.embeddings[keep], np.asarray(embeddings, dtype=np.float32)])
+        self.labels = pd.concat([self.labels[keep], labels[self.LABEL_COLUMNS]], ignore_index=True)
+
+    def remove_sets(self, sets):
+        keep = ~self.labels["set"].isin(sets).to_numpy()
+        self.embeddings = self.embeddings[keep]
+        self.labels = self.labels[keep].reset_index(drop=True)
+
+    def search(self, queries, k=TOP_K):
+        """Returns (scores, indices), both [Q, k], by descending cosine similarity."""
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.embeddings.shape[1])
+        k = min(k, len(self))
+        scores = queries @ self.embeddings.T
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        return np.take_along_axis(top_scores, order, axis=1), np.take_along_axis(top, order, axis=1)
+
+    def save(self, index_dir=INDEX_DIR):
+        os.makedirs(index_dir, exist_ok=True)
+        np.save(os.path.join(index_dir, "embeddings.npy"), self.embeddings)
+        with open(os.path.join(index_dir, "labels.json"), "w", encoding="utf-8") as f:
+            json.dump(self.labels.to_dict(orient="records"), f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, index_dir=INDEX_DIR):
+        embeddings = np.load(os.path.join(index_dir, "embeddings.npy"))
+        index = cls(embeddings.shape[1])
+        with open(os.path.join(index_dir, "labels.json"), "r", encoding="utf-8") as f:
+            index.labels = pd.DataFrame(json.load(f), columns=cls.LABEL_COLUMNS)
+        index.embeddings = embeddings
+        return index
+
+def build_prototype_index(model, device, dataset_dir=DATASET_DIR, index_dir=INDEX_DIR, sets=None, batch_size=64):
+    """
+    Offline job: embeds the clean scans of `dataset_dir` (only `sets`, if given) and merges
+    them into the index at `index_dir`, creating it if needed. Adding a new set is just
+    this call with sets=[set_name]; the model is not retrained.
+    """
+    df = load_all_labels_json(dataset_dir)
+    if sets is not None:
+        df = df[df["set"].isin(sets)]
+    df = df.reset_index(drop=True)
+    if len(df) == 0:
+        print("No images to index.")
+        return None
+    embedding_dim = model.embedding[1].out_features
+    index = PrototypeIndex.load(index_dir) if os.path.exists(os.path.join(index_dir, "embeddings.npy")) else PrototypeIndex(embedding_dim)
+    start = time.time()
+    index.add(embed_images(model, CachedImages(df), device, batch_size), df)
+    index.save(index_dir)
+    print(f"Indexed {len(df)} images in {time.time() - start:.1f}s; index holds {len(index)} prototypes")
+    return index
+
+# --- Inference ---
+class CardRecognizer:
+    """Nearest-prototype recognition of uint8 card crops [N, IMG_SIZE, IMG_SIZE, 3]."""
+    def __init__(self, model, index, device=None):
+        self.device = device or torch.device('cpu')
+        self.model = model.to(self.device).eval()
+        self.index = index
+
+    @classmethod
+    def load(cls, model_path=MODEL_PATH, index_dir=INDEX_DIR, device=None):
+        checkpoint = torch.load(model_path, map_location="cpu")
+        model = CardEmbeddingNet(**checkpoint['config'])
+        model.load_state_dict(checkpoint['model_state_dict'])
+        return cls(model, PrototypeIndex.load(index_dir), device)
+
+    def recognize(self, images, k=TOP_K):
+        """Top-k matches per image as lists of dicts with unique_id, name, set and score."""
+        scores, indices = self.index.search(embed_images(self.model, images, self.device), k)
+        labels = self.index.labels
+        return [[{**labels.iloc[j][["unique_id", "name", "set"]].to_dict(), "score": float(s)} for s, j in zip(row_scores, row)]
+                for row_scores, row in zip(scores, indices)]
+
+def train_embedding_model(train_df, class_to_idx, config, num_epochs=20, batch_size=32, augmentations_per_sample=50,
+                          save_path=MODEL_PATH, hard_negative_every=0):
+    """With hard_negative_every > 0, batches over-sample confusable cards re-mined every that many epochs."""
+    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    train_dataset = AugmentedMTGCardDataset(train_df, class_to_idx, transform=None, augmentations_per_sample=augmentations_per_sample)
+    miner = None
+    if hard_negative_every > 0:
+        miner = HardNegativeMiner(train_dataset.images, train_dataset.labels, train_dataset.original_df['name'],
+                                  refresh_every=hard_negative_every)
+        train_loader = DataLoader(train_dataset, batch_sampler=HardNegativeBatchSampler(miner, batch_size, augmentations_per_sample), num_workers=0)
+    else:
+        train_loader = DataLoader(train_dataset, batch_size=batch_size, shuffle=True, num_workers=0)
+    batch_aug = BatchCardAugment(IMG_SIZE)
+    model = CardEmbeddingNet(**config).to(device)
+    head = ArcFaceHead(config['embedding_dim'], len(class_to_idx)).to(device)
+    optimizer = optim.Adam(list(model.parameters()) + list(head.parameters()), lr=0.001)
+    for epoch in range(num_epochs):
+        if miner is not None:
+            model.eval() # Mining embeds in eval mode; the training epoch switches back
+            miner.refresh(model, device, epoch)
+        loss = train_embedding_epoch(model, head, train_loader, optimizer, device, batch_aug)
+        print(f"Epoch {epoch + 1}/{num_epochs}: ArcFace loss {loss:.4f}")
+    Path(save_path).parent.mkdir(exist_ok=True)
+    torch.save({'model_state_dict': model.state_dict(), 'config': config}, save_path)
+    return model
+
+def evaluate_recognition(model, index, df, device, augmentations=5):
+    """Top-1 / top-k accuracy of augmented views of `df`'s clean scans against the index."""
+    images = CachedImages(df)
+    batch_aug = BatchCardAugment(IMG_SIZE, seed=0)
+    expected = df["unique_id"].to_numpy()
+    model.eval()
+    top1 = topk = 0
+    with torch.no_grad():
+        for _ in range(augmentations):
+            embeddings = []
+            for i in range(0, len(df), 64):
+                embeddings.append(model(batch_aug(np.asarray(images[i:i + 64])).to(device)).cpu().numpy())
+            _, indices = index.search(np.concatenate(embeddings), TOP_K)
+            found = index.labels["unique_id"].to_numpy()[indices]
+            top1 += int((found[:, 0] == expected).sum())
+            topk += int((found == expected[:, None]).any(axis=1).sum())
+    total = len(df) * augmentations
+    print(f"Recognition: top-1 {100. * top1 / total:.2f}%, top-{TOP_K} {100. * topk / total:.2f}% over {total} augmented views")
+    return top1 / total, topk / total
+
+def benchmark_search(num_prototypes=30000, embedding_dim=EMBEDDING_DIM, num_queries=100, k=TOP_K):
+    """Milliseconds per top-k lookup against an index of ~30k printings."""
+    rng = np.random.default_rng(0)
+    index = PrototypeIndex(embedding_dim)
+    embeddings = rng.standard_normal((num_prototypes, embedding_dim)).astype(np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    labels = pd.DataFrame({"unique_id": [f"set_{i}" for i in range(num_prototypes)], "name": "", "set": "", "filename": ""})
+    index.add(embeddings, labels)
+    start = time.perf_counter()
+    for i in range(num_queries):
+        index.search(embeddings[i], k)
+    print(f"Top-{k} search over {num_prototypes} prototypes: {1000 * (time.perf_counter() - start) / num_queries:.2f} ms per query")
+
+def main():
+    """
+    Trains the embedding model with ArcFace on the training printings, indexes every clean
+    scan, and measures recognition of augmented views, including printings never trained on.
+    """
+    data_source = load_all_labels_json(DATASET_DIR)
+    if len(data_source) == 0:
+        print("No data found. Exiting.")
+        return
+    train_df, val_df, test_df = create_source_aware_splits(data_source, source_col='unique_id')
+    unseen_df = pd.concat([val_df, test_df])
+    class_to_idx = {uid: i for i, uid in enumerate(sorted(train_df['unique_id'].unique()))}
+    config = {'channels': [64, 128, 256, 512], 'pool_size': (4, 4), 'embedding_dim': EMBEDDING_DIM, 'dropout': 0.3}
+
+    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    model = train_embedding_model(train_df, class_to_idx, config, hard_negative_every=3)
+    index = build_prototype_index(model, device)
+    print("Seen printings:")
+    evaluate_recognition(model, index, train_df.reset_index(drop=True), device)
+    if len(unseen_df):
+        print("Unseen printings (embedded only, never trained on):")
+        evaluate_recognition(model, index, unseen_df.reset_index(drop=True), device)
+    benchmark_search()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import copy
+import glob
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import torch
+import torch.nn as nn
+import torch.ao.quantization as quantization
+
+from card_batch_aug import IMAGENET_MEAN, IMAGENET_STD
+from card_recognition_nn import CachedImages, MagicCardNet, create_source_aware_splits, load_all_labels_json
+
+# --- Constants ---
+DATASET_DIR = "mtg_datasets"
+MODELS_DIR = "./magic_card_models"          # save_model output of grid_search_training
+QUANTIZATION_ENGINE = "x86"                 # Falls back to fbgemm / qnnpack where unavailable
+CALIBRATION_IMAGES = 256                    # Training images used to calibrate activation ranges
+BENCHMARK_BATCH_SIZES = (1, 8, 64)
+BENCHMARK_REPEATS = 5
+
+def load_checkpoint(model_path):
+    """Rebuilds a MagicCardNet from a save_model checkpoint; returns (model, checkpoint)."""
+    checkpoint = torch.load(model_path, map_location="cpu")
+    state = checkpoint['model_state_dict']
+    last_linear = [key for key in state if key.startswith("classifier.") and key.endswith(".weight")][-1]
+    config = checkpoint['config']
+    model = MagicCardNet(state[last_linear].shape[0], config['channels'], config['pool_size'], config['dropout'])
+    model.load_state_dict(state)
+    return model.eval(), checkpoint
+
+def fuse_conv_bn(model):
+    """Copy of the model in eval mode with every Conv+BatchNorm+ReLU folded into one conv."""
+    fused = copy.deepcopy(model).eval()
+    for block in fused.features:
+        quantization.fuse_modules(block, [['0', '1', '2'], ['3', '4', '5']], inplace=True)
+    return fused
+
+class QuantizedCardNet(nn.Module):
+    """Eager-mode int8 wrapper: quantizes the input, runs the fused network, dequantizes the logits."""
+    def __init__(self, model):
+        super().__init__()
+        self.quant = quantization.QuantStub()
+        self.model = model
+        self.dequant = quantization.DeQuantStub()
+
+    def forward(self, x):
+        return self.dequant(self.model(self.quant(x)))
+
+def _set_engine():
+    engines = torch.backends.quantized.supported_engines
+    engine = next(e for e in (QUANTIZATION_ENGINE, "fbgemm", "qnnpack") if e in engines)
+    torch.backends.quantized.engine = engine
+    return engine
+
+def quantize_static(model, calibration_images, batch_size=32):
+    """
+    Static int8: fuses Conv+BN+ReLU, observes activation ranges on `calibration_images`
+    (uint8 [N, H, W, 3]) and converts convolutions and linears to int8 kernels.
+    """
+    engine = _set_engine()
+    quantized = QuantizedCardNet(fuse_conv_bn(model))
+    quantized.qconfig = quantization.get_default_qconfig(engine)
+    quantization.prepare(quantized, inplace=True)
+    predict(quantized, calibration_images, batch_size)
+    quantization.convert(quantized, inplace=True)
+    return quantized.eval()
+
+def quantize_dynamic(model):
+    """Dynamic int8: fused float convolutions, int8 linears with activations quantized on the fly."""
+    _set_engine()
+    return quantization.quantize_dynamic(fuse_conv_bn(model), {nn.Linear}, dtype=torch.qint8)
+
+def to_channels_last(model):
+    return model.to(memory_format=torch.channels_last)
+
+def predict(model, images, batch_size=64):
+    """Logits [N, num_classes] for uint8 images [N, H, W, 3], fed to the model as channels-last batches."""
+    mean = torch.tensor(IMAGENET_MEAN).view(1, 3, 1, 1)
+    std = torch.tensor(IMAGENET_STD).view(1, 3, 1, 1)
+    logits = []
+    with torch.inference_mode():
+        for i in range(0, len(images), batch_size):
+            # The NHWC uint8 batch permuted to NCHW already has channels-last strides
+            batch = torch.from_numpy(np.asarray(images[i:i + batch_size])).permute(0, 3, 1, 2).float().div_(255)
+            batch = ((batch - mean) / std).contiguous(memory_format=torch.channels_last)
+            logits.append(model(batch))
+    return torch.cat(logits)
+
+def benchmark_latency(model, batch_sizes=BENCHMARK_BATCH_SIZES, repeats=BENCHMARK_REPEATS, size=224):
+    """(batch_size, ms per batch, images/sec) per batch size, after one warm-up batch."""
+    rows = []
+    images = np.random.default_rng(0).integers(0, 256, size=(max(batch_sizes), size, size, 3), dtype=np.uint8)
+    for batch_size in batch_sizes:
+        predict(model, images[:batch_size], batch_size)
+        start = time.perf_counter()
+        for _ in range(repeats):
+            predict(model, images[:batch_size], batch_size)
+        seconds = (time.perf_counter() - start) / repeats
+        rows.append((batch_size, 1000 * seconds, batch_size / seconds))
+    return rows
+
+def compare_variants(model, val_images, val_labels, calibration_images, batch_sizes=BENCHMARK_BATCH_SIZES):
+    """
+    Benchmarks the float model against its fused, dynamic int8 and static int8 versions
+    (all channels-last): latency and throughput per batch size, validation accuracy and
+    top-1 agreement with the float model.
+    """
+    variants = {
+        "float": to_channels_last(copy.deepcopy(model).eval()),
+        "fused": to_channels_last(fuse_conv_bn(model)),
+        "dynamic int8": to_channels_last(quantize_dynamic(model)),
+        "static int8": to_channels_last(quantize_static(model, calibration_images)),
+    }
+    reference = predict(variants["float"], val_images).argmax(dim=1)
+    rows = []
+    for name, variant in variants.items():
+        predictions = predict(variant, val_images).argmax(dim=1)
+        accuracy = 100. * (predictions == torch.as_tensor(val_labels)).float().mean().item()
+        agreement = 100. * (predictions == reference).float().mean().item()
+        for batch_size, ms, throughput in benchmark_latency(variant, batch_sizes):
+            rows.append({"variant": name, "batch_size": batch_size, "latency_ms": ms, "images_per_sec": throughput,
+                         "val_acc": accuracy, "agreement": agreement})
+    results = pd.DataFrame(rows)
+    print(results.to_string(index=False, float_format=lambda v: f"{v:.2f}"))
+    return results
+
+def main():
+    """
+    Loads the best grid search model and compares its float and quantized CPU inference
+    on the validation split, using the same splits and class mapping as training.
+    """
+    # The newest _BEST checkpoint is the winner of the latest grid search
+    checkpoints = sorted(glob.glob(f"{MODELS_DIR}/*_BEST.pth"), key=os.path.getmtime)
+    if not checkpoints:
+        print(f"No *_BEST.pth checkpoint in {MODELS_DIR}. Exiting.")
+        return
+    model, checkpoint = load_checkpoint(checkpoints[-1])
+    print(f"Loaded {checkpoints[-1]} (val acc {checkpoint['metrics']['val_acc']:.2f}%)")
+
+    data_source = load_all_labels_json(DATASET_DIR)
+    train_df, val_df, _ = create_source_aware_splits(data_source, source_col='unique_id')
+    all_ids = pd.concat([train_df, val_df])['unique_id'].unique()
+    class_to_idx = {uid: i for i, uid in enumerate(sorted(all_ids))}
+
+    val_df = val_df.reset_index(drop=True)
+    val_labels = np.array([class_to_idx[uid] for uid in val_df['unique_id']], dtype=np.int64)
+    calibration_df = train_df.sample(min(CALIBRATION_IMAGES, len(train_df)), random_state=0).reset_index(drop=True)
+    compare_variants(model, CachedImages(val_df), val_labels, CachedImages(calibration_df))
+
+if __name__ == "__main__":
+    main()
@@ -4,7 +4,6 @@ import torch.nn.functional as F
 import torch.optim as optim
 from torch.utils.data import DataLoader
 from sklearn.model_selection import ParameterGrid, train_test_split
-import wandb
 from tqdm import tqdm
 import json
 import time
@@ -17,15 +16,18 @@ from albumentations.pytorch import ToTensorV2
 import os
 import cv2
 import glob
+import hashlib
+import copy
+import multiprocessing
+from card_batch_aug import BatchCardAugment
+from hard_negative_mining import HardNegativeMiner, HardNegativeBatchSampler
 
-# Set your W&B API key directly
-os.environ["WANDB_API_KEY"] = "170694f36aeba75ee06ea0efea1e2d12a584d276"  # Replace with your actual key
-# Optional: Set other W&B environment variables
-os.environ["WANDB_MODE"] = "online"  # or "offline" if you want to run without internet
-#os.environ["WANDB_MODE"] = "disabled"
-wandb.init(project="Projekt Projektor")
-print("W&B setup successful!")
-wandb.finish()
+# W&B is optional: without it (or with use_wandb=False) trials only log to stdout.
+# Credentials come from `wandb login` or the WANDB_API_KEY environment variable.
+try:
+    import wandb
+except ImportError:
+    wandb = None
 
 def load_all_labels_json(root_dir):
     """
@@ -136,67 +138,108 @@ def create_source_aware_splits(df, source_col='unique_id', train_size=0.7, val_s
     
     return train_df, val_df, test_df
 
+IMG_SIZE = 224
+
+# --- Decoded image cache ---
+IMAGE_CACHE_DIR = "./image_cache"
+
+def build_image_cache(image_paths, cache_dir=IMAGE_CACHE_DIR, size=IMG_SIZE):
+    """
+    Decode, convert to RGB and resize every image once into a uint8 [N, size, size, 3]
+    array on disk. The file name is a hash of the paths, their modification times and
+    the size, so an unchanged dataset reuses the existing cache. Returns (path, shape).
+    """
+    image_paths = [str(p) for p in image_paths]
+    key = hashlib.sha1()
+    for image_path in image_paths:
+        if not os.path.exists(image_path):
+            raise FileNotFoundError(f"Image not found: {image_path}")
+        key.update(f"{image_path}|{os.path.getmtime(image_path)}\n".encode())
+    key.update(str(size).encode())
+    os.makedirs(cache_dir, exist_ok=True)
+    cache_path = os.path.join(cache_dir, f"images_{key.hexdigest()[:16]}_{size}.npy")
+    shape = (len(image_paths), size, size, 3)
+
+    if not os.path.exists(cache_path):
+        print(f"Decoding {len(image_paths)} images into {cache_path}")
+        images = np.lib.format.open_memmap(cache_path + ".tmp", mode="w+", dtype=np.uint8, shape=shape)
+        for i, image_path in enumerate(tqdm(image_paths, desc="Caching images", leave=False)):
+            image = np.array(Image.open(image_path).convert('RGB'))
+            # Same interpolation as A.Resize, so the first Resize of the pipelines becomes a no-op.
+            images[i] = cv2.resize(image, (size, size), interpolation=cv2.INTER_LINEAR)
+        images.flush()
+        del images
+        os.replace(cache_path + ".tmp", cache_path)
+    return cache_path, shape
+
+class CachedImages:
+    """
+    Read-only view of an image cache. The memory map is opened lazily in each DataLoader
+    worker (it is dropped when the dataset is pickled), so workers share the page cache
+    and read zero-copy slices instead of copying the array.
+    """
+    def __init__(self, dataframe, cache_dir=IMAGE_CACHE_DIR, size=IMG_SIZE):
+        self.cache_path, self.shape = build_image_cache(dataframe['image_path'], cache_dir, size)
+        self._images = None
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, idx):
+        if self._images is None:
+            self._images = np.load(self.cache_path, mmap_mode="r")
+        return self._images[idx]
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_images'] = None
+        return state
+
 # --- Augmented Dataset ---
 class AugmentedMTGCardDataset(torch.utils.data.Dataset):
-    def __init__(self, dataframe, class_to_idx, transform=None, augmentations_per_sample=50):
+    def __init__(self, dataframe, class_to_idx, transform=None, augmentations_per_sample=50, cache_dir=IMAGE_CACHE_DIR):
         """
-        Dataset that creates multiple augmented versions of each original image
+        Dataset that creates multiple augmented versions of each original image.
+        Originals are decoded once into the image cache; only the augmentation runs per sample.
         """
         self.original_df = dataframe.reset_index(drop=True)
         self.transform = transform
         self.class_to_idx = class_to_idx
         self.augmentations_per_sample = augmentations_per_sample
-        
-        # Create expanded dataset indices
-        self.expanded_indices = []
-        for idx in range(len(self.original_df)):
-            for aug_idx in range(augmentations_per_sample):
-                self.expanded_indices.append((idx, aug_idx))
+        self.images = CachedImages(self.original_df, cache_dir, IMG_SIZE)
+        self.labels = np.array([class_to_idx[uid] for uid in self.original_df['unique_id']], dtype=np.int64)
     
     def __len__(self):
-        return len(self.expanded_indices)
+        return len(self.labels) * self.augmentations_per_sample
     
     def __getitem__(self, idx):
-        original_idx, aug_idx = self.expanded_indices[idx]
-        row = self.original_df.iloc[original_idx]
-        
-        if not os.path.exists(row['image_path']):
-            raise FileNotFoundError(f"Image not found: {row['image_path']}")
-        
-        # Load original image
-        image = Image.open(row['image_path']).convert('RGB')
-        image = np.array(image)
+        # Virtual sample idx is augmentation idx % augmentations_per_sample of its original
+        original_idx = idx // self.augmentations_per_sample
+        image = self.images[original_idx]
         
         # Apply augmentations (different each time due to randomness)
         if self.transform:
             image = self.transform(image=image)['image']
         
-        label = self.class_to_idx[row['unique_id']]
-        return image, label
+        return image, int(self.labels[original_idx])
 
 # --- Original Dataset (for validation) ---
 class MTGCardDataset(torch.utils.data.Dataset):
-    def __init__(self, dataframe, class_to_idx, transform=None):
+    def __init__(self, dataframe, class_to_idx, transform=None, cache_dir=IMAGE_CACHE_DIR):
         self.df = dataframe.reset_index(drop=True)
         self.transform = transform
         self.class_to_idx = class_to_idx
+        self.images = CachedImages(self.df, cache_dir, IMG_SIZE)
+        self.labels = np.array([class_to_idx[uid] for uid in self.df['unique_id']], dtype=np.int64)
 
     def __len__(self):
-        return len(self.df)
+        return len(self.labels)
 
     def __getitem__(self, idx):
-        row = self.df.iloc[idx]
-        if not os.path.exists(row['image_path']):
-            raise FileNotFoundError(f"Image not found: {row['image_path']}")
-        
-        image = Image.open(row['image_path']).convert('RGB')
-        label = self.class_to_idx[row['unique_id']]
-        image = np.array(image)
+        image = self.images[idx]
         if self.transform:
             image = self.transform(image=image)['image']
-        return image, label
-
-IMG_SIZE = 224
+        return image, int(self.labels[idx])
 
 # Fixed augmentation pipeline - ensures consistent output size
 strong_card_aug = A.Compose([
@@ -275,19 +318,26 @@ class MagicCardNet(nn.Module):
         )
     
     def forward(self, x):
+        return self.classifier[-1](self.embed(x))
+
+    def embed(self, x):
+        """Penultimate-layer features, used to find confusable classes for hard negative mining."""
         for block in self.features:
             x = block(x)
         x = self.adaptive_pool(x)
-        x = x.view(x.size(0), -1)
-        return self.classifier(x)
+        x = torch.flatten(x, 1)
+        return self.classifier[:-1](x)
 
-def train_epoch(model, loader, optimizer, criterion, device):
+def train_epoch(model, loader, optimizer, criterion, device, batch_aug=None):
+    """batch_aug, if given, augments each raw uint8 batch (e.g. BatchCardAugment) before it goes to the device."""
     model.train()
     total_loss = 0
     correct = 0
     total = 0
     pbar = tqdm(loader, desc="Training", leave=False)
     for batch_idx, (data, target) in enumerate(pbar):
+        if batch_aug is not None:
+            data = batch_aug(data)
         data, target = data.to(device), target.to(device)
         if batch_idx % 3 == 0:
             size = torch.randint(160, 320, (1,)).item()
@@ -340,169 +390,283 @@ def save_model(model, config, metrics, save_dir, is_best=False):
         'metrics': metrics,
         'model_params': count_parameters(model)
     }, local_path)
-    if wandb.run is not None:
+    if wandb is not None and wandb.run is not None:
         wandb.save(str(local_path))
         if is_best:
             wandb.run.summary["best_model_path"] = str(local_path)
     return local_path
 
-def grid_search_training(train_df, val_df, class_to_idx, param_grid, num_epochs=20, batch_size=32, 
-                        save_dir="./models", project_name="magic-card-grid-search", augmentations_per_sample=50):
-    
-    if len(train_df) == 0 or len(val_df) == 0:
-        print("ERROR: Empty training or validation set. Cannot proceed with training.")
-        return [], None
-    
-    save_dir = Path(save_dir)
-    save_dir.mkdir(exist_ok=True)
+# --- Trial pruning ---
+class MedianPruner:
+    """
+    Prunes a trial whose best validation accuracy so far is below the median of the other
+    trials at the same epoch. Nothing is pruned before `warmup_epochs` epochs, or while
+    fewer than `min_trials` other trials have reached that epoch. `store` maps
+    (trial, epoch) to the reported value and may be a Manager dict shared by workers.
+    """
+    def __init__(self, store, warmup_epochs=3, min_trials=3):
+        self.store = store
+        self.warmup_epochs = warmup_epochs
+        self.min_trials = min_trials
+
+    def should_prune(self, trial, epoch, value):
+        self.store[(trial, epoch)] = value
+        if epoch + 1 < self.warmup_epochs:
+            return False
+        others = [v for (t, e), v in self.store.items() if e == epoch and t != trial]
+        return len(others) >= self.min_trials and value < float(np.median(others))
+
+class SuccessiveHalvingPruner:
+    """
+    Asynchronous successive halving: at the rungs min_epochs * reduction_factor**k, a trial
+    continues only if its value is in the top 1/reduction_factor of all values reported
+    at that rung so far (the first trial at a rung always continues).
+    """
+    def __init__(self, store, min_epochs=2, reduction_factor=3):
+        self.store = store
+        self.min_epochs = min_epochs
+        self.reduction_factor = reduction_factor
+
+    def is_rung(self, epoch):
+        rung = self.min_epochs
+        while rung < epoch + 1:
+            rung *= self.reduction_factor
+        return rung == epoch + 1
+
+    def should_prune(self, trial, epoch, value):
+        self.store[(trial, epoch)] = value
+        if not self.is_rung(epoch):
+            return False
+        competing = sorted((v for (t, e), v in self.store.items() if e == epoch), reverse=True)
+        keep = max(1, len(competing) // self.reduction_factor)
+        return value < competing[keep - 1]
+
+def make_pruner(pruner, store):
+    if pruner is None:
+        return None
+    if pruner == "median":
+        return MedianPruner(store)
+    if pruner == "halving":
+        return SuccessiveHalvingPruner(store)
+    raise ValueError(f"Unknown pruner: {pruner}")
+
+# --- Hyperparameter search ---
+def init_wandb(use_wandb, project_name, config, name):
+    """Starts a W&B run if requested and installed. Runs are offline unless WANDB_MODE says otherwise."""
+    if not use_wandb or wandb is None:
+        return None
+    return wandb.init(project=project_name, config=config, name=name, reinit=True,
+                      mode=os.environ.get("WANDB_MODE", "offline"))
+
+def run_trial(task):
+    """
+    Trains one configuration, reporting the best validation accuracy to the pruner after
+    every epoch. Whenever it improves, the weights are deep-copied and checkpointed to
+    save_dir/trial_<idx>_best.pth, and those weights are the ones saved at the end.
+    """
+    (trial_idx, config, train_df, val_df, class_to_idx, num_epochs, batch_size, save_dir, project_name,
+     augmentations_per_sample, batch_augment, hard_negative_every, pruner, num_threads, use_wandb) = task
+    if num_threads:
+        torch.set_num_threads(num_threads)
     device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-    print(f"Using device: {device}")
-    
-    print(f"Training sources: {train_df['unique_id'].nunique()}")
-    print(f"Validation sources: {val_df['unique_id'].nunique()}")
-    print(f"With {augmentations_per_sample}x augmentation: {len(train_df) * augmentations_per_sample} training samples")
-    print(f"Number of classes: {len(class_to_idx)}")
-    
-    grid = list(ParameterGrid(param_grid))
-    results = []
-    best_val_acc = 0
-    best_model_path = None
-    print(f"Starting grid search with {len(grid)} configurations...")
-    
-    for config_idx, config in enumerate(grid):
-        print(f"\n{'='*60}")
-        print(f"Configuration {config_idx + 1}/{len(grid)}")
-        print(f"Config: {config}")
-        print(f"{'='*60}")
-        
-        run = wandb.init(
-            project=project_name,
-            config=config,
-            name=f"config_{config_idx+1}",
-            reinit=True
+    run = init_wandb(use_wandb, project_name, config, f"config_{trial_idx+1}")
+    print(f"Trial {trial_idx + 1}: {config}")
+
+    try:
+        # Use augmented dataset for training
+        train_dataset = AugmentedMTGCardDataset(
+            train_df, class_to_idx, transform=None if batch_augment else strong_card_aug,
+            augmentations_per_sample=augmentations_per_sample
         )
-        
-        try:
-            # Use augmented dataset for training
-            train_dataset = AugmentedMTGCardDataset(
-                train_df, class_to_idx, transform=strong_card_aug, 
-                augmentations_per_sample=augmentations_per_sample
-            )
-            # Use original dataset for validation
-            val_dataset = MTGCardDataset(val_df, class_to_idx, transform=val_aug)
-            
+        batch_aug = BatchCardAugment(IMG_SIZE) if batch_augment else None
+        # Use original dataset for validation
+        val_dataset = MTGCardDataset(val_df, class_to_idx, transform=val_aug)
+
+        miner = None
+        if hard_negative_every > 0:
+            miner = HardNegativeMiner(train_dataset.images, train_dataset.labels, train_dataset.original_df['name'],
+                                      refresh_every=hard_negative_every)
+            sampler = HardNegativeBatchSampler(miner, batch_size, augmentations_per_sample)
+            train_loader = DataLoader(train_dataset, batch_sampler=sampler, num_workers=0)
+        else:
             train_loader = DataLoader(train_dataset, batch_size=batch_size, shuffle=True, num_workers=0)
-            val_loader = DataLoader(val_dataset, batch_size=batch_size, shuffle=False, num_workers=0)
-            
-            model = MagicCardNet(
-                num_classes=len(class_to_idx),
-                channels=config['channels'],
-                pool_size=config['pool_size'],
-                dropout=config['dropout']
-            ).to(device)
-            
-            param_count = count_parameters(model)
-            print(f"Model parameters: {param_count:,}")
+        val_loader = DataLoader(val_dataset, batch_size=batch_size, shuffle=False, num_workers=0)
+
+        model = MagicCardNet(
+            num_classes=len(class_to_idx),
+            channels=config['channels'],
+            pool_size=config['pool_size'],
+            dropout=config['dropout']
+        ).to(device)
+
+        param_count = count_parameters(model)
+        if run is not None:
             wandb.log({"model_parameters": param_count})
-            
-            optimizer = optim.Adam(model.parameters(), lr=config['lr'])
-            criterion = nn.CrossEntropyLoss()
-            scheduler = optim.lr_scheduler.ReduceLROnPlateau(optimizer, patience=3, factor=0.5)
-            
-            best_val_acc_this_config = 0
-            best_model_state = None
-            
-            epoch_pbar = tqdm(range(num_epochs), desc=f"Config {config_idx+1}")
-            for epoch in epoch_pbar:
-                start_time = time.time()
-                train_loss, train_acc = train_epoch(model, train_loader, optimizer, criterion, device)
-                val_loss, val_acc = validate(model, val_loader, criterion, device)
-                scheduler.step(val_loss)
-                
-                if val_acc > best_val_acc_this_config:
-                    best_val_acc_this_config = val_acc
-                    best_model_state = model.state_dict().copy()
-                
-                epoch_time = time.time() - start_time
-                metrics = {
-                    'epoch': epoch,
-                    'train_loss': train_loss,
-                    'train_acc': train_acc,
-                    'val_loss': val_loss,
-                    'val_acc': val_acc,
-                    'lr': optimizer.param_groups[0]['lr'],
-                    'epoch_time': epoch_time
-                }
-                wandb.log(metrics)
-                
-                epoch_pbar.set_postfix({
-                    'Train Acc': f'{train_acc:.2f}%',
-                    'Val Acc': f'{val_acc:.2f}%',
-                    'Best': f'{best_val_acc_this_config:.2f}%'
-                })
-            
-            model.load_state_dict(best_model_state)
-            final_metrics = {
-                'val_acc': best_val_acc_this_config,
-                'val_loss': val_loss,
+
+        optimizer = optim.Adam(model.parameters(), lr=config['lr'])
+        criterion = nn.CrossEntropyLoss()
+        scheduler = optim.lr_scheduler.ReduceLROnPlateau(optimizer, patience=3, factor=0.5)
+
+        best_val_acc_this_config = 0
+        best_model_state = None
+        checkpoint_path = Path(save_dir) / f"trial_{trial_idx + 1}_best.pth"
+        pruned_at = None
+
+        for epoch in range(num_epochs):
+            start_time = time.time()
+            if miner is not None:
+                model.eval() # Mining embeds in eval mode; the training epoch switches back
+                miner.refresh(model.embed, device, epoch)
+            train_loss, train_acc = train_epoch(model, train_loader, optimizer, criterion, device, batch_aug)
+            val_loss, val_acc = validate(model, val_loader, criterion, device)
+            scheduler.step(val_loss)
+
+            if best_model_state is None or val_acc > best_val_acc_this_config:
+                best_val_acc_this_config = val_acc
+                # state_dict() returns references to the live tensors; copy them before training continues
+                best_model_state = copy.deepcopy(model.state_dict())
+                torch.save(best_model_state, checkpoint_path)
+
+            metrics = {
+                'epoch': epoch,
+                'train_loss': train_loss,
                 'train_acc': train_acc,
-                'model_params': param_count
-            }
-            
-            is_best = best_val_acc_this_config > best_val_acc
-            model_path = save_model(model, config, final_metrics, save_dir, is_best)
-            
-            if is_best:
-                best_val_acc = best_val_acc_this_config
-                best_model_path = model_path
-                print(f"🎉 New best model! Validation accuracy: {best_val_acc:.2f}%")
-            
-            result = {
-                'config': config,
-                'val_acc': best_val_acc_this_config,
                 'val_loss': val_loss,
-                'train_acc': train_acc,
-                'model_params': param_count,
-                'model_path': str(model_path)
+                'val_acc': val_acc,
+                'lr': optimizer.param_groups[0]['lr'],
+                'epoch_time': time.time() - start_time
             }
-            results.append(result)
-            
-            wandb.run.summary.update({
+            if run is not None:
+                wandb.log(metrics)
+            print(f"Trial {trial_idx + 1} epoch {epoch + 1}/{num_epochs}: "
+                  f"Train Acc {train_acc:.2f}% | Val Acc {val_acc:.2f}% | Best {best_val_acc_this_config:.2f}%")
+
+            if pruner is not None and pruner.should_prune(trial_idx, epoch, best_val_acc_this_config):
+                pruned_at = epoch + 1
+                print(f"Trial {trial_idx + 1} pruned after {pruned_at} epochs")
+                break
+
+        model.load_state_dict(best_model_state)
+        final_metrics = {
+            'val_acc': best_val_acc_this_config,
+            'val_loss': val_loss,
+            'train_acc': train_acc,
+            'model_params': param_count
+        }
+        model_path = save_model(model, config, final_metrics, save_dir)
+
+        if run is not None:
+            run.summary.update({
                 'final_val_acc': best_val_acc_this_config,
                 'final_train_acc': train_acc,
-                'is_best': is_best
-            })
-            
-        except Exception as e:
-            print(f"Error in configuration {config_idx + 1}: {e}")
-            results.append({
-                'config': config,
-                'error': str(e),
-                'val_acc': 0,
-                'model_params': 0
+                'pruned_at': pruned_at
             })
-        
-        finally:
+        return {
+            'config': config,
+            'val_acc': best_val_acc_this_config,
+            'val_loss': val_loss,
+            'train_acc': train_acc,
+            'model_params': param_count,
+            'model_path': str(model_path),
+            'checkpoint_path': str(checkpoint_path),
+            'epochs': epoch + 1,
+            'pruned': pruned_at is not None
+        }
+
+    except Exception as e:
+        print(f"Error in configuration {trial_idx + 1}: {e}")
+        return {
+            'config': config,
+            'error': str(e),
+            'val_acc': 0,
+            'model_params': 0
+        }
+
+    finally:
+        if run is not None:
             wandb.finish()
-    
+
+def grid_search_training(train_df, val_df, class_to_idx, param_grid, num_epochs=20, batch_size=32,
+                        save_dir="./models", project_name="magic-card-grid-search", augmentations_per_sample=50,
+                        batch_augment=False, hard_negative_every=0, processes=None, pruner="median", use_wandb=False):
+    """
+    Trains every ParameterGrid configuration as a trial in `processes` worker processes
+    (default: one per CPU, each with an equal share of the torch threads; 0 trains in this
+    process). `pruner` ("median", "halving" or None) stops unpromising trials early.
+    With batch_augment, training images are loaded as raw uint8 and augmented a whole batch
+    at a time by BatchCardAugment; otherwise every image goes through strong_card_aug.
+    Both apply the same transforms; the batched path only pays off with several torch threads
+    per trial (see card_batch_aug.benchmark), so it is off by default.
+    With hard_negative_every > 0, the training pool is re-mined for confusable classes every
+    that many epochs and batches over-sample them; otherwise sampling is uniform.
+    W&B logging is optional (use_wandb) and offline by default.
+    """
+
+    if len(train_df) == 0 or len(val_df) == 0:
+        print("ERROR: Empty training or validation set. Cannot proceed with training.")
+        return [], None
+
+    save_dir = Path(save_dir)
+    save_dir.mkdir(exist_ok=True)
+    print(f"Using device: {torch.device('cuda' if torch.cuda.is_available() else 'cpu')}")
+
+    print(f"Training sources: {train_df['unique_id'].nunique()}")
+    print(f"Validation sources: {val_df['unique_id'].nunique()}")
+    print(f"With {augmentations_per_sample}x augmentation: {len(train_df) * augmentations_per_sample} training samples")
+    print(f"Number of classes: {len(class_to_idx)}")
+
+    grid = list(ParameterGrid(param_grid))
+    processes = min(os.cpu_count() or 1, len(grid)) if processes is None else processes
+    num_threads = max(1, (os.cpu_count() or 1) // processes) if processes else 0
+    print(f"Starting grid search with {len(grid)} configurations on {max(processes, 1)} process(es)...")
+
+    # Build the image caches once here, so workers never decode the same images concurrently
+    build_image_cache(train_df['image_path'])
+    build_image_cache(val_df['image_path'])
+
+    def tasks(store):
+        trial_pruner = make_pruner(pruner, store)
+        return [(idx, config, train_df, val_df, class_to_idx, num_epochs, batch_size, save_dir, project_name,
+                 augmentations_per_sample, batch_augment, hard_negative_every, trial_pruner, num_threads, use_wandb)
+                for idx, config in enumerate(grid)]
+
+    if processes:
+        with multiprocessing.Manager() as manager, multiprocessing.Pool(processes) as pool:
+            results = pool.map(run_trial, tasks(manager.dict()), chunksize=1)
+    else:
+        results = [run_trial(task) for task in tasks({})]
+
+    valid_results = [r for r in results if 'error' not in r]
+    best_model_path = None
+    best_val_acc = 0
+    if valid_results:
+        best = max(valid_results, key=lambda r: r['val_acc'])
+        best_val_acc = best['val_acc']
+        # Load the trial's own checkpoint: save_model file names can collide between configs
+        model = MagicCardNet(len(class_to_idx), best['config']['channels'], best['config']['pool_size'], best['config']['dropout'])
+        model.load_state_dict(torch.load(best['checkpoint_path'], map_location='cpu'))
+        metrics = {key: best[key] for key in ('val_acc', 'val_loss', 'train_acc', 'model_params')}
+        best_model_path = save_model(model, best['config'], metrics, save_dir, is_best=True)
+        best['model_path'] = str(best_model_path)
+
     results_path = save_dir / "grid_search_results.json"
     with open(results_path, 'w') as f:
         json.dump(results, f, indent=2)
-    
+
     print(f"\n{'='*60}")
     print("GRID SEARCH COMPLETE")
     print(f"{'='*60}")
     print(f"Best validation accuracy: {best_val_acc:.2f}%")
     print(f"Best model saved at: {best_model_path}")
+    print(f"Pruned trials: {sum(r.get('pruned', False) for r in results)}/{len(results)}")
     print(f"Results saved at: {results_path}")
-    
-    valid_results = [r for r in results if 'error' not in r]
+
     valid_results.sort(key=lambda x: x['val_acc'], reverse=True)
-    
+
     print(f"\nTop 3 configurations:")
     for i, result in enumerate(valid_results[:3]):
         print(f"{i+1}. Val Acc: {result['val_acc']:.2f}% | Params: {result['model_params']:,} | Config: {result['config']}")
-    
+
     return results, best_model_path
 
 # --- Main ---
@@ -548,6 +712,9 @@ if __name__ == "__main__":
     BATCH_SIZE = 16
     PROJECT_NAME = "magic-card-grid-search"
     AUGMENTATIONS_PER_SAMPLE = 50  # Each original image creates 50 augmented versions
+    PROCESSES = None  # Parallel trials; None = one per CPU, 0 = train in this process
+    PRUNER = "median"  # "median", "halving" or None to train every config for NUM_EPOCHS
+    USE_WANDB = False  # Log trials to W&B (offline unless WANDB_MODE is set)
     
     # Start training
     results, best_model = grid_search_training(
@@ -559,5 +726,8 @@ if __name__ == "__main__":
         batch_size=BATCH_SIZE,
         save_dir="./magic_card_models",
         project_name=PROJECT_NAME,
-        augmentations_per_sample=AUGMENTATIONS_PER_SAMPLE
+        augmentations_per_sample=AUGMENTATIONS_PER_SAMPLE,
+        processes=PROCESSES,
+        pruner=PRUNER,
+        use_wandb=USE_WANDB
     )
\ No newline at end of file
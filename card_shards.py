@@ -0,0 +1,163 @@
+import os
+import json
+import glob
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import torch
+import cv2
+from PIL import Image
+
+# --- Constants ---
+DATASET_DIR = "mtg_datasets"        # Output of MTGDatasetBuilder (one folder per set with labels.json and images/)
+SHARD_DIR = "mtg_shards"
+IMAGES_PER_SHARD = 1024             # 1024 x 224 x 224 x 3 bytes = ~150 MB per shard
+IMG_SIZE = 224                      # Same size as IMG_SIZE in card_recognition_nn.py
+SHUFFLE_BUFFER_SIZE = 2048
+
+def pack_shards(dataset_dir=DATASET_DIR, shard_dir=SHARD_DIR, images_per_shard=IMAGES_PER_SHARD, size=IMG_SIZE):
+    """
+    Packs the images and labels of every set into sequential shards: shard_XXXXX.npy holds
+    decoded, resized uint8 images [n, size, size, 3], and index.json holds one entry per
+    image (its labels.json fields plus set, unique_id, shard and row).
+    """
+    os.makedirs(shard_dir, exist_ok=True)
+    index = []
+    images = np.empty((images_per_shard, size, size, 3), dtype=np.uint8)
+    count = 0
+    shard = 0
+
+    def flush():
+        nonlocal count, shard
+        if count:
+            np.save(os.path.join(shard_dir, f"shard_{shard:05d}.npy"), images[:count])
+            print(f"Wrote shard {shard} with {count} images")
+            shard += 1
+            count = 0
+
+    for labels_path in sorted(glob.glob(f"{dataset_dir}/**/labels.json", recursive=True)):
+        set_name = Path(labels_path).parent.name
+        images_dir = Path(labels_path).parent / "images"
+        with open(labels_path, "r", encoding="utf-8") as f:
+            cards = json.load(f).get("cards", [])
+        print(f"Packing set {set_name}: {len(cards)} cards")
+        for card in cards:
+            image_path = images_dir / card["filename"]
+            if not image_path.exists():
+                print(f"Warning: Image not found: {image_path}")
+                continue
+            image = np.array(Image.open(image_path).convert('RGB'))
+            images[count] = cv2.resize(image, (size, size), interpolation=cv2.INTER_LINEAR)
+            index.append({**card, "set": set_name, "unique_id": f"{set_name}_{card['name']}", "shard": shard, "row": count})
+            count += 1
+            if count == images_per_shard:
+                flush()
+    flush()
+
+    with open(os.path.join(shard_dir, "index.json"), "w", encoding="utf-8") as f:
+        json.dump({"image_size": size, "num_shards": shard, "images": index}, f, ensure_ascii=False)
+    print(f"Packed {len(index)} images into {shard} shards in {shard_dir}")
+    return len(index)
+
+def load_shard_index(shard_dir=SHARD_DIR):
+    """
+    The packed index as a DataFrame with the same name/filename/set/unique_id columns as
+    load_all_labels_json, plus shard and row, so create_source_aware_splits works on it.
+    """
+    with open(os.path.join(shard_dir, "index.json"), "r", encoding="utf-8") as f:
+        return pd.DataFrame(json.load(f)["images"])
+
+class ShardedCardDataset(torch.utils.data.IterableDataset):
+    """
+    Streams the rows of `dataframe` (a subset of load_shard_index) from the shards.
+
+    Each shard is read whole with one sequential read. Shards are visited in a random
+    order per epoch and split between DataLoader workers. Images pass through a shuffle
+    buffer of `shuffle_buffer_size`. With `repeats` > 1 every image is yielded that many
+    times per epoch, with a fresh augmentation each time (like augmentations_per_sample).
+    """
+    def __init__(self, dataframe, class_to_idx, shard_dir=SHARD_DIR, transform=None,
+                 shuffle_buffer_size=SHUFFLE_BUFFER_SIZE, repeats=1, seed=0):
+        self.shard_dir = shard_dir
+        self.transform = transform
+        self.shuffle_buffer_size = shuffle_buffer_size
+        self.repeats = repeats
+        self.seed = seed
+        self.epoch = 0
+        self.rows_by_shard = {}
+        for shard, group in dataframe.groupby("shard"):
+            labels = np.array([class_to_idx[uid] for uid in group["unique_id"]], dtype=np.int64)
+            self.rows_by_shard[int(shard)] = (group["row"].to_numpy(dtype=np.int64), labels)
+
+    def __len__(self):
+        return sum(len(rows) for rows, _ in self.rows_by_shard.values()) * self.repeats
+
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+
+    def _samples(self, shards, rng):
+        for shard in shards:
+            images = np.load(os.path.join(self.shard_dir, f"shard_{shard:05d}.npy"))
+            rows, labels = self.rows_by_shard[shard]
+            for _ in range(self.repeats):
+                for i in rng.permutation(len(rows)):
+                    yield images[rows[i]], labels[i]
+
+    def __iter__(self):
+        worker = torch.utils.data.get_worker_info()
+        rng = np.random.default_rng([self.seed, self.epoch, worker.id if worker else 0])
+        shards = np.random.default_rng([self.seed, self.epoch]).permutation(sorted(self.rows_by_shard))
+        if worker is not None:
+            shards = shards[worker.id::worker.num_workers]
+
+        buffer = []
+        for sample in self._samples(shards.tolist(), rng):
+            if len(buffer) < self.shuffle_buffer_size:
+                buffer.append(sample)
+                continue
+            i = rng.integers(len(buffer))
+            buffer[i], sample = sample, buffer[i]
+            yield self._prepare(sample)
+        for i in rng.permutation(len(buffer)):
+            yield self._prepare(buffer[i])
+
+    def _prepare(self, sample):
+        image, label = sample
+        if self.transform:
+            image = self.transform(image=image)['image']
+        return image, int(label)
+
+def benchmark(dataset_dir=DATASET_DIR, shard_dir=SHARD_DIR, num_images=2000):
+    """Images/sec of per-file loading (open, decode, convert, resize) vs streaming the packed shards."""
+    df = load_shard_index(shard_dir)
+    paths = [str(Path(dataset_dir) / s / "images" / f) for s, f in zip(df["set"], df["filename"])]
+    class_to_idx = {uid: i for i, uid in enumerate(sorted(df["unique_id"].unique()))}
+
+    start = time.perf_counter()
+    for i in range(min(num_images, len(paths))):
+        image = np.array(Image.open(paths[i]).convert('RGB'))
+        cv2.resize(image, (IMG_SIZE, IMG_SIZE), interpolation=cv2.INTER_LINEAR)
+    per_file = min(num_images, len(paths)) / (time.perf_counter() - start)
+
+    dataset = ShardedCardDataset(df, class_to_idx, shard_dir)
+    start = time.perf_counter()
+    count = 0
+    for _ in dataset:
+        count += 1
+        if count == num_images:
+            break
+    streamed = count / (time.perf_counter() - start)
+    print(f"Per-file loading: {per_file:.0f} images/sec")
+    print(f"Packed shards:    {streamed:.0f} images/sec")
+
+def main():
+    """
+    Packs DATASET_DIR into SHARD_DIR and benchmarks reading it.
+    """
+    pack_shards(DATASET_DIR, SHARD_DIR)
+    benchmark(DATASET_DIR, SHARD_DIR)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+import glob
+import itertools
+import multiprocessing
+import os
+import time
+
+import numpy as np
+import cv2
+
+from frame_hashing import dhash, DUPLICATE_DISTANCE
+
+# --- Constants ---
+FRAMES_DIR = "scraped_frames"                 # Output of yt_frame_extractor.py: <video_id>_<title>/frame_NNNN.png
+INDEX_FILE = "scraped_frames_hashes.npz"      # Persisted hash index, updated incrementally across runs
+NUM_BANDS = 4                                 # 64-bit hashes are searched as 4 x 16-bit bands
+HASH_CHUNK_SIZE = 256                         # Images per worker task when hashing
+MIN_PENDING = 4096                            # Hashes buffered before the first merge into the sorted band tables
+DELETE_DUPLICATES = False                     # Delete every frame on disk that is not its cluster's representative
+
+def hash_file(path):
+    """dHash of an image file, or None if it cannot be read."""
+    image = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+    return None if image is None else dhash(image)
+
+def hash_files(paths, processes=None):
+    """dHashes of `paths` (None for unreadable files), decoded and hashed in `processes` workers."""
+    if not paths:
+        return []
+    with multiprocessing.Pool(processes) as pool:
+        return list(pool.imap(hash_file, paths, chunksize=HASH_CHUNK_SIZE))
+
+class MultiIndexHashing:
+    """
+    Exact Hamming range search over 64-bit hashes. Each hash is split into `num_bands`
+    bands; by pigeonhole, a hash within `radius` bits of the query is within
+    radius // num_bands bits of it in at least one band. Per band, the stored hashes are
+    kept sorted by band value with bucket offsets (CSR layout), so a query gathers the
+    buckets of every band value that close to its own and checks the candidates on the
+    full hash in one vectorized pass. New hashes go to a pending buffer that is scanned
+    linearly and merged into the sorted tables once it reaches 1/16 of their size.
+    """
+    def __init__(self, radius=DUPLICATE_DISTANCE, num_bands=NUM_BANDS):
+        self.radius = radius
+        self.num_bands = num_bands
+        self.band_bits = 64 // num_bands
+        self.band_mask = (1 << self.band_bits) - 1
+        probe_radius = radius // num_bands
+        self.flips = np.array([sum(1 << bit for bit in bits) for r in range(probe_radius + 1)
+                               for bits in itertools.combinations(range(self.band_bits), r)], dtype=np.int64)
+        self.keys = np.empty(0, dtype=np.int64)
+        self.values = np.empty(0, dtype=np.uint64)
+        self.band_orders = []
+        self.band_starts = []
+        self.pending_keys = np.empty(MIN_PENDING, dtype=np.int64)
+        self.pending_values = np.empty(MIN_PENDING, dtype=np.uint64)
+        self.num_pending = 0
+
+    def __len__(self):
+        return len(self.keys) + self.num_pending
+
+    def _bands(self, values):
+        return [(values >> np.uint64(band * self.band_bits)) & np.uint64(self.band_mask) for band in range(self.num_bands)]
+
+    def add(self, key, value):
+        if self.num_pending == len(self.pending_keys):
+            if self.num_pending >= len(self.keys) // 16:
+                self._merge_pending()
+            else:
+                self.pending_keys = np.resize(self.pending_keys, 2 * self.num_pending)
+                self.pending_values = np.resize(self.pending_values, 2 * self.num_pending)
+        self.pending_keys[self.num_pending] = key
+        self.pending_values[self.num_pending] = value
+        self.num_pending += 1
+
+    def _merge_pending(self):
+        self.keys = np.concatenate([self.keys, self.pending_keys[:self.num_pending]])
+        self.values = np.concatenate([self.values, self.pending_values[:self.num_pending]])
+        self.num_pending = 0
+        self.band_orders, self.band_starts = [], []
+        for codes in self._bands(self.values):
+            order = np.argsort(codes, kind="stable")
+            self.band_orders.append(order)
+            self.band_starts.append(np.searchsorted(codes[order], np.arange(self.band_mask + 2, dtype=np.uint64)))
+
+    def search(self, value):
+        """(distance, key) of every stored hash within `radius` bits of `value`, nearest first."""
+        query = np.uint64(value)
+        rows = []
+        for order, starts, band in zip(self.band_orders, self.band_starts, self._bands(query)):
+            probes = np.int64(band) ^ self.flips
+            lo, hi = starts[probes], starts[probes + 1]
+            lengths = hi - lo
+            # Positions lo..hi-1 of every probed bucket, concatenated
+            offsets = np.repeat(lo - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+            rows.append(order[offsets])
+        rows = np.concatenate(rows) if rows else np.empty(0, dtype=np.int64)
+        candidates = [(self.keys[rows], np.bitwise_count(self.values[rows] ^ query)),
+                      (self.pending_keys[:self.num_pending], np.bitwise_count(self.pending_values[:self.num_pending] ^ query))]
+        matches = {(int(distance), int(key)) for keys, distances in candidates
+                   for key, distance in zip(keys[distances <= self.radius], distances[distances <= self.radius])}
+        return sorted(matches)
+
+class FrameHashIndex:
+    """
+    Every frame ever indexed (path relative to the frames directory, dHash) and the
+    representative of its near-duplicate cluster. Clusters are built greedily in path
+    order: a new frame joins the nearest representative within `radius` bits, or becomes
+    a representative itself. Only representatives are searched, so the search structure
+    grows with the number of distinct frames rather than all frames.
+    """
+    def __init__(self, radius=DUPLICATE_DISTANCE):
+        self.radius = radius
+        self.paths = []
+        self.hashes = []
+        self.representatives = [] # Index into paths of each frame's cluster representative
+        self.known = set()
+        self.search_index = MultiIndexHashing(radius)
+
+    def add(self, path, frame_hash):
+        """Indexes one frame; returns the index of its representative."""
+        idx = len(self.paths)
+        matches = self.search_index.search(frame_hash)
+        representative = matches[0][1] if matches else idx
+        if not matches:
+            self.search_index.add(idx, frame_hash)
+        self.paths.append(path)
+        self.hashes.append(frame_hash)
+        self.representatives.append(representative)
+        self.known.add(path)
+        return representative
+
+    def update(self, paths, hashes):
+        """Indexes new frames (skipping unreadable ones); returns (added, new clusters)."""
+        added = new_clusters = 0
+        for path, frame_hash in zip(paths, hashes):
+            if frame_hash is None or path in self.known:
+                continue
+            new_clusters += self.add(path, frame_hash) == len(self.paths) - 1
+            added += 1
+        return added, new_clusters
+
+    def duplicates(self):
+        """Paths of all frames that are not the representative of their cluster."""
+        return [path for idx, (path, rep) in enumerate(zip(self.paths, self.representatives)) if rep != idx]
+
+    def num_clusters(self):
+        return len(self.search_index)
+
+    def save(self, index_file=INDEX_FILE):
+        tmp_file = f"{index_file}.tmp"
+        with open(tmp_file, "wb") as f:
+            np.savez(f, paths=np.array(self.paths, dtype=str), hashes=np.array(self.hashes, dtype=np.uint64),
+                     representatives=np.array(self.representatives, dtype=np.int64), radius=self.radius)
+        os.replace(tmp_file, index_file)
+
+    @classmethod
+    def load(cls, index_file=INDEX_FILE, radius=DUPLICATE_DISTANCE):
+        """Loads a saved index, or returns an empty one if there is none. A saved index keeps its own radius."""
+        if not os.path.exists(index_file):
+            return cls(radius)
+        data = np.load(index_file)
+        index = cls(int(data["radius"]))
+        index.paths = data["paths"].tolist()
+        index.hashes = data["hashes"].tolist()
+        index.representatives = data["representatives"].tolist()
+        index.known = set(index.paths)
+        for idx, (frame_hash, rep) in enumerate(zip(index.hashes, index.representatives)):
+            if rep == idx:
+                index.search_index.add(idx, frame_hash)
+        return index
+
+def find_frames(frames_dir=FRAMES_DIR):
+    """Frame paths relative to frames_dir, sorted so each video's frames are in time order."""
+    return sorted(os.path.relpath(path, frames_dir) for path in glob.glob(os.path.join(frames_dir, "*", "*.png")))
+
+def deduplicate(frames_dir=FRAMES_DIR, index_file=INDEX_FILE, radius=DUPLICATE_DISTANCE, processes=None, delete=DELETE_DUPLICATES):
+    """
+    Hashes the frames not yet in the index, clusters them against all earlier frames,
+    saves the index and (with `delete`) removes every non-representative frame still on
+    disk. Returns the index.
+    """
+    index = FrameHashIndex.load(index_file, radius)
+    new_paths = [path for path in find_frames(frames_dir) if path not in index.known]
+    print(f"{len(index.paths)} frames in index ({index.num_clusters()} clusters), {len(new_paths)} new")
+
+    start = time.time()
+    hashes = hash_files([os.path.join(frames_dir, path) for path in new_paths], processes)
+    hash_time = time.time() - start
+    start = time.time()
+    added, new_clusters = index.update(new_paths, hashes)
+    print(f"Hashed {len(new_paths)} frames in {hash_time:.1f}s, clustered in {time.time() - start:.1f}s: "
+          f"{added} added ({len(new_paths) - added} unreadable), {new_clusters} new clusters, "
+          f"{added - new_clusters} near-duplicates")
+    index.save(index_file)
+
+    duplicates = [os.path.join(frames_dir, path) for path in index.duplicates()]
+    on_disk = [path for path in duplicates if os.path.exists(path)]
+    print(f"{index.num_clusters()} clusters over {len(index.paths)} frames; {len(on_disk)} duplicates on disk")
+    if delete:
+        for path in on_disk:
+            os.remove(path)
+        print(f"Deleted {len(on_disk)} duplicate frames")
+    return index
+
+def main():
+    deduplicate()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+import numpy as np
+import cv2
+
+# --- Constants ---
+HASH_SIZE = 8                       # dHash of HASH_SIZE x HASH_SIZE bits = 64-bit hash
+DUPLICATE_DISTANCE = 10             # Frames whose hashes differ in at most this many bits are near-duplicates
+
+def dhash(frame, hash_size=HASH_SIZE):
+    """
+    Difference hash of an RGB (or grayscale) uint8 frame as a Python int: the frame is
+    shrunk to (hash_size + 1) x hash_size grayscale pixels and each bit says whether a
+    pixel is brighter than its right neighbour. Robust to scaling, compression and small
+    brightness changes; costs one resize.
+    """
+    gray = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY) if frame.ndim == 3 else frame
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    return int.from_bytes(np.packbits(small[:, 1:] > small[:, :-1]).tobytes(), "big")
+
+def hamming(a, b):
+    return (a ^ b).bit_count()
+
+class FrameGate:
+    """
+    Passes a frame only if its dHash differs from the last passed frame by more than
+    `threshold` bits. Comparing against the last *passed* frame (not the previous one)
+    lets a slow pan through eventually instead of being dropped frame by frame.
+    """
+    def __init__(self, threshold=DUPLICATE_DISTANCE):
+        self.threshold = threshold
+        self.last_hash = None
+
+    def keep(self, frame):
+        frame_hash = dhash(frame)
+        if self.last_hash is not None and hamming(frame_hash, self.last_hash) <= self.threshold:
+            return False
+        self.last_hash = frame_hash
+        return True
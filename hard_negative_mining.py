@@ -0,0 +1,138 @@
+import time
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+from card_batch_aug import IMAGENET_MEAN, IMAGENET_STD
+
+# --- Constants ---
+NUM_NEGATIVES = 5           # Confusable classes kept per class
+REFRESH_EVERY = 3           # Epochs between re-mining
+HARD_FRACTION = 0.5         # Share of each batch drawn from mined confusions
+SAME_NAME_BONUS = 2.0       # Added to the similarity of the same card name in another set, so reprints always rank first
+CHUNK_SIZE = 1024           # Rows of the class similarity matrix computed at once
+
+def embed_pool(forward, images, device, batch_size=64):
+    """L2-normalized embeddings [N, D] of uint8 images [N, H, W, 3] under `forward` (val_aug normalization)."""
+    mean = torch.tensor(IMAGENET_MEAN).view(1, 3, 1, 1)
+    std = torch.tensor(IMAGENET_STD).view(1, 3, 1, 1)
+    chunks = []
+    with torch.no_grad():
+        for i in range(0, len(images), batch_size):
+            batch = torch.from_numpy(np.asarray(images[i:i + batch_size])).permute(0, 3, 1, 2).contiguous().float().div_(255)
+            chunks.append(F.normalize(forward(((batch - mean) / std).to(device)), dim=1).cpu().numpy())
+    return np.concatenate(chunks).astype(np.float32)
+
+class HardNegativeMiner:
+    """
+    Keeps, for every class, the `num_negatives` classes it is most easily confused with:
+    the same card name from other sets first, then the nearest class prototypes (mean
+    embedding of the class's images) by cosine similarity, which picks up shared art and
+    frames. Mining embeds the whole training pool, so it runs every `refresh_every`
+    epochs and the result is cached in between.
+    """
+    def __init__(self, images, labels, names, num_negatives=NUM_NEGATIVES, refresh_every=REFRESH_EVERY):
+        self.images = images
+        self.labels = np.asarray(labels, dtype=np.int64)
+        self.num_classes = int(self.labels.max()) + 1
+        # Name code per class (every image of a class has the same name)
+        name_codes = np.unique(np.asarray(names), return_inverse=True)[1]
+        self.class_names = np.full(self.num_classes, -1, dtype=np.int64)
+        self.class_names[self.labels] = name_codes
+        self.num_negatives = num_negatives
+        self.refresh_every = refresh_every
+        self.negatives = None # [num_classes, num_negatives] class ids, -1 where a class has fewer
+        self.similarities = None
+        self.mined_epoch = None
+
+    def needs_refresh(self, epoch):
+        return self.mined_epoch is None or epoch - self.mined_epoch >= self.refresh_every
+
+    def mine(self, forward, device, epoch=0, batch_size=64):
+        start = time.time()
+        embeddings = embed_pool(forward, self.images, device, batch_size)
+        prototypes = np.zeros((self.num_classes, embeddings.shape[1]), dtype=np.float32)
+        np.add.at(prototypes, self.labels, embeddings)
+        # Search only among classes present in the pool; `classes` maps back to class ids
+        classes = np.unique(self.labels)
+        prototypes = prototypes[classes]
+        prototypes /= np.maximum(np.linalg.norm(prototypes, axis=1, keepdims=True), 1e-12)
+        same_name_rows, same_name_cols = self._same_name_pairs(self.class_names[classes])
+
+        k = min(self.num_negatives, len(classes) - 1)
+        self.negatives = np.full((self.num_classes, self.num_negatives), -1, dtype=np.int64)
+        self.similarities = np.zeros((self.num_classes, self.num_negatives), dtype=np.float32)
+        for lo in range(0, len(classes) if k > 0 else 0, CHUNK_SIZE):
+            rows = np.arange(lo, min(lo + CHUNK_SIZE, len(classes)))
+            scores = prototypes[rows] @ prototypes.T
+            pairs = (same_name_rows >= rows[0]) & (same_name_rows <= rows[-1])
+            scores[same_name_rows[pairs] - lo, same_name_cols[pairs]] += SAME_NAME_BONUS
+            scores[np.arange(len(rows)), rows] = -np.inf
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            top = np.take_along_axis(top, np.argsort(-top_scores, axis=1), axis=1)
+            self.negatives[classes[rows], :k] = classes[top]
+            # Cosine similarity without the same-name bonus
+            self.similarities[classes[rows], :k] = np.einsum("rd,rkd->rk", prototypes[rows], prototypes[top])
+        self.mined_epoch = epoch
+        print(f"Mined {int((self.negatives >= 0).sum())} confusable class pairs from {len(self.labels)} images "
+              f"in {time.time() - start:.1f}s (epoch {epoch})")
+        return self.negatives
+
+    @staticmethod
+    def _same_name_pairs(names):
+        """(row, col) positions of every ordered pair of distinct entries with the same name."""
+        order = np.argsort(names, kind="stable")
+        groups = np.split(order, np.flatnonzero(np.diff(names[order])) + 1)
+        pairs = [(i, j) for group in groups if len(group) > 1 for i in group for j in group if i != j]
+        rows, cols = np.array(pairs, dtype=np.int64).reshape(-1, 2).T
+        return rows, cols
+
+    def refresh(self, forward, device, epoch, batch_size=64):
+        """Re-mines if the cache is `refresh_every` epochs old; returns whether it did."""
+        if not self.needs_refresh(epoch):
+            return False
+        self.mine(forward, device, epoch, batch_size)
+        return True
+
+class HardNegativeBatchSampler(torch.utils.data.Sampler):
+    """
+    Batch sampler for AugmentedMTGCardDataset. Each batch holds uniformly drawn anchor
+    images plus, for a `hard_fraction` share of the batch, an image of one of an anchor's
+    mined confusable classes, so confusions are seen side by side. Until the miner has run,
+    batches are uniform. An epoch has as many batches as a shuffled DataLoader would.
+    """
+    def __init__(self, miner, batch_size, augmentations_per_sample=1, hard_fraction=HARD_FRACTION, seed=None):
+        self.miner = miner
+        self.batch_size = batch_size
+        self.augmentations_per_sample = augmentations_per_sample
+        self.hard_fraction = hard_fraction
+        self.rng = np.random.default_rng(seed)
+        labels = miner.labels
+        self.order = np.argsort(labels, kind="stable") # Images grouped by class
+        counts = np.bincount(labels, minlength=miner.num_classes)
+        self.starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        self.counts = counts
+
+    def __len__(self):
+        return (len(self.miner.labels) * self.augmentations_per_sample + self.batch_size - 1) // self.batch_size
+
+    def _image_of(self, classes):
+        return self.order[self.starts[classes] + self.rng.integers(0, self.counts[classes])]
+
+    def __iter__(self):
+        num_images = len(self.miner.labels)
+        num_hard = int(self.batch_size * self.hard_fraction) if self.miner.negatives is not None else 0
+        for _ in range(len(self)):
+            anchors = self.rng.integers(0, num_images, self.batch_size - num_hard)
+            images = anchors
+            if num_hard:
+                partners = anchors[self.rng.integers(0, len(anchors), num_hard)]
+                candidates = self.miner.negatives[self.miner.labels[partners]]
+                picked = candidates[np.arange(num_hard), self.rng.integers(0, candidates.shape[1], num_hard)]
+                # Classes without (enough) mined negatives fall back to the class of a uniform image
+                uniform = self.miner.labels[self.rng.integers(0, num_images, num_hard)]
+                images = np.concatenate([anchors, self._image_of(np.where(picked < 0, uniform, picked))])
+            # Virtual dataset index: a random augmentation of each chosen original
+            yield (images * self.augmentations_per_sample + self.rng.integers(0, self.augmentations_per_sample, len(images))).tolist()
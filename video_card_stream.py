@@ -0,0 +1,159 @@
+import json
+import subprocess
+import time
+from dataclasses import dataclass, asdict
+
+import numpy as np
+import cv2
+
+from card_detection import crop_cards
+from card_embeddings import CardRecognizer, INDEX_DIR, MODEL_PATH
+from card_recognition_nn import IMG_SIZE
+from frame_hashing import FrameGate, DUPLICATE_DISTANCE
+
+# --- Constants ---
+FRAME_INTERVAL_SECONDS = 1          # Same sampling as yt_frame_extractor.py
+MAX_FRAME_WIDTH = 1280              # Frames are scaled down by ffmpeg before they reach Python
+BATCH_SIZE = 32                     # Card crops per recognizer call
+MIN_CONFIDENCE = 0.5                # Cosine similarity to the best prototype
+OUTPUT_FILE = "card_sightings.jsonl"
+
+@dataclass
+class CardSighting:
+    video_id: str
+    timestamp: float                # Seconds from the start of the video
+    card_id: str                    # unique_id of the matched prototype ("{set}_{name}")
+    confidence: float
+
+def probe_size(video_url, ffprobe="ffprobe"):
+    """(width, height) of the first video stream."""
+    output = subprocess.run(
+        [ffprobe, '-v', 'error', '-select_streams', 'v:0', '-show_entries', 'stream=width,height', '-of', 'csv=p=0', video_url],
+        capture_output=True, text=True, check=True
+    ).stdout
+    width, height = map(int, output.strip().split(',')[:2])
+    return width, height
+
+def stream_frames(video_url, start=0, duration=None, interval=FRAME_INTERVAL_SECONDS, max_width=MAX_FRAME_WIDTH, ffmpeg="ffmpeg", ffprobe="ffprobe"):
+    """
+    Yields (timestamp, frame) with frame an RGB uint8 array [H, W, 3], one every `interval`
+    seconds. ffmpeg decodes, samples and scales the video and pipes raw rgb24 frames over
+    stdout, so nothing is written to disk.
+    """
+    width, height = probe_size(video_url, ffprobe)
+    if width > max_width:
+        height = int(round(height * max_width / width / 2)) * 2
+        width = max_width
+    command = [ffmpeg, '-v', 'error', '-ss', str(start), '-i', video_url]
+    if duration is not None:
+        command += ['-t', str(duration)]
+    command += ['-vf', f'fps=1/{interval},scale={width}:{height}', '-f', 'rawvideo', '-pix_fmt', 'rgb24', 'pipe:1']
+
+    frame_bytes = width * height * 3
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, bufsize=frame_bytes)
+    try:
+        index = 0
+        while True:
+            buffer = process.stdout.read(frame_bytes)
+            if len(buffer) < frame_bytes:
+                break
+            yield start + index * interval, np.frombuffer(buffer, dtype=np.uint8).reshape(height, width, 3)
+            index += 1
+    finally:
+        process.stdout.close()
+        process.kill()
+        process.wait()
+
+def whole_frame(frame):
+    """Detector for frames that show a single card filling the frame: the whole frame as one crop."""
+    return [cv2.resize(frame, (IMG_SIZE, IMG_SIZE), interpolation=cv2.INTER_AREA)]
+
+class VideoCardPipeline:
+    """
+    Frames -> near-duplicate gate -> card detector -> batched recognizer -> CardSighting.
+    `detect` maps an RGB frame to a list of IMG_SIZE x IMG_SIZE card crops (by default
+    the contour detector of card_detection.py). Crops from consecutive frames are batched
+    together; only sightings at or above `min_confidence` are emitted.
+    """
+    def __init__(self, recognizer, detect=crop_cards, batch_size=BATCH_SIZE, min_confidence=MIN_CONFIDENCE, duplicate_distance=DUPLICATE_DISTANCE):
+        self.recognizer = recognizer
+        self.detect = detect
+        self.batch_size = batch_size
+        self.min_confidence = min_confidence
+        self.duplicate_distance = duplicate_distance
+        self.frames_seen = 0
+        self.frames_kept = 0
+        self.crops = 0
+
+    def run(self, video_id, frames):
+        """Consumes (timestamp, frame) pairs, e.g. from stream_frames; yields CardSightings."""
+        gate = FrameGate(self.duplicate_distance)
+        crops, timestamps = [], []
+        for timestamp, frame in frames:
+            self.frames_seen += 1
+            if not gate.keep(frame):
+                continue
+            self.frames_kept += 1
+            for crop in self.detect(frame):
+                crops.append(crop)
+                timestamps.append(timestamp)
+            if len(crops) >= self.batch_size:
+                yield from self._recognize(video_id, crops, timestamps)
+                crops, timestamps = [], []
+        if crops:
+            yield from self._recognize(video_id, crops, timestamps)
+
+    def _recognize(self, video_id, crops, timestamps):
+        self.crops += len(crops)
+        for timestamp, matches in zip(timestamps, self.recognizer.recognize(np.stack(crops), k=1)):
+            if matches and matches[0]['score'] >= self.min_confidence:
+                yield CardSighting(video_id, float(timestamp), matches[0]['unique_id'], matches[0]['score'])
+
+def main():
+    """
+    Searches YouTube like yt_frame_extractor.py, streams each video through the pipeline
+    and appends the sightings to OUTPUT_FILE as JSON lines.
+    """
+    import yt_dlp
+    from yt_frame_extractor import SEARCH_KEYWORDS, MAX_VIDEOS_PER_KEYWORD, MIN_VIDEO_DURATION, YDL_OPTS, ignore_window
+
+    pipeline = VideoCardPipeline(CardRecognizer.load(MODEL_PATH, INDEX_DIR))
+    with yt_dlp.YoutubeDL(YDL_OPTS) as ydl, open(OUTPUT_FILE, "a", encoding="utf-8") as out:
+        for keyword in SEARCH_KEYWORDS:
+            print(f"\nSearching for videos with keyword: {keyword}")
+            try:
+                search_results = ydl.extract_info(f"ytsearch{MAX_VIDEOS_PER_KEYWORD}:{keyword}", download=False)['entries']
+            except Exception as e:
+                print(f"An error occurred during search for keyword '{keyword}': {e}")
+                continue
+
+            for video_info in search_results:
+                duration = video_info.get('duration', 0)
+                if duration < MIN_VIDEO_DURATION:
+                    print(f"Skipping video (too short): {video_info.get('title')}")
+                    continue
+                video_id = video_info.get('id')
+                ignore_start, ignore_end = ignore_window(duration)
+                if duration - ignore_start - ignore_end <= 0:
+                    continue
+
+                try:
+                    video_url = ydl.extract_info(f'https://www.youtube.com/watch?v={video_id}', download=False).get('url')
+                    if not video_url:
+                        print(f"Could not get stream URL for {video_id}")
+                        continue
+                    start = time.time()
+                    kept_before, seen_before = pipeline.frames_kept, pipeline.frames_seen
+                    frames = stream_frames(video_url, ignore_start, duration - ignore_start - ignore_end)
+                    sightings = 0
+                    for sighting in pipeline.run(video_id, frames):
+                        out.write(json.dumps(asdict(sighting)) + "\n")
+                        sightings += 1
+                    out.flush()
+                    print(f"{video_id}: {pipeline.frames_seen - seen_before} frames, {pipeline.frames_kept - kept_before} after dedup, "
+                          f"{sightings} sightings in {time.time() - start:.1f}s")
+                except Exception as e:
+                    print(f"Error processing video {video_id}: {e}")
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
 
+import json
 import os
 import subprocess
-import yt_dlp
 
 # --- Constants ---
 SEARCH_KEYWORDS = ["opening booster pack box mtg", "mtg card opening", "pack opening magic", "new magic set card opening", "unboxing new mtg cards"] #, "mtg gameplay", "magic the gathering shorts"
@@ -27,6 +27,17 @@ YDL_OPTS = {
     'quiet': True,
 }
 
+VIDEO_INFO_FILE = "video_info.json"  # Written next to the frames: duration, skipped intro/outro and frame interval
+
+def ignore_window(duration):
+    """
+    Seconds (ignore_start, ignore_end) skipped at the start and end of a video: shorts
+    (under a minute) usually have no intro/outro, long videos do.
+    """
+    if duration < 60:
+        return SHORTS_IGNORE_START_SECONDS, SHORTS_IGNORE_END_SECONDS
+    return LONG_VIDEO_IGNORE_START_SECONDS, LONG_VIDEO_IGNORE_END_SECONDS
+
 def extract_frames(video_url, output_folder, duration, ignore_start, ignore_end):
     """
     Extracts frames from a video using ffmpeg, skipping the beginning and end.
@@ -52,10 +63,17 @@ def extract_frames(video_url, output_folder, duration, ignore_start, ignore_end)
     print(f"Executing ffmpeg command: {' '.join(command)}")
     subprocess.run(command, check=True)
 
+    # frame_0001.png is taken at ignore_start seconds into the video
+    with open(os.path.join(output_folder, VIDEO_INFO_FILE), "w") as f:
+        json.dump({"duration": duration, "ignore_start": ignore_start, "ignore_end": ignore_end,
+                   "frame_interval": FRAME_INTERVAL_SECONDS}, f)
+
 def main():
     """
     Main function to search for videos and extract frames.
     """
+    import yt_dlp
+
     if not os.path.exists(OUTPUT_DIR):
         os.makedirs(OUTPUT_DIR)
 
@@ -77,13 +95,7 @@ def main():
                     print(f"\nProcessing video: {video_title} ({video_id})")
 
                     # Determine if the video is a short and set ignore times accordingly
-                    is_short = duration < 60
-                    if is_short:
-                        ignore_start = SHORTS_IGNORE_START_SECONDS
-                        ignore_end = SHORTS_IGNORE_END_SECONDS
-                    else:
-                        ignore_start = LONG_VIDEO_IGNORE_START_SECONDS
-                        ignore_end = LONG_VIDEO_IGNORE_END_SECONDS
+                    ignore_start, ignore_end = ignore_window(duration)
 
                     try:
                         info_dict = ydl.extract_info(f'https://www.youtube.com/watch?v={video_id}', download=False)